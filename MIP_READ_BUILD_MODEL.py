@@ -4,7 +4,11 @@ def read_displib_json(filepath):
     import json
     with open(filepath, 'r') as f:
         data = json.load(f)
+    return parse_displib_data(data)
 
+
+def parse_displib_data(data):
+    # Same as read_displib_json for an already loaded (or presolved) problem dict
     trains = []
     operations = []
     resources = set()
@@ -28,7 +32,12 @@ def read_displib_json(filepath):
                 'min_duration': op['min_duration'],
                 'successors': op.get('successors', []),
                 'resources': [],
-                'resource_release_times': []
+                'resource_release_times': [],
+                # Occupation of each resource relative to the start: [start + acquire offset,
+                # start + hold + release time]. Only macro-operations from
+                # displib_presolve.contract_chains differ from [start, start + min_duration].
+                'resource_acquire_offsets': [],
+                'resource_holds': []
             }
 
             ## Collect resources and release time
@@ -39,6 +48,8 @@ def read_displib_json(filepath):
                 train_paths.setdefault(train_idx, []).append((op_idx, res_name))
                 op_dict['resources'].append(res_name)
                 op_dict['resource_release_times'].append(r.get('release_time', 0))
+                op_dict['resource_acquire_offsets'].append(r.get('acquire_offset', 0))
+                op_dict['resource_holds'].append(r.get('hold', op['min_duration']))
             assert op_dict['train'] == train_idx, f"[❌] Train mismatch: got {op_dict['train']} but expected {train_idx}"
 
             operations.append(op_dict)
@@ -84,13 +95,12 @@ def read_displib_json(filepath):
     for op in operations:
         op['predecessors'] = []
 
+    op_by_key = {(op['train'], op['op_idx']): op for op in operations}
     for op in operations:
         i, j = op['train'], op['op_idx']
         for succ in op['successors']:
-            for target_op in operations:
-                if target_op['train'] == i and target_op['op_idx'] == succ:
-                    target_op['predecessors'].append((i, j))
-                    break
+            if (i, succ) in op_by_key:
+                op_by_key[i, succ]['predecessors'].append((i, j))
 
     return {
         'trains': trains,
@@ -135,19 +145,69 @@ if __name__ == "__main__":
 
 
 
-import gurobipy as gp
-from gurobipy import GRB
+def add_route_columns(model, routes, operations, active, y):
+    # Path formulation: one binary per route column (a path through the train's successor
+    # DAG, as a list of op indices) and exactly one column per train; active and y are the
+    # sums of the chosen columns. Constraint names are used by MIP_column_generation to add
+    # columns later: route_choice_{i}, route_active_{i}_{j}, route_edge_{i}_{j}_{s}.
+    import gurobipy as gp
+    from gurobipy import GRB
+    from collections import defaultdict
+
+    columns = {}
+    uses_op, uses_edge = defaultdict(list), defaultdict(list)
+    for i, train_routes in routes.items():
+        for p, route in enumerate(train_routes):
+            columns[i, p] = var = model.addVar(vtype=GRB.BINARY, name=f"route_{i}_{p}")
+            for j in route:
+                uses_op[i, j].append(var)
+            for j, s in zip(route, route[1:]):
+                uses_edge[i, j, s].append(var)
+    for i, train_routes in routes.items():
+        model.addConstr(gp.quicksum(columns[i, p] for p in range(len(train_routes))) == 1, name=f"route_choice_{i}")
+    for op in operations:
+        i, j = op['train'], op['op_idx']
+        model.addConstr(gp.quicksum(uses_op[i, j]) - active[i, j] == 0, name=f"route_active_{i}_{j}")
+        for s in op['successors']:
+            model.addConstr(gp.quicksum(uses_edge[i, j, s]) - y[i, j, s] == 0, name=f"route_edge_{i}_{j}_{s}")
+    return columns
+
+
+def build_mip_model(trains, operations, conflict_pairs, train_paths, headways, time_windows, objectives,
+                    swapping=False, symmetry=False, fix_orders=False, routes=None):
+    # routes: {train: [[op, ...], ...]} route columns (MIP_column_generation); route choice is
+    # then one binary per column instead of the y / active successor flow below
+    # gurobipy is imported here so that reading instances does not require (or pay for) Gurobi
+    import gurobipy as gp
+    from gurobipy import GRB
 
-def build_mip_model(trains, operations, conflict_pairs, train_paths, headways, time_windows, objectives): 
     model = gp.Model("Train_Scheduling")
+    model._swap, model._penalty, model._objective_terms = [], {}, []
+
+    # Orders decided by the propagated time windows (displib_presolve.analyze_conflict_orders):
+    # implied pairs and pairs that cannot both be active get no b variables at all,
+    # forced pairs get their b fixed below.
+    forced, exclusive = set(), set()
+    if fix_orders:
+        from displib_presolve import analyze_conflict_orders, order_precedences, order_report, print_order_report
+        analysis = analyze_conflict_orders(operations)
+        print_order_report("Conflict orders", order_report(analysis))
+        implied = order_precedences(analysis, kinds=("implied",))
+        forced = order_precedences(analysis, kinds=("forced",))
+        exclusive = order_precedences(analysis, kinds=("exclusive",))
+        dropped = implied | exclusive
+        conflict_pairs = [(p, q, res) for p, q, res in conflict_pairs if (p, q) not in dropped and (q, p) not in dropped]
 
     # 定义决策变量
     op_keys = [(op['train'], op['op_idx']) for op in operations]
     t = model.addVars(op_keys, vtype=GRB.CONTINUOUS, name="t")
     b_keys = list({(i, j, k, l) for ((i, j), (k, l), _) in conflict_pairs})
     b = model.addVars(b_keys, vtype=GRB.BINARY, name="b")
-    y = model.addVars([(op['train'], op['op_idx'], s) for op in operations for s in op['successors']], vtype=GRB.BINARY, name='y')
-    active = model.addVars([(op['train'], op['op_idx']) for op in operations], vtype=GRB.BINARY, name="active")
+    # With route columns y and active are sums of binaries, so they need not be binary themselves
+    route_vtype = GRB.BINARY if routes is None else GRB.CONTINUOUS
+    y = model.addVars([(op['train'], op['op_idx'], s) for op in operations for s in op['successors']],
+                      vtype=route_vtype, ub=1, name='y')
+    active = model.addVars([(op['train'], op['op_idx']) for op in operations], vtype=route_vtype, ub=1, name="active")
 
     M = 1e6
 
@@ -158,30 +218,53 @@ def build_mip_model(trains, operations, conflict_pairs, train_paths, headways, t
         min_duration_ij = op_ij['min_duration']
         min_duration_kl = op_kl['min_duration']
         release_time_ij = 0
+        acquire_ij = 0
         if res in op_ij['resources']:
             idx = op_ij['resources'].index(res)
             release_time_ij = op_ij['resource_release_times'][idx]
+            acquire_ij = op_ij['resource_acquire_offsets'][idx]
+            min_duration_ij = op_ij['resource_holds'][idx]
 
         release_time_kl = 0
+        acquire_kl = 0
         if res in op_kl['resources']:
             idx = op_kl['resources'].index(res)
             release_time_kl = op_kl['resource_release_times'][idx]
+            acquire_kl = op_kl['resource_acquire_offsets'][idx]
+            min_duration_kl = op_kl['resource_holds'][idx]
 
         model.addConstr(b[i, j, k, l] + b[k, l, i, j] == 1, name=f"mutual_{i}_{j}_{k}_{l}")
 
         model.addConstr(
             t[i, j] + min_duration_ij + release_time_ij
-            <= t[k, l] + M * (1 - b[i, j, k, l]) + M * (2 - active[i, j] - active[k, l]),
+            <= t[k, l] + acquire_kl + M * (1 - b[i, j, k, l]) + M * (2 - active[i, j] - active[k, l]),
             name=f"conflict1_{i}_{j}_{k}_{l}"
         )
 
         model.addConstr(
             t[k, l] + min_duration_kl + release_time_kl
-            <= t[i, j] + M * (1 - b[k, l, i, j]) + M * (2 - active[i, j] - active[k, l]),
+            <= t[i, j] + acquire_ij + M * (1 - b[k, l, i, j]) + M * (2 - active[i, j] - active[k, l]),
             name=f"conflict2_{i}_{j}_{k}_{l}"
         )
 
 
+    for (i, j), (k, l) in forced:
+        b[i, j, k, l].LB = 1
+    for (i, j), (k, l) in exclusive:
+        model.addConstr(active[i, j] + active[k, l] <= 1, name=f"exclusive_{i}_{j}_{k}_{l}")
+
+    # ======================== Symmetry Breaking ========================
+    # Trains with identical routes are ordered FIFO where one dominates the other
+    # (displib_presolve.find_symmetric_train_orders); the decided conflict orders are fixed.
+    if symmetry:
+        from displib_presolve import find_symmetric_train_orders, symmetry_precedences
+        orders = find_symmetric_train_orders(operations, objectives)
+        for a, c, entry, block in orders:
+            model.addConstr(t[a, entry] <= t[c, entry], name=f"symmetry_{a}_{c}")
+        for (i, j), (k, l) in symmetry_precedences(orders):
+            if (i, j, k, l) in b:
+                b[i, j, k, l].LB = 1
+
     # ======================== Time Window ========================
     for tw in time_windows:
         i, j = tw['train'], tw['op_idx']
@@ -189,22 +272,27 @@ def build_mip_model(trains, operations, conflict_pairs, train_paths, headways, t
         model.addConstr(t[i, j] >= lb - M * (1 - active[i, j]), name=f"time_lb_{i}_{j}")
         model.addConstr(t[i, j] <= ub + M * (1 - active[i, j]), name=f"time_ub_{i}_{j}")
 
+    # ======================== Route Columns ========================
+    model._routes = add_route_columns(model, routes, operations, active, y) if routes is not None else None
+
     # ======================== Successor Constrints ========================
     for op in operations:
         i, j = op['train'], op['op_idx']
         succs = op['successors']
-        if succs:
+        if succs and routes is None:
             model.addConstr(gp.quicksum(y[i, j, s] for s in succs) == 1, name=f"succ_choice_{i}_{j}")
         for s in succs:
             # If the successor is selected, the successor operation must be active
-            model.addConstr(y[i, j, s] <= active[i, s], name=f"succ_active_link_{i}_{j}_{s}")
+            if routes is None:
+                model.addConstr(y[i, j, s] <= active[i, s], name=f"succ_active_link_{i}_{j}_{s}")
             model.addConstr(
                 t[i, s] >= t[i, j] + op['min_duration'] +  - M * (1 - y[i, j, s]),
                 name=f"succ_time_flow_{i}_{j}_{s}"
             )
 
     # ======================== Heuristics improvement1: predecessor 约束 ========================
-    for op in operations:
+    # (route columns start at an entry operation and follow successors by construction)
+    for op in (operations if routes is None else []):
         i, j = op['train'], op['op_idx']
         preds = op.get('predecessors', [])  # 你需要在读取阶段预处理出 predecessors
         if preds:
@@ -220,42 +308,26 @@ def build_mip_model(trains, operations, conflict_pairs, train_paths, headways, t
         model.addConstr(t[i, j] >= op['start_lb'] - M * (1 - active[i, j]), name=f"t_lb_active_{i}_{j}")
         model.addConstr(t[i, j] <= op['start_ub'] + M * (1 - active[i, j]), name=f"t_ub_active_{i}_{j}")
 
-##    # ======================== Swapping Conflict ========================
-##    for train_a in range(len(trains)):
-##        for train_b in range(train_a + 1, len(trains)):
-##            # 获取 A、B 的操作列表
-##            ops_a = [op for op in operations if op['train'] == train_a]
-##            ops_b = [op for op in operations if op['train'] == train_b]
-##
-##            # 枚举 A 的连续操作 (A1→A2)
-##            for idx1 in range(len(ops_a) - 1):
-##                a1, a2 = ops_a[idx1], ops_a[idx1 + 1]
-##                if len(a1['resources']) == 1 and len(a2['resources']) == 1:
-##                    ra1 = a1['resources'][0]
-##                    ra2 = a2['resources'][0]
-##
-##                    # 枚举 B 的连续操作 (B1→B2)
-##                    for idx2 in range(len(ops_b) - 1):
-##                        b1, b2 = ops_b[idx2], ops_b[idx2 + 1]
-##                        if len(b1['resources']) == 1 and len(b2['resources']) == 1:
-##                            rb1 = b1['resources'][0]
-##                            rb2 = b2['resources'][0]
-##
-##                            # 判断是否为对向（swapping）资源使用
-##                            if ra1 == rb2 and ra2 == rb1 and ra1 != ra2:
-##                                # A的最后一步释放 ra2 后，B 才能占用 rb1=ra2
-##                                dur = a2['min_duration']
-##                                rel = 0
-##                                if ra2 in a2['resources']:
-##                                    idx = a2['resources'].index(ra2)
-##                                    rel = a2['resource_release_times'][idx]
-##
-##                                i, j = a2['train'], a2['op_idx']
-##                                k, l = b1['train'], b1['op_idx']
-##                                model.addConstr(
-##                                    t[i, j] + dur + rel <= t[k, l] + M * (2 - active[i, j] - active[k, l]),
-##                                    name=f"swapping_conflict_{i}_{j}_to_{k}_{l}"
-##                                )
+    # ======================== Swapping Conflict ========================
+    # Head-on swaps (A: r1 -> r2 while B: r2 -> r1) are found by hashing transitions
+    # (displib_presolve.find_swapping_pairs) instead of looping over all train and op pairs.
+    # Either A has left r2 before B enters it, or B has left r1 before A enters it.
+    if swapping:
+        from displib_presolve import find_swapping_pairs
+        op_by_key = {(op['train'], op['op_idx']): op for op in operations}
+        swap_pairs = find_swapping_pairs(operations)
+        sw = model.addVars(range(len(swap_pairs)), vtype=GRB.BINARY, name="swap")
+        model._swap = [(sw[n], (pair[0][0], pair[1][0])) for n, pair in enumerate(swap_pairs)]
+        for n, ((i, u, v), (k, u2, v2), rel_a, rel_b) in enumerate(swap_pairs):
+            both_moves = M * (2 - y[i, u, v] - y[k, u2, v2])
+            model.addConstr(
+                t[i, v] + op_by_key[i, v]['min_duration'] + rel_a <= t[k, u2] + M * (1 - sw[n]) + both_moves,
+                name=f"swapping_conflict1_{i}_{v}_to_{k}_{u2}"
+            )
+            model.addConstr(
+                t[k, v2] + op_by_key[k, v2]['min_duration'] + rel_b <= t[i, u] + M * sw[n] + both_moves,
+                name=f"swapping_conflict2_{k}_{v2}_to_{i}_{u}"
+            )
 
     # ======================== Objective function ========================
     obj = gp.LinExpr()
@@ -268,18 +340,29 @@ def build_mip_model(trains, operations, conflict_pairs, train_paths, headways, t
 
         delay_var = model.addVar(lb=0, vtype=GRB.CONTINUOUS, name=f"delay_train{i}_op{j}")
         diff_var = model.addVar(lb=-GRB.INFINITY, vtype=GRB.CONTINUOUS, name=f"diff_{i}_{j}")
-        model.addConstr(diff_var == t[i, j] - t_bar, name=f"calc_diff_{i}_{j}")
+        diff_constr = model.addConstr(diff_var == t[i, j] - t_bar, name=f"calc_diff_{i}_{j}")
         model.addGenConstrMax(delay_var, [0, diff_var], name=f"gen_max_delay_{i}_{j}")
         obj += c_ij * delay_var
 
+        bin_var = indicator = None
         if d_ij > 0:
             bin_var = model.addVar(vtype=GRB.BINARY, name=f"penalty_trigger_{i}_{j}")
-            model.addGenConstrIndicator(bin_var, True, t[i, j] >= t_bar + 1e-5, name=f"penalty_ind_{i}_{j}")
+            model._penalty[i, j] = bin_var
+            indicator = model.addGenConstrIndicator(bin_var, True, t[i, j] >= t_bar + 1e-5, name=f"penalty_ind_{i}_{j}")
             obj += d_ij * bin_var
+        model._objective_terms.append({"delay": delay_var, "diff": diff_constr, "penalty": bin_var,
+                                       "indicator": indicator})
 
     for op in operations:
         i, j = op['train'], op['op_idx']
         obj += 0.0001 * active[i, j]
 
     model.setObjective(obj, GRB.MINIMIZE)
+
+    # Keep handles on the model for callbacks (Gurobi allows user data in "_" attributes);
+    # model._swap lists the swap variables with their (train, train), model._penalty
+    # holds the increment indicators by (train, op), model._routes the route columns by
+    # (train, column) (None without routes) and model._objective_terms the delay variable,
+    # diff constraint, penalty variable and indicator of every objective component, in order
+    model._t, model._active, model._y, model._b = t, active, y, b
     return model, t, active, y
@@ -1,60 +1,16 @@
-import json
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
-import matplotlib.colors as mcolors
-import numpy as np
+from displib_plot import plot_train_gantt
 
-# ====== 修改为你的 solution 路径 ======
-solution_path = r"C:\Users\陆柯言\Desktop\大四第二学期学习资料\应用运筹project\displib_instances_phase1_v1_1\solution\line3_1.json"
 
-# 读取 JSON 文件
-with open(solution_path, encoding='utf-8') as f:
-    data = json.load(f)
+def plot_solution(solution_path, output_path=None, title="line3_1", problem_path=None):
+    # 真实 duration / release time 需要 problem 文件；没有时按到下一个事件的时间绘制
+    plot_train_gantt(solution_path, problem_path, output_path=output_path, title=title)
 
-events = data["events"]
-objective_value = data.get("objective_value", None)
 
-# 提取列车 ID 并编号
-train_ids = sorted(set(event["train"] for event in events))
-train_to_y = {train_id: idx for idx, train_id in enumerate(train_ids)}
-num_trains = len(train_ids)
-
-# 为每辆列车分配颜色（colormap）
-cmap = cm.get_cmap('tab20', num_trains)
-train_colors = {train: cmap(i) for i, train in enumerate(train_ids)}
-
-# 设置画布
-fig, ax = plt.subplots(figsize=(12, 0.6 * num_trains + 2))
-
-# 绘制每个 operation
-for event in events:
-    train = event["train"]
-    op = event["operation"]
-    start_time = event["time"]
-    duration = 10  # 可改为真实 duration
-    y = train_to_y[train]
-
-    # 条形图
-    ax.barh(y, duration, left=start_time, height=0.4,
-            color=train_colors[train])
-
-
-
-# 坐标轴与标题
-ax.set_yticks(list(train_to_y.values()))
-ax.set_yticklabels([f"Train {tid}" for tid in train_ids], fontsize=9)
-ax.set_xlabel("Time", fontsize=11)
-ax.set_title(f"Train Operation Schedule for line3_1(Objective: {objective_value})", fontsize=13, pad=15)
-ax.grid(True, axis='x', linestyle='--', alpha=0.4)
-
-# 图例（只显示前6个）
-patches = [plt.Line2D([0], [0], color=train_colors[train], lw=6, label=f'Train {train}') 
-           for train in train_ids[:6]]
-ax.legend(handles=patches, loc='lower right', title='Trains', fontsize=8)
-
-plt.tight_layout()
-plt.show()
-
-# 保存为高清图片（可选）
-# plt.savefig("train_schedule_gantt.png", dpi=300)
+if __name__ == "__main__":
+    # ====== 修改为你的 problem / solution 路径 ======
+    problem_path = r"C:\Users\陆柯言\Desktop\大四第二学期学习资料\应用运筹project\displib_instances_phase1_v1_1\displib_instances_phase1\line3_1.json"
+    solution_path = r"C:\Users\陆柯言\Desktop\大四第二学期学习资料\应用运筹project\displib_instances_phase1_v1_1\solution\line3_1.json"
+    plot_solution(solution_path, problem_path=problem_path)
 
+    # 保存为高清图片（可选）
+    # plot_solution(solution_path, output_path="train_schedule_gantt.png", problem_path=problem_path)
@@ -0,0 +1,209 @@
+"""
+Route columns for the path formulation of the Gurobi model (build_mip_model(routes=...)).
+
+Instead of one y binary per successor edge and big-M flow constraints, every train picks one
+column: a complete route through its successor DAG. The LP relaxation then contains the
+convex hull of each train's routes. Columns come from two sources:
+  * enumeration, for trains with at most `enumerate_limit` routes that fit their windows;
+  * pricing, for the others: the LP relaxation of the restricted master problem is solved,
+    and for every train the route of least reduced cost is a shortest path through its DAG
+    (operations weighted by the duals of route_active_*, edges by those of route_edge_*).
+    A route whose reduced cost is below zero becomes a new column, until none is left.
+The master problem is then solved as a MIP over the generated columns (price-and-branch:
+no pricing inside the branch-and-bound tree, so it is exact only when every train's routes
+were all enumerated).
+Usage: MIP_column_generation.py PROBLEMFILE [--enumerate-limit N] [--max-iterations N] [--time-limit S] [--output SOLUTIONFILE]
+"""
+
+import time
+
+import gurobipy as gp
+from gurobipy import GRB
+
+from MIP_READ_BUILD_MODEL import build_mip_model
+from displib_presolve import _train_graphs, propagate_time_bounds
+
+# Reduced costs above -EPS count as zero
+EPS = 1e-6
+
+
+# ======================== Routes ========================
+
+def earliest_route(train, ops_by_key, preds, order, usable):
+    # The route that reaches an exit first, going through usable operations only (each
+    # operation starts at max(start_lb, arrival)); one route of every train that can run alone
+    arrival, best_pred = {}, {}
+    for key in order:
+        if key[0] != train or key not in usable:
+            continue
+        op = ops_by_key[key]
+        candidates = [(arrival[train, q] + ops_by_key[train, q]['min_duration'], q)
+                      for q in preds[key] if (train, q) in arrival]
+        if preds[key] and not candidates:
+            continue
+        time_in, best_pred[key] = min(candidates) if candidates else (op['start_lb'], None)
+        time_in = max(time_in, op['start_lb'])
+        if time_in <= op['start_ub']:
+            arrival[key] = time_in
+    exits = [key for key in arrival if not ops_by_key[key]['successors']]
+    if not exits:
+        return None
+    return _backtrack(min(exits, key=lambda key: (arrival[key], key[1])), best_pred)
+
+
+def _backtrack(key, best_pred):
+    route = [key[1]]
+    while best_pred[key] is not None:
+        key = (key[0], best_pred[key])
+        route.append(key[1])
+    return route[::-1]
+
+
+def enumerate_routes(train, ops_by_key, preds, order, usable, limit):
+    # All routes of the train through usable operations, or None if there are more than limit
+    count = {}
+    for key in reversed(order):
+        if key[0] == train and key in usable:
+            succs = [(train, s) for s in ops_by_key[key]['successors'] if (train, s) in usable]
+            if not ops_by_key[key]['successors']:
+                count[key] = 1
+            else:
+                count[key] = sum(count.get(s, 0) for s in succs)
+    sources = [key for key in count if not preds[key]]
+    if sum(count[key] for key in sources) > limit:
+        return None
+    routes = []
+    stack = [[key] for key in sources if count[key]]
+    while stack:
+        path = stack.pop()
+        succs = [(train, s) for s in ops_by_key[path[-1]]['successors'] if count.get((train, s))]
+        if not ops_by_key[path[-1]]['successors']:
+            routes.append([key[1] for key in path])
+        stack.extend(path + [s] for s in succs)
+    return routes
+
+
+def price_route(train, ops_by_key, preds, order, usable, op_dual, edge_dual):
+    # Shortest path with costs -dual on operations and edges: (cost, route) of least reduced
+    # cost before the route_choice dual is subtracted
+    dist, best_pred = {}, {}
+    for key in order:
+        if key[0] != train or key not in usable:
+            continue
+        candidates = [(dist[train, q] - edge_dual[train, q, key[1]], q) for q in preds[key] if (train, q) in dist]
+        if preds[key] and not candidates:
+            continue
+        value, best_pred[key] = min(candidates) if candidates else (0.0, None)
+        dist[key] = value - op_dual[key]
+    exits = [key for key in dist if not ops_by_key[key]['successors']]
+    if not exits:
+        return None, None
+    end = min(exits, key=lambda key: dist[key])
+    return dist[end], _backtrack(end, best_pred)
+
+
+# ======================== Restricted master problem ========================
+
+def relaxed_master(displib_data, routes, swapping=False, symmetry=False, fix_orders=False):
+    # LP relaxation of the path model. relax() drops the general constraints, so the delay
+    # terms are restated linearly (delay >= t - threshold); the increment indicators are
+    # left out of the LP.
+    d = displib_data
+    model, _, _, _ = build_mip_model(d['trains'], d['operations'], d['conflict_pairs'], d['train_paths'],
+                                     d['headways'], d['time_windows'], d['objectives'],
+                                     swapping=swapping, symmetry=symmetry, fix_orders=fix_orders, routes=routes)
+    model.update()
+    lp = model.relax()
+    # build_mip_model adds one delay and one diff variable per objective component, in order
+    delays = [var for var in lp.getVars() if var.VarName.startswith("delay_train")]
+    diffs = [var for var in lp.getVars() if var.VarName.startswith("diff_")]
+    for n, (delay, diff) in enumerate(zip(delays, diffs)):
+        lp.addConstr(delay >= diff, name=f"lp_delay_{n}")
+    links = {c.ConstrName: c for c in lp.getConstrs() if c.ConstrName.startswith("route_")}
+    return lp, links
+
+
+def add_column(lp, links, train, route, name):
+    constrs = ([links[f"route_choice_{train}"]] + [links[f"route_active_{train}_{j}"] for j in route]
+               + [links[f"route_edge_{train}_{j}_{s}"] for j, s in zip(route, route[1:])])
+    return lp.addVar(lb=0, obj=0, column=gp.Column([1.0] * len(constrs), constrs), name=name)
+
+
+def generate_columns(displib_data, enumerate_limit=20, max_iterations=50, time_limit=None, swapping=False,
+                     symmetry=False, fix_orders=False, verbose=True):
+    # Returns {"routes": {train: [[op, ...], ...]}, "lp_bounds": [LP value per iteration],
+    # "columns", "priced", "iterations", "seconds"}
+    start = time.time()
+    operations = displib_data['operations']
+    ops_by_key, preds, order = graphs = _train_graphs(operations)
+    es, ls = propagate_time_bounds(operations, graphs=graphs)
+    usable = {key for key in ops_by_key if es[key] <= ls[key]}
+    trains = sorted({op['train'] for op in operations})
+
+    routes, priced = {}, []
+    for i in trains:
+        routes[i] = enumerate_routes(i, ops_by_key, preds, order, usable, enumerate_limit)
+        if routes[i] is None:
+            priced.append(i)
+            first = earliest_route(i, ops_by_key, preds, order, usable)
+            routes[i] = [first] if first is not None else []
+        if not routes[i]:
+            raise ValueError(f"train {i} has no route that fits its time windows")
+    if verbose:
+        print(f"🧮 routes: {sum(len(r) for r in routes.values())} columns, "
+              f"{len(trains) - len(priced)} trains enumerated, {len(priced)} priced")
+
+    result = {"routes": routes, "lp_bounds": [], "priced": priced, "iterations": 0}
+    if priced and max_iterations > 0:
+        lp, links = relaxed_master(displib_data, routes, swapping, symmetry, fix_orders)
+        lp.setParam('OutputFlag', 0)
+        known = {i: {tuple(route) for route in routes[i]} for i in priced}
+        for it in range(max_iterations):
+            if time_limit is not None and time.time() - start >= time_limit:
+                break
+            lp.optimize()
+            if lp.Status != GRB.OPTIMAL:
+                print(f"⚠️ restricted master LP ended with status {lp.Status}, pricing stopped")
+                break
+            result["lp_bounds"].append(lp.ObjVal)
+            result["iterations"] = it + 1
+            dual = dict(zip(links, lp.getAttr('Pi', list(links.values()))))
+            op_dual = {key: dual[f"route_active_{key[0]}_{key[1]}"] for key in ops_by_key}
+            edge_dual = {(i, j, s): dual[f"route_edge_{i}_{j}_{s}"]
+                         for (i, j), op in ops_by_key.items() for s in op['successors']}
+            added = 0
+            for i in priced:
+                cost, route = price_route(i, ops_by_key, preds, order, usable, op_dual, edge_dual)
+                if route is None or cost - dual[f"route_choice_{i}"] >= -EPS or tuple(route) in known[i]:
+                    continue
+                known[i].add(tuple(route))
+                add_column(lp, links, i, route, name=f"route_{i}_{len(routes[i])}")
+                routes[i].append(route)
+                added += 1
+            if verbose:
+                print(f"🔁 iteration {it + 1}: LP {lp.ObjVal:.4f}, {added} new columns")
+            if not added:
+                break
+
+    result["columns"] = sum(len(r) for r in routes.values())
+    result["seconds"] = time.time() - start
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Solve the Gurobi model with route columns (path formulation).")
+    parser.add_argument("problem")
+    parser.add_argument("--enumerate-limit", type=int, default=20, help="enumerate the routes of trains with at most N")
+    parser.add_argument("--max-iterations", type=int, default=50, help="pricing rounds")
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--swapping", action="store_true")
+    args = parser.parse_args()
+
+    from MIP_solver import solve_mip
+    model, writer = solve_mip(args.problem, solution_path=args.output, time_limit=args.time_limit,
+                              swapping=args.swapping, paths={"enumerate_limit": args.enumerate_limit,
+                                                             "max_iterations": args.max_iterations})
+    raise SystemExit(0 if writer.best_solution is not None else 1)
@@ -0,0 +1,207 @@
+"""
+Relax-and-fix and fix-and-optimize around the Gurobi model (MIP_READ_BUILD_MODEL.build_mip_model).
+
+Trains are taken in batches, earliest first (or by objective weight, order="priority"). In
+stage s the binaries of batch s (active, y, and b / swap of its pairs with trains already
+seen) are integral, those of the trains still to come are relaxed, and those of earlier
+batches are fixed at their values; after the last stage every decision is fixed and the
+schedule is a MIP solution. Fix-and-optimize sweeps then free the binaries of one group of
+trains at a time (consecutive groups share `overlap` trains), warm started from the
+incumbent, and keep what improves. The model is built once: between solves only variable
+types and bounds change. Every incumbent is verified and written by IncumbentWriter.
+Usage: MIP_relax_and_fix.py PROBLEMFILE [--batch-size N] [--order earliest|priority] [--time-limit S] [--output SOLUTIONFILE] [--swapping]
+"""
+
+import json
+import time
+from collections import defaultdict
+
+from gurobipy import GRB
+
+from MIP_READ_BUILD_MODEL import parse_displib_data, build_mip_model
+from MIP_solver import build_successor_index, get_solution_events, mipsol_callback, set_params
+from displib_anytime import IncumbentWriter
+from displib_bounds import lower_bound
+from displib_verify import parse_problem
+
+
+# ======================== Train decisions ========================
+
+def train_binaries(model, operations):
+    # ({train: [vars]}, {(train, train): [vars]}): the route binaries of one train and the
+    # binaries that order two trains. The increment indicators are left alone: indicator
+    # constraints need them binary, and they only follow the start times.
+    own, pairs = defaultdict(list), defaultdict(list)
+    for op in operations:
+        i, j = op['train'], op['op_idx']
+        own[i].append(model._active[i, j])
+        for s in op['successors']:
+            own[i].append(model._y[i, j, s])
+    for (i, j, k, l), var in model._b.items():
+        if i == k:
+            own[i].append(var)
+        else:
+            pairs[min(i, k), max(i, k)].append(var)
+    for var, (i, k) in model._swap:
+        pairs[min(i, k), max(i, k)].append(var)
+    return own, pairs
+
+
+def train_order(operations, objectives, order="earliest"):
+    # Earliest: by the earliest possible start of the first operation that uses a resource.
+    # Priority: by total objective weight (coeff + increment), heaviest first.
+    from displib_presolve import propagate_time_bounds
+    es, _ = propagate_time_bounds(operations)
+    earliest = defaultdict(lambda: float('inf'))
+    for op in operations:
+        if op['resources']:
+            earliest[op['train']] = min(earliest[op['train']], es[op['train'], op['op_idx']])
+    weight = defaultdict(int)
+    for obj in objectives:
+        weight[obj['train']] += obj['coeff'] + obj['increment']
+    trains = sorted({op['train'] for op in operations})
+    if order == "priority":
+        return sorted(trains, key=lambda i: (-weight[i], earliest[i], i))
+    return sorted(trains, key=lambda i: (earliest[i], i))
+
+
+def _fix(variables):
+    for var in variables:
+        var.LB = var.UB = round(var.X)
+
+
+def _free(variables, bounds):
+    # Back to the bounds of the built model, which keeps the orders fixed by symmetry / fix_orders
+    for var in variables:
+        var.LB, var.UB = bounds[var.index]
+
+
+def _set_type(variables, vtype):
+    for var in variables:
+        var.VType = vtype
+
+
+# ======================== Relax-and-fix ========================
+
+def relax_and_fix(filepath, solution_path=None, batch_size=2, order="earliest", group_size=None, overlap=1,
+                  sweeps=1, time_limit=None, params=None, listener=None, swapping=False, symmetry=False,
+                  fix_orders=False):
+    # group_size: trains per fix-and-optimize group (default 2 * batch_size); sweeps: passes
+    # over all groups (0 skips fix-and-optimize). time_limit is shared equally by the solves.
+    # Returns (model, writer) like MIP_solver.solve_mip.
+    start = time.time()
+    with open(filepath) as f:
+        data = json.load(f)
+    displib_data = parse_displib_data(data)
+    operations = displib_data['operations']
+    model, t, active, y = build_mip_model(
+        displib_data['trains'], operations, displib_data['conflict_pairs'], displib_data['train_paths'],
+        displib_data['headways'], displib_data['time_windows'], displib_data['objectives'],
+        swapping=swapping, symmetry=symmetry, fix_orders=fix_orders
+    )
+    set_params(model, params=params)
+
+    problem = parse_problem(data)
+    writer = IncumbentWriter(problem, solution_path, listener=listener, lower_bound=lower_bound(problem)["lower_bound"])
+    model._writer = writer
+    model._expansion = None
+    model._incoming = None
+    model._operations = operations
+    model._successor_index = build_successor_index(operations)
+
+    model.update()
+    own, pairs = train_binaries(model, operations)
+    bounds = {var.index: (var.LB, var.UB) for variables in list(own.values()) + list(pairs.values())
+              for var in variables}
+    trains = train_order(operations, displib_data['objectives'], order)
+    batches = [trains[n:n + batch_size] for n in range(0, len(trains), batch_size)]
+    group_size = group_size or 2 * batch_size
+    step = max(1, group_size - overlap)
+    groups = [trains[n:n + group_size] for n in range(0, max(1, len(trains) - overlap), step)] if sweeps else []
+    solves_left = [len(batches) + sweeps * len(groups)]
+
+    def solve(callback=None):
+        if time_limit is not None:
+            remaining = time_limit - (time.time() - start)
+            model.setParam('TimeLimit', max(1.0, remaining / max(1, solves_left[0])))
+        solves_left[0] -= 1
+        if callback is None:
+            model.optimize()
+        else:
+            model.optimize(callback)
+        return model.SolCount > 0
+
+    def pair_vars(members, seen):
+        return [var for (a, c), variables in pairs.items()
+                if (a in members or c in members) and a in seen and c in seen for var in variables]
+
+    _set_type([var for i in trains for var in own[i]] + [var for variables in pairs.values() for var in variables],
+              GRB.CONTINUOUS)
+
+    seen, fixed = set(), []
+    for s, batch in enumerate(batches):
+        seen.update(batch)
+        integral = [var for i in batch for var in own[i]] + pair_vars(set(batch), seen)
+        _set_type(integral, GRB.BINARY)
+        print(f"🧩 stage {s + 1}/{len(batches)}: trains {batch} integral, {len(trains) - len(seen)} relaxed")
+        if not solve():
+            if not fixed:
+                print(f"❌ stage {s + 1}: no solution")
+                return model, writer
+            # Backtrack once: the previous batch is decided again together with this one
+            print(f"↩️ stage {s + 1}: no solution with the previous batch fixed, freeing it")
+            _free(fixed[-1], bounds)
+            integral += fixed.pop()
+            if not solve():
+                print(f"❌ stage {s + 1}: no solution")
+                return model, writer
+        _fix(integral)
+        fixed.append(integral)
+
+    model._writer.offer(get_solution_events(
+        model._successor_index, model.getAttr('X', t), model.getAttr('X', active), model.getAttr('X', y)))
+
+    # ======================== Fix-and-optimize ========================
+    variables = model.getVars()
+    current = model.getAttr('X', variables)
+    best = model.ObjVal
+    for sweep in range(sweeps):
+        for group in groups:
+            if time_limit is not None and time.time() - start >= time_limit:
+                break
+            members = set(group)
+            free = [var for i in group for var in own[i]] + pair_vars(members, set(trains))
+            _free(free, bounds)
+            model.setAttr('Start', variables, current)
+            if solve(mipsol_callback) and model.ObjVal < best - 1e-6:
+                best = model.ObjVal
+                current = model.getAttr('X', variables)
+                print(f"🔧 sweep {sweep + 1}, trains {group}: objective {best:.2f}")
+            # Fix the group again at the incumbent
+            for var in free:
+                var.LB = var.UB = round(current[var.index])
+
+    print(f"⏱ relax-and-fix finished in {time.time() - start:.2f}s, best objective {writer.best_objective}")
+    return model, writer
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Relax-and-fix / fix-and-optimize for the Gurobi model.")
+    parser.add_argument("problem")
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--order", choices=["earliest", "priority"], default="earliest")
+    parser.add_argument("--group-size", type=int, default=None)
+    parser.add_argument("--overlap", type=int, default=1)
+    parser.add_argument("--sweeps", type=int, default=1)
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--swapping", action="store_true")
+    args = parser.parse_args()
+
+    model, writer = relax_and_fix(args.problem, solution_path=args.output, batch_size=args.batch_size,
+                                  order=args.order, group_size=args.group_size, overlap=args.overlap,
+                                  sweeps=args.sweeps, time_limit=args.time_limit,
+                                  swapping=args.swapping)
+    raise SystemExit(0 if writer.best_solution is not None else 1)
@@ -0,0 +1,239 @@
+"""
+What-if scenario batches on one Gurobi model (MIP_READ_BUILD_MODEL.build_mip_model).
+
+The model of the base instance is built once per worker; every scenario is a delta that is
+applied to that model in place, solved and reverted:
+  * "delays": {train: delay}, the time window of the train's entry operation moves by delay;
+  * "bounds": [{"train", "operation", "start_lb"?, "start_ub"?}], new time windows;
+  * "objective": [{"train", "operation", "threshold"?, "coeff"?, "increment"?}], changed
+    objective components (all components of that operation).
+Time windows are the right-hand sides of the time_lb / time_ub constraints, thresholds the
+right-hand side of calc_diff and the penalty indicator (re-added, as Gurobi cannot change
+the constraint of an indicator), coefficients the objective coefficients. Gurobi starts
+every solve from the previous solution of the same model, so each scenario is warm started.
+Scenarios run concurrently over worker processes, and each answer is verified against the
+scenario's own instance. Presolve options that depend on the windows or the objective
+(fix_orders, symmetry) would not stay valid across scenarios and are not offered.
+Usage: MIP_scenarios.py PROBLEMFILE SCENARIOFILE [--workers N] [--time-limit S] [--output REPORTFILE]
+"""
+
+import copy
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from gurobipy import GRB
+
+from MIP_READ_BUILD_MODEL import parse_displib_data, build_mip_model
+from MIP_solver import build_successor_index, get_solution_events, mipsol_callback, set_params
+from displib_anytime import IncumbentWriter
+
+STATUS_NAMES = {GRB.OPTIMAL: "OPTIMAL", GRB.TIME_LIMIT: "TIME_LIMIT", GRB.INFEASIBLE: "INFEASIBLE",
+                GRB.INF_OR_UNBD: "INFEASIBLE", GRB.INTERRUPTED: "INTERRUPTED"}
+
+
+# ======================== Scenario deltas ========================
+
+def scenario_changes(operations, objectives, scenario):
+    # ({(train, op): (start_lb, start_ub)}, {objective index: {"threshold", "coeff", "increment"}})
+    # for the operations and objective components the scenario changes
+    ops = {(op['train'], op['op_idx']): op for op in operations}
+    windows = {}
+    for train, delay in (scenario.get("delays") or {}).items():
+        entries = [key for key, op in ops.items() if key[0] == int(train) and not op['predecessors']]
+        if not entries:
+            raise ValueError(f"scenario {scenario.get('name')}: unknown train {train}")
+        for key in entries:
+            windows[key] = (ops[key]['start_lb'] + delay, ops[key]['start_ub'] + delay)
+    for bound in scenario.get("bounds") or []:
+        key = (bound["train"], bound["operation"])
+        if key not in ops:
+            raise ValueError(f"scenario {scenario.get('name')}: unknown operation {key}")
+        lb, ub = windows.get(key, (ops[key]['start_lb'], ops[key]['start_ub']))
+        windows[key] = (bound.get("start_lb", lb), bound.get("start_ub", ub))
+    terms = {}
+    for change in scenario.get("objective") or []:
+        for n, obj in enumerate(objectives):
+            if (obj['train'], obj['operation']) == (change["train"], change["operation"]):
+                terms[n] = {name: change.get(name, obj[name]) for name in ("threshold", "coeff", "increment")}
+    return windows, terms
+
+
+def scenario_data(data, scenario):
+    # The raw problem dict of one scenario, for verification
+    data = copy.deepcopy(data)
+    d = parse_displib_data(data)
+    windows, terms = scenario_changes(d['operations'], d['objectives'], scenario)
+    for (i, j), (lb, ub) in windows.items():
+        op = data["trains"][i][j]
+        op["start_lb"] = lb
+        if ub == float('inf'):
+            op.pop("start_ub", None)
+        else:
+            op["start_ub"] = ub
+    for n, values in terms.items():
+        data["objective"][n].update(values)
+    return data
+
+
+# ======================== Reusable model ========================
+
+class ScenarioModel:
+    # The model of the base instance; apply() changes it for one scenario, revert() restores it
+    def __init__(self, data, swapping=False, params=None):
+        self.data = data
+        d = parse_displib_data(data)
+        self.operations, self.objectives = d['operations'], d['objectives']
+        self.model, self.t, self.active, self.y = build_mip_model(
+            d['trains'], self.operations, d['conflict_pairs'], d['train_paths'], d['headways'], d['time_windows'],
+            self.objectives, swapping=swapping)
+        set_params(self.model, params=params)
+        self.model.update()
+        model = self.model
+        model._expansion = None
+        model._incoming = None
+        model._operations = self.operations
+        model._successor_index = build_successor_index(self.operations)
+
+        # Window constraints are t - M * active >= lb - M and t + M * active <= ub + M (time_*
+        # and t_*_active alike), so the right-hand side of a bound is bound + coefficient
+        constrs = {c.ConstrName: c for c in model.getConstrs()}
+        self.windows = {}
+        for op in self.operations:
+            i, j = op['train'], op['op_idx']
+            self.windows[i, j] = ([constrs[f"time_lb_{i}_{j}"], constrs[f"t_lb_active_{i}_{j}"]],
+                                  [constrs[f"time_ub_{i}_{j}"], constrs[f"t_ub_active_{i}_{j}"]])
+        self.changed = ({}, {})
+
+    def set_window(self, key, lb, ub):
+        lb_constrs, ub_constrs = self.windows[key]
+        for c in lb_constrs:
+            c.RHS = lb + self.model.getCoeff(c, self.active[key])
+        for c in ub_constrs:
+            c.RHS = ub + self.model.getCoeff(c, self.active[key]) if ub != float('inf') else GRB.INFINITY
+
+    def set_objective_term(self, n, threshold, coeff, increment):
+        model, obj = self.model, self.objectives[n]
+        term = model._objective_terms[n]
+        key = (obj['train'], obj['operation'])
+        term["diff"].RHS = -threshold
+        term["delay"].Obj = coeff
+        if term["penalty"] is None and increment > 0:
+            term["penalty"] = model.addVar(vtype=GRB.BINARY, name=f"penalty_trigger_{key[0]}_{key[1]}")
+        if term["penalty"] is not None:
+            term["penalty"].Obj = increment
+            if term["indicator"] is not None:
+                model.remove(term["indicator"])
+            term["indicator"] = model.addGenConstrIndicator(
+                term["penalty"], True, self.t[key] >= threshold + 1e-5, name=f"penalty_ind_{key[0]}_{key[1]}")
+
+    def apply(self, scenario):
+        # Each change is recorded before it is made, so revert() also undoes a partial apply
+        windows, terms = scenario_changes(self.operations, self.objectives, scenario)
+        changed_windows, changed_terms = self.changed
+        for key, (lb, ub) in windows.items():
+            changed_windows[key] = (lb, ub)
+            self.set_window(key, lb, ub)
+        for n, values in terms.items():
+            changed_terms[n] = values
+            self.set_objective_term(n, values["threshold"], values["coeff"], values["increment"])
+
+    def revert(self):
+        windows, terms = self.changed
+        ops = {(op['train'], op['op_idx']): op for op in self.operations}
+        for key in windows:
+            self.set_window(key, ops[key]['start_lb'], ops[key]['start_ub'])
+        for n in terms:
+            obj = self.objectives[n]
+            term = self.model._objective_terms[n]
+            if obj['increment'] == 0 and term["penalty"] is not None:
+                # Added by the scenario: removed again, so the reused model does not grow
+                if term["indicator"] is not None:
+                    self.model.remove(term["indicator"])
+                self.model.remove(term["penalty"])
+                term["penalty"] = term["indicator"] = None
+            self.set_objective_term(n, obj['threshold'], obj['coeff'], obj['increment'])
+        self.changed = ({}, {})
+
+    def solve(self, scenario, time_limit=None):
+        # Returns {"name", "status", "objective_value", "verified", "gap", "seconds", "events"}
+        start = time.time()
+        model = self.model
+        try:
+            self.apply(scenario)
+            writer = IncumbentWriter(scenario_data(self.data, scenario), None)
+            model._writer = writer
+            model.setParam('TimeLimit', time_limit if time_limit is not None else GRB.INFINITY)
+            model.optimize(mipsol_callback)
+            if model.SolCount > 0:
+                writer.offer(get_solution_events(model._successor_index, model.getAttr('X', self.t),
+                                                 model.getAttr('X', self.active), model.getAttr('X', self.y)))
+            gap = model.MIPGap if model.SolCount > 0 else None
+            status = STATUS_NAMES.get(model.Status, str(model.Status))
+        finally:
+            self.revert()
+        return {"name": scenario.get("name"), "status": status, "objective_value": writer.best_objective,
+                "verified": writer.best_solution is not None, "gap": gap, "seconds": time.time() - start,
+                "events": writer.best_solution["events"] if writer.best_solution else None}
+
+
+# ======================== Batches ========================
+
+_WORKER = {}
+
+
+def _init_worker(data, swapping, params):
+    # One model per worker process, reused by all scenarios it solves
+    _WORKER["model"] = ScenarioModel(data, swapping=swapping, params=params)
+
+
+def _solve_in_worker(scenario, time_limit):
+    return _WORKER["model"].solve(scenario, time_limit)
+
+
+def run_scenarios(data, scenarios, workers=1, time_limit=None, params=None, swapping=False):
+    # data: raw problem dict; scenarios: list of scenario dicts. time_limit is per scenario;
+    # each worker gets an equal share of the cores. Returns the results in scenario order.
+    threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+    params = dict({"Threads": threads, "OutputFlag": 0}, **(params or {}))
+    scenarios = [dict(scenario, name=scenario.get("name", f"scenario {n}")) for n, scenario in enumerate(scenarios)]
+    if workers <= 1:
+        model = ScenarioModel(data, swapping=swapping, params=params)
+        return [model.solve(scenario, time_limit) for scenario in scenarios]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(data, swapping, params)) as pool:
+        return list(pool.map(_solve_in_worker, scenarios, [time_limit] * len(scenarios)))
+
+
+def print_results(results):
+    print(f"{'scenario':<24} {'status':<12} {'objective':>10} {'gap':>8} {'seconds':>8}")
+    for r in results:
+        gap = f"{100 * r['gap']:.2f}%" if r["gap"] is not None else "-"
+        objective = r["objective_value"] if r["objective_value"] is not None else "-"
+        print(f"{str(r['name']):<24} {r['status']:<12} {objective:>10} {gap:>8} {r['seconds']:>8.2f}"
+              f"{'' if r['verified'] or r['objective_value'] is None else ' ❌ not verified'}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Solve a batch of what-if scenarios on one reusable Gurobi model.")
+    parser.add_argument("problem")
+    parser.add_argument("scenarios", help="JSON list of scenarios")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--time-limit", type=float, default=None, help="per scenario")
+    parser.add_argument("--swapping", action="store_true")
+    parser.add_argument("--output", default=None, help="JSON report with the solution of every scenario")
+    args = parser.parse_args()
+
+    with open(args.problem) as f:
+        data = json.load(f)
+    with open(args.scenarios) as f:
+        scenarios = json.load(f)
+    results = run_scenarios(data, scenarios, workers=args.workers, time_limit=args.time_limit,
+                            swapping=args.swapping)
+    print_results(results)
+    if args.output is not None:
+        from displib_anytime import write_json_atomic
+        write_json_atomic(results, args.output)
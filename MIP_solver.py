@@ -1,9 +1,15 @@
 import gurobipy as gp
 from gurobipy import GRB
+import heapq
 import json
 import os
-from READ_BUILD_MODEL import read_displib_json, build_mip_model
-import pandas as pd
+import time
+from MIP_READ_BUILD_MODEL import parse_displib_data, build_mip_model
+from displib_anytime import IncumbentWriter, hint_from_events
+from displib_bounds import lower_bound, format_gap
+from displib_infeasibility import precheck as infeasibility_precheck, print_report as print_infeasibility_report
+from displib_verify import parse_problem
+from displib_presolve import contract_chains, expand_events, merge_equivalent_resources, print_merge_report
 from collections import OrderedDict
 
 def extract_gurobi_stats(model, label="Default"):
@@ -20,18 +26,149 @@ def extract_gurobi_stats(model, label="Default"):
     print(f"\n📊 [{label}] Gurobi 求解性能统计")
     for key, val in stats.items():
         print(f"{key:<20}: {val}")
-    
+
     return stats
 
 
+def build_successor_index(operations):
+    # Per-train entry operation and (train, op) -> successor list, built once per model
+    entry_ops = {}
+    successors = {}
+    for op in operations:
+        successors[op['train'], op['op_idx']] = op['successors']
+        if not op.get('predecessors'):
+            entry_ops.setdefault(op['train'], op['op_idx'])
+    return entry_ops, successors
 
 
-if __name__ == "__main__":
-    # 读取 JSON 数据
-    #filepath = "C:\\Users\陆柯言\\Desktop\\大四第二学期学习资料\\应用运筹project\\displib_instances_testing\\displib_instances_testing\\displib_testinstances_infeasible1.json"
-    #filepath = "C:\\Users\\陆柯言\\Desktop\\大四第二学期学习资料\\应用运筹project\\displib_instances_phase1_v1_1\\displib_instances_phase1\\line3_1.json"
-    filepath = "C:\\Users\\陆柯言\\Desktop\\大四第二学期学习资料\\应用运筹project\\displib_instances_testing\\displib_instances_testing\\displib_testinstances_headway1.json"
-    displib_data = read_displib_json(filepath)
+def get_solution_events(successor_index, t_val, active_val, y_val):
+    # t_val / active_val / y_val: dicts of variable values, from model.getAttr("X", ...)
+    # after optimize() or model.cbGetSolution(...) inside a MIPSOL callback.
+    # Each train's path is followed through its successor lists, so the extraction is
+    # linear in the length of the chosen paths.
+    entry_ops, successors = successor_index
+    train_events = []
+    for train_idx, current_op in entry_ops.items():
+        events = []
+        while current_op is not None:
+            if active_val[train_idx, current_op] < 0.5 or t_val[train_idx, current_op] >= 1e6:
+                break
+            events.append(OrderedDict([
+                ("operation", current_op),
+                ("time", int(round(t_val[train_idx, current_op]))),
+                ("train", train_idx)
+            ]))
+            current_op = next(
+                (s for s in successors[train_idx, current_op] if y_val[train_idx, current_op, s] > 0.5), None
+            )
+        train_events.append(events)
+
+    # Each train's events are ordered by time along its route (zero-duration operations can
+    # give equal times, where the operation indices need not increase), so a k-way merge on
+    # time alone gives the global order without re-sorting; heapq.merge is stable, so equal
+    # times keep the route order within a train and the train order between trains
+    return list(heapq.merge(*train_events, key=lambda x: x['time']))
+
+
+def mipsol_callback(model, where):
+    # Anytime mode: verify and write every new incumbent as soon as Gurobi finds it
+    if where == GRB.Callback.MIPSOL:
+        events = get_solution_events(
+            model._successor_index,
+            model.cbGetSolution(model._t), model.cbGetSolution(model._active), model.cbGetSolution(model._y)
+        )
+        model._writer.offer(original_events(model, events))
+    elif where == GRB.Callback.MIPNODE and model._incoming is not None:
+        # An incumbent found elsewhere (e.g. the CP-SAT side of displib_race) is handed to
+        # Gurobi as a partial solution; its heuristics complete the order variables
+        events = model._incoming()
+        if events:
+            start = start_values(model, model._operations, hint_from_events(events), model._expansion)
+            model.cbSetSolution([var for var, _ in start], [value for _, value in start])
+            model.cbUseSolution()
+
+
+def original_events(model, events):
+    # Events of the contracted model (solve_mip(contract=True)) map back to the original operations
+    if model._expansion is None:
+        return events
+    return expand_events(model._expansion, events)
+
+
+def start_values(model, operations, hint, expansion=None):
+    # [(var, value)] for a hint: route operations start at the hinted times, all other
+    # operations of the hinted trains are inactive; times are left to Gurobi where the hint
+    # has no value. With contraction a macro-operation takes the time of its first member.
+    if expansion is not None:
+        hint = {(train, macro): hint[train, members[0][0]]
+                for (train, macro), members in expansion.items() if (train, members[0][0]) in hint}
+    trains = {train for train, _ in hint}
+    values = []
+    for op in operations:
+        key = (op['train'], op['op_idx'])
+        if op['train'] not in trains:
+            continue
+        values.append((model._active[key], 1 if key in hint else 0))
+        if key in hint:
+            values.append((model._t[key], hint[key]))
+        for s in op['successors']:
+            values.append((model._y[key + (s,)], 1 if key in hint and (op['train'], s) in hint else 0))
+    return values
+
+
+def set_mip_start(model, operations, hint, expansion=None):
+    for var, value in start_values(model, operations, hint, expansion):
+        var.Start = value
+
+
+def set_params(model, time_limit=None, params=None):
+    model.setParam('MIPGap', 0.001)
+    model.setParam('OptimalityTol', 1e-9)
+    model.setParam('FeasibilityTol', 1e-9)
+    # big-M = 1e6: with the default IntFeasTol (1e-5) a "zero" binary can relax a conflict by ~10 time units
+    model.setParam('IntFeasTol', 1e-9)
+    if time_limit is not None:
+        model.setParam('TimeLimit', time_limit)
+    for name, value in (params or {}).items():
+        model.setParam(name, value)
+
+
+def solve_mip(filepath, solution_path=None, time_limit=None, params=None, listener=None, swapping=False,
+              symmetry=False, fix_orders=False, contract=False, merge_resources=False, hint=None,
+              precheck=True, incoming=None, paths=None):
+    # params: Gurobi parameters by name, applied after the defaults below
+    # listener(objective, solution): called for every verified improving incumbent
+    # merge_resources: keep one representative per group of equivalent resources
+    # hint: {(train, op): start time} of one route per train (e.g. from displib_lagrangian),
+    # passed to Gurobi as a partial MIP start
+    # contract: solve on macro-operations (displib_presolve.contract_chains); incumbents are
+    # expanded back to the original operations before they are verified and written
+    # precheck: if propagation proves the instance infeasible, no model is built and
+    # (None, writer) is returned
+    # incoming: callable polled at MIP nodes, returning the events of an external incumbent
+    # (original operations) or None; used by displib_race to share incumbents
+    # paths: route choice by route columns (path formulation); True or a dict of options for
+    # MIP_column_generation.generate_columns
+    # Stage timings (read, build, solve) are left in model._timings, e.g. for displib_results
+    stage_start = time.time()
+    timings = {}
+    with open(filepath) as f:
+        data = original_data = json.load(f)
+    if precheck:
+        report = infeasibility_precheck(data)
+        if report["infeasible"]:
+            print_infeasibility_report(report)
+            return None, IncumbentWriter(data, solution_path, listener=listener)
+    if merge_resources:
+        data, representative = merge_equivalent_resources(data)
+        print_merge_report(representative)
+    expansion = None
+    if contract:
+        data, expansion = contract_chains(data)
+        print(f"🔗 {len(expansion)} macro-operations for "
+              f"{sum(len(members) for members in expansion.values())} operations")
+    displib_data = parse_displib_data(data)
+    timings["read"] = time.time() - stage_start
 
     print("✅ JSON读取成功！")
 
@@ -43,17 +180,71 @@ if __name__ == "__main__":
     time_windows = displib_data['time_windows']
     objectives = displib_data['objectives']
 
+    routes = None
+    if paths:
+        from MIP_column_generation import generate_columns
+        columns = generate_columns(displib_data, swapping=swapping, symmetry=symmetry, fix_orders=fix_orders,
+                                   **(paths if isinstance(paths, dict) else {}))
+        routes = columns["routes"]
+        print(f"🧮 {columns['columns']} route columns after {columns['iterations']} pricing rounds "
+              f"({columns['seconds']:.2f}s)")
+
     model, t, active, y = build_mip_model(
-        trains, operations, conflict_pairs, train_paths, headways, time_windows, objectives
+        trains, operations, conflict_pairs, train_paths, headways, time_windows, objectives,
+        swapping=swapping,
+        symmetry=symmetry,
+        fix_orders=fix_orders,
+        routes=routes
     )
+    model.update()
+    timings["build"] = time.time() - stage_start - timings["read"]
 
-    model.setParam('MIPGap', 0.001)
-    model.setParam('OptimalityTol', 1e-9)
-    model.setParam('FeasibilityTol', 1e-9)
-    model.optimize()
+    if hint:
+        set_mip_start(model, operations, hint, expansion)
+
+    set_params(model, time_limit, params)
+
+    # Combinatorial bound (displib_bounds) of the original problem, for gaps before Gurobi's bound is tight
+    problem = parse_problem(original_data)
+    writer = IncumbentWriter(problem, solution_path, listener=listener, lower_bound=lower_bound(problem)["lower_bound"])
+    model._writer = writer
+    model._expansion = expansion
+    model._successor_index = build_successor_index(operations)
+    model._operations = operations
+    model._incoming = incoming
+    model._timings = timings
+    model.optimize(mipsol_callback)
+    timings["solve"] = model.Runtime
+
+    # The final incumbent can differ from the last MIPSOL one after Gurobi's polishing
+    if model.SolCount > 0:
+        writer.offer(original_events(model, get_solution_events(
+            model._successor_index, model.getAttr('X', t), model.getAttr('X', active), model.getAttr('X', y)
+        )))
+    if writer.best_objective is not None:
+        print(f"📏 objective {writer.best_objective}, combinatorial bound {writer.lower_bound} "
+              f"(gap {format_gap(writer.best_objective, writer.lower_bound)}), Gurobi bound {model.ObjBound:.4f}")
+    timings["total"] = time.time() - stage_start
+    return model, writer
+
+
+if __name__ == "__main__":
+    # 读取 JSON 数据
+    #filepath = "C:\\Users\陆柯言\\Desktop\\大四第二学期学习资料\\应用运筹project\\displib_instances_testing\\displib_instances_testing\\displib_testinstances_infeasible1.json"
+    #filepath = "C:\\Users\\陆柯言\\Desktop\\大四第二学期学习资料\\应用运筹project\\displib_instances_phase1_v1_1\\displib_instances_phase1\\line3_1.json"
+    filepath = "C:\\Users\\陆柯言\\Desktop\\大四第二学期学习资料\\应用运筹project\\displib_instances_testing\\displib_instances_testing\\displib_testinstances_headway1.json"
+
+    output_dir = r"C:\\Users\\陆柯言\\Desktop\\大四第二学期学习资料\\应用运筹project\\displib_instances_phase1_v1_1\\solution"
+    output_path = os.path.join(output_dir, "headway.json")
+
+    # Every verified improving incumbent is written to output_path while solving,
+    # so a time-limited or killed run keeps the best solution found so far.
+    model, writer = solve_mip(filepath, solution_path=output_path)
 
     label = "With Cutting Planes"
-    stats = extract_gurobi_stats(model, label=label)
+    if model is not None and model.SolCount > 0:
+        stats = extract_gurobi_stats(model, label=label)
+##    import pandas as pd
 ##    output_csv = r"C:\\Users\\陆柯言\\Desktop\\大四第二学期学习资料\\应用运筹project\\displib_instances_phase1_v1_1\\stats\\critical_heuristics1.csv"
 ##    if os.path.exists(output_csv):
 ##        df_prev = pd.read_csv(output_csv)
@@ -63,74 +254,11 @@ if __name__ == "__main__":
 ##    df_new.to_csv(output_csv, index=False)
 ##    print(f"✅ 求解统计结果写入：{output_csv}")
 
-    if model.status == GRB.OPTIMAL:
+    if model is not None and model.status == GRB.OPTIMAL:
         print("✅ 最优解找到！")
-
-        def get_op_end_time(train_id, op_id, start_time):
-            for op in operations:
-                if op['train'] == train_id and op['op_idx'] == op_id:
-                    dur = op['min_duration']
-                    release = max(op['resource_release_times']) if op['resource_release_times'] else 0
-                    return start_time + dur + release
-            return start_time
-
-        solution = {
-            "objective_value": round(model.ObjVal, 6),
-            "events": []
-        }
-
-        for train_idx in range(len(trains)):
-            ops_in_train = [op for op in operations if op['train'] == train_idx]
-            start_ops = [op for op in ops_in_train if not op.get('predecessors')]
-            if not start_ops:
-                continue
-            current_op = start_ops[0]['op_idx']
-            while True:
-                if active[train_idx, current_op].X < 0.5 or t[train_idx, current_op].X >= 1e6:
-                    break
-                solution["events"].append({
-                    "train": train_idx,
-                    "operation": current_op,
-                    "time": int(round(t[train_idx, current_op].X))
-                })
-                next_op = None
-                for s in [op['op_idx'] for op in operations if op['train'] == train_idx]:
-                    if (train_idx, current_op, s) in y.keys() and y[train_idx, current_op, s].X > 0.5:
-                        next_op = s
-                        break
-                if next_op is None:
-                    break
-                current_op = next_op
-
-        # Swapping
-        def get_release_end(event):
-            for op in operations:
-                if op['train'] == event['train'] and op['op_idx'] == event['operation']:
-                    release = max(op['resource_release_times']) if op['resource_release_times'] else 0
-                    return event['time'] + op['min_duration'] + release
-            return event['time']
-
-        solution["events"] = sorted(
-            solution["events"],
-            key=lambda x: (x['time'], x['operation'], x['train'])
-        )
-        solution["events"] = [
-            OrderedDict([
-                ("operation", e["operation"]),
-                ("time", e["time"]),
-                ("train", e["train"])
-            ]) for e in solution["events"]
-        ]
-
-        output_dir = r"C:\\Users\\陆柯言\\Desktop\\大四第二学期学习资料\\应用运筹project\\displib_instances_phase1_v1_1\\solution"
-        os.makedirs(output_dir, exist_ok=True)
-
-        output_path = os.path.join(output_dir, "headway.json")
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(solution, f, indent=4, ensure_ascii=False)
-
+    if writer.best_solution is not None:
         print(f"✅ 解决方案已保存：{output_path}")
-
     else:
-        print("❌ 没有找到最优解！")
-
+        print("❌ 没有找到可行解！")
+        if writer.last_error is not None:
+            print(f"  最后一个被拒绝的解：{writer.last_error}")
@@ -0,0 +1,88 @@
+"""
+Startup-time benchmark for displib_cli.py.
+Usage: python benchmarks/bench_startup.py [PROBLEMFILE] [--repeat N]
+
+Each command is run as a fresh interpreter (as scripted sweeps do) and its best-of-N
+wall time is compared with a budget measured *on top of* a bare `python -c pass`, so
+the budgets hold across machines. `-X importtime` is used to check that commands do not
+import heavy backends they do not need. Exits with status 1 if any budget is exceeded.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "displib_cli.py")
+
+HEAVY_MODULES = ["ortools", "gurobipy", "matplotlib", "numpy", "pandas"]
+
+TINY_PROBLEM = """{"trains":[[{"start_ub":0,"min_duration":5,"resources":[{"resource":"r"}],"successors":[1]},
+{"min_duration":5,"successors":[]}]],"objective":[{"type":"op_delay","train":0,"operation":1,"coeff":1}]}"""
+TINY_SOLUTION = """{"objective_value":5,"events":[{"time":0,"train":0,"operation":0},{"time":5,"train":0,"operation":1}]}"""
+
+
+def run_time(argv, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def imported_modules(argv):
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + argv[1:], cwd=ROOT,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    names = set()
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            names.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("problem", nargs="?", default=None, help="instance for the stats command")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    problem = os.path.join(tmp, "problem.json")
+    solution = os.path.join(tmp, "solution.json")
+    with open(problem, "w") as f:
+        f.write(TINY_PROBLEM)
+    with open(solution, "w") as f:
+        f.write(TINY_SOLUTION)
+    stats_problem = args.problem or problem
+
+    py = sys.executable
+    # (name, argv, budget in seconds over bare interpreter startup, modules that must not be imported)
+    cases = [
+        ("--help", [py, CLI, "--help"], 0.10, HEAVY_MODULES),
+        ("verify", [py, CLI, "verify", problem, solution], 0.15, HEAVY_MODULES),
+        ("stats (estimate)", [py, CLI, "stats", stats_problem], 0.20, HEAVY_MODULES),
+        ("solve-cp --help", [py, CLI, "solve-cp", "--help"], 0.10, HEAVY_MODULES),
+        ("solve-mip --help", [py, CLI, "solve-mip", "--help"], 0.10, HEAVY_MODULES),
+        ("plot --help", [py, CLI, "plot", "--help"], 0.10, HEAVY_MODULES),
+    ]
+
+    baseline = run_time([py, "-c", "pass"], args.repeat)
+    print(f"bare interpreter: {baseline * 1000:.0f} ms")
+    failed = False
+    for name, argv, budget, forbidden in cases:
+        elapsed = run_time(argv, args.repeat) - baseline
+        leaked = sorted(set(forbidden) & imported_modules(argv))
+        ok = elapsed <= budget and not leaked
+        failed |= not ok
+        status = "ok" if ok else "FAIL"
+        note = f"  imports {', '.join(leaked)}" if leaked else ""
+        print(f"{status:<5}{name:<20}{elapsed * 1000:8.0f} ms  (budget {budget * 1000:.0f} ms){note}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Anytime solution output shared by the CP-SAT (main.py) and Gurobi (MIP_solver.py) backends.
+
+Every incumbent reported by a solver callback is checked with displib_verify and, if it is
+valid and better than the best one written so far, atomically replaces the solution file.
+A run that is killed or hits its time limit therefore always leaves the best-known valid
+solution on disk.
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from displib_verify import (
+    Event, Solution, SolutionValidationError, INFINITY, parse_problem, verify_solution
+)
+
+
+def write_json_atomic(obj, path, indent=4):
+    # Write to a temporary file in the same directory and rename over the target,
+    # so readers never observe a half-written solution.
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def order_simultaneous_events(problem, events):
+    # Solvers only give event times, but displib_verify processes events in list order:
+    # when one train leaves a resource at the same instant another train enters it, the
+    # leaving event must come first. Events with equal times are topologically sorted on
+    # "releases a resource that the other acquires", keeping the given order otherwise
+    # (and for genuine cycles).
+    events = sorted(events, key=lambda e: e["time"])
+    prev_op = {}
+    ordered = []
+    start = 0
+    while start < len(events):
+        end = start
+        while end < len(events) and events[end]["time"] == events[start]["time"]:
+            end += 1
+        group = events[start:end]
+        if len(group) > 1:
+            group = _order_group(problem, group, prev_op)
+        for e in group:
+            prev_op[e["train"]] = e["operation"]
+        ordered.extend(group)
+        start = end
+    return ordered
+
+
+def _order_group(problem, group, prev_op):
+    def resources(train, op):
+        if op is None or not 0 <= train < len(problem.trains) or not 0 <= op < len(problem.trains[train]):
+            return set()
+        return {u.resource for u in problem.trains[train][op].resources}
+
+    # Within a group a train can have several (zero-duration) events; its released
+    # resources are those of the operation it held just before each event.
+    released, acquired = [], []
+    last = dict(prev_op)
+    for e in group:
+        released.append(resources(e["train"], last.get(e["train"])))
+        acquired.append(resources(e["train"], e["operation"]))
+        last[e["train"]] = e["operation"]
+
+    n = len(group)
+    succs = [[] for _ in range(n)]
+    indegree = [0] * n
+    for a in range(n):
+        for b in range(n):
+            if a == b:
+                continue
+            same_train_before = group[a]["train"] == group[b]["train"] and a < b
+            frees_for_b = group[a]["train"] != group[b]["train"] and released[a] & acquired[b]
+            if same_train_before or frees_for_b:
+                succs[a].append(b)
+                indegree[b] += 1
+
+    ready = [i for i in range(n) if indegree[i] == 0]
+    order = []
+    while ready:
+        i = min(ready)
+        ready.remove(i)
+        order.append(i)
+        for j in succs[i]:
+            indegree[j] -= 1
+            if indegree[j] == 0:
+                ready.append(j)
+    if len(order) < n:
+        return group
+    return [group[i] for i in order]
+
+
+def hint_from_events(events):
+    # {(train, op): start time} of a solution, the hint format of both solvers
+    return {(e["train"], e["operation"]): e["time"] for e in events}
+
+
+class IncumbentWriter:
+    def __init__(self, problem, solution_path, listener=None, lower_bound=None):
+        # `problem` is a problem file path, a raw problem dict, or an already parsed Problem
+        # `lower_bound` (e.g. from displib_bounds) is used to report the gap of every incumbent
+        if isinstance(problem, str):
+            with open(problem) as f:
+                problem = json.load(f)
+        if isinstance(problem, dict):
+            problem = parse_problem(problem)
+        self.problem = problem
+        self.solution_path = solution_path
+        self.listener = listener
+        self.lower_bound = lower_bound
+        self.best_objective = None
+        self.best_solution = None
+        self.num_offered = 0
+        self.num_rejected = 0
+        self.last_error = None
+        self.start_time = time.time()
+
+    def offer(self, events):
+        # events: list of {"operation", "time", "train"} dicts; simultaneous events are
+        # reordered so that resources are released before they are acquired.
+        # Returns True if the incumbent was valid, improving and written.
+        self.num_offered += 1
+        events = order_simultaneous_events(self.problem, events)
+        solution = Solution(INFINITY, [Event(e["time"], e["train"], e["operation"]) for e in events])
+        try:
+            value = verify_solution(self.problem, solution)
+        except SolutionValidationError as e:
+            self.num_rejected += 1
+            self.last_error = str(e)
+            return False
+
+        if self.best_objective is not None and value >= self.best_objective:
+            return False
+
+        self.best_objective = value
+        self.best_solution = {"objective_value": value, "events": list(events)}
+        if self.solution_path is not None:
+            write_json_atomic(self.best_solution, self.solution_path)
+        gap = ""
+        if self.lower_bound is not None:
+            from displib_bounds import format_gap
+            gap = f" (gap {format_gap(value, self.lower_bound)} to bound {self.lower_bound})"
+        print(f"💾 [{time.time() - self.start_time:.2f}s] new incumbent with objective {value}{gap}")
+        if self.listener is not None:
+            self.listener(value, self.best_solution)
+        return True
@@ -0,0 +1,231 @@
+"""
+Fast combinatorial lower bounds for DISPLIB instances.
+
+The per-train bound drops all conflicts between trains: each train runs alone and takes the
+route and times minimising its own op_delay cost (a label-setting DP over its successor DAG).
+The optional bottleneck bound puts back one resource that several trains cannot avoid: they
+have to pass it one after the other, so they are assigned to the earliest possible entry
+slots of that resource. Both bounds only need the parsed problem and run in milliseconds.
+Usage: displib_bounds.py PROBLEMFILE [SOLUTIONFILE] [--bottleneck]
+"""
+
+import json
+import time
+from collections import defaultdict
+
+from displib_verify import INFINITY, parse_problem
+
+
+# ======================== Per-train bound ========================
+
+def _delay_cost(component, t):
+    # Same as displib_verify.verify_solution
+    return component.coeff * max(0, t - component.threshold) + component.increment * (1 if t >= component.threshold else 0)
+
+
+def train_labels(ops, components, start_lb=None):
+    # Pareto labels (time, cost) per operation for a train running alone, with the cost of
+    # the objective components met so far. Costs never decrease with time and upper bounds
+    # never get easier later, so each route is best run as early as possible; labels are
+    # kept per operation because different routes arrive at different times and costs.
+    # start_lb: optional {op index: extra lower bound on its start}.
+    # Operations are in topological order (checked by displib_verify.parse_problem).
+    labels = [[] for _ in ops]
+
+    def arrive(op_idx, t, cost):
+        op = ops[op_idx]
+        t = max(t, op.start_lb, (start_lb or {}).get(op_idx, 0))
+        if t > op.start_ub:
+            return
+        if op_idx in components:
+            cost += sum(_delay_cost(c, t) for c in components[op_idx])
+        labels[op_idx].append((t, cost))
+
+    arrive(0, 0, 0)
+    for op_idx, op in enumerate(ops):
+        if not labels[op_idx]:
+            continue
+        # Keep the labels not dominated by an earlier and cheaper one
+        pareto = []
+        for t, cost in sorted(labels[op_idx]):
+            if not pareto or cost < pareto[-1][1]:
+                pareto.append((t, cost))
+        labels[op_idx] = pareto
+        for s in op.successors:
+            for t, cost in pareto:
+                arrive(s, t + op.min_duration, cost)
+    return labels
+
+
+def train_lower_bound(ops, components, start_lb=None):
+    # Minimum cost of the train on its own, None if no route fits the time windows
+    labels = train_labels(ops, components, start_lb)
+    costs = [cost for op_idx, op in enumerate(ops) if not op.successors for _, cost in labels[op_idx]]
+    return min(costs) if costs else None
+
+
+def _components_by_train(problem):
+    components = defaultdict(lambda: defaultdict(list))
+    for c in problem.objective:
+        components[c.train][c.operation].append(c)
+    return components
+
+
+# ======================== Resource bottleneck bound ========================
+
+def _mandatory_ops(ops):
+    # Operations on every route: #paths(0 -> j) * #paths(j -> exit) == #routes
+    into = [0] * len(ops)
+    into[0] = 1
+    for op_idx, op in enumerate(ops):
+        for s in op.successors:
+            into[s] += into[op_idx]
+    out = [0] * len(ops)
+    for op_idx in reversed(range(len(ops))):
+        out[op_idx] = sum(out[s] for s in ops[op_idx].successors) if ops[op_idx].successors else 1
+    return {op_idx for op_idx in range(len(ops)) if into[op_idx] * out[op_idx] == out[0]}
+
+
+def _assignment_cost(cost):
+    # Minimum cost perfect matching of a square matrix (Hungarian algorithm with potentials)
+    n = len(cost)
+    u, v = [0] * (n + 1), [0] * (n + 1)
+    match, way = [0] * (n + 1), [0] * (n + 1)
+    for row in range(1, n + 1):
+        match[0] = row
+        col0 = 0
+        minv = [float("inf")] * (n + 1)
+        used = [False] * (n + 1)
+        while True:
+            used[col0] = True
+            row0, delta, col1 = match[col0], float("inf"), 0
+            for col in range(1, n + 1):
+                if not used[col]:
+                    cur = cost[row0 - 1][col - 1] - u[row0] - v[col]
+                    if cur < minv[col]:
+                        minv[col], way[col] = cur, col0
+                    if minv[col] < delta:
+                        delta, col1 = minv[col], col
+            for col in range(n + 1):
+                if used[col]:
+                    u[match[col]] += delta
+                    v[col] -= delta
+                else:
+                    minv[col] -= delta
+            col0 = col1
+            if match[col0] == 0:
+                break
+        while col0:
+            col1 = way[col0]
+            match[col0] = match[col1]
+            col0 = col1
+    return sum(cost[match[col] - 1][col - 1] for col in range(1, n + 1))
+
+
+def bottleneck_bound(problem, per_train, max_resources=10):
+    # For a resource r that trains T_r cannot avoid (an operation using it is on every
+    # route), with earliest entry e_i and minimum occupation p_i = duration + release time:
+    # the k-th train to enter r enters no earlier than slot
+    #   s_k = max(k-th smallest e_i, s_{k-1} + min p_i),
+    # so the trains of T_r are matched to the slots, each at its cheapest cost when entering
+    # r no earlier than its slot. Trains outside T_r keep their per-train bound.
+    # Returns (bound, resource) for the best of the max_resources most loaded resources.
+    components = _components_by_train(problem)
+    users = defaultdict(dict)  # resource -> {train: (op index, earliest start, occupation)}
+    for train_idx, ops in enumerate(problem.trains):
+        labels = train_labels(ops, components[train_idx])
+        for op_idx in sorted(_mandatory_ops(ops)):
+            if not labels[op_idx]:
+                continue
+            for usage in ops[op_idx].resources:
+                if train_idx not in users[usage.resource]:
+                    users[usage.resource][train_idx] = (op_idx, labels[op_idx][0][0],
+                                                        ops[op_idx].min_duration + usage.release_time)
+
+    candidates = sorted((r for r in users if len(users[r]) > 1),
+                        key=lambda r: -sum(p for _, _, p in users[r].values()))[:max_resources]
+    total = sum(per_train)
+    best = (total, None)
+    for resource in candidates:
+        trains = sorted(users[resource])
+        earliest = sorted(users[resource][i][1] for i in trains)
+        gap = min(users[resource][i][2] for i in trains)
+        slots = []
+        for e in earliest:
+            slots.append(max(e, slots[-1] + gap) if slots else e)
+
+        cost = []
+        for train_idx in trains:
+            op_idx = users[resource][train_idx][0]
+            row, cache = [], {}
+            for s in slots:
+                if s not in cache:
+                    value = train_lower_bound(problem.trains[train_idx], components[train_idx], {op_idx: s})
+                    cache[s] = INFINITY if value is None else value
+                row.append(cache[s])
+            cost.append(row)
+        matched = _assignment_cost(cost)
+        if matched >= INFINITY:
+            continue  # some train fits no slot; leave infeasibility to the solvers
+        bound = total - sum(per_train[i] for i in trains) + matched
+        if bound > best[0]:
+            best = (bound, resource)
+    return best
+
+
+# ======================== Reporting ========================
+
+def lower_bound(problem, bottleneck=False, max_resources=10):
+    # problem: parsed Problem or raw problem dict
+    # Returns {"lower_bound", "per_train", "bottleneck_resource", "infeasible", "seconds"};
+    # lower_bound is None when some train has no route within its time windows.
+    if isinstance(problem, dict):
+        problem = parse_problem(problem)
+    start = time.time()
+    components = _components_by_train(problem)
+    per_train = [train_lower_bound(ops, components[train_idx]) for train_idx, ops in enumerate(problem.trains)]
+    result = {"lower_bound": None, "per_train": per_train, "bottleneck_resource": None,
+              "infeasible": any(b is None for b in per_train)}
+    if not result["infeasible"]:
+        result["lower_bound"] = sum(per_train)
+        if bottleneck:
+            result["lower_bound"], result["bottleneck_resource"] = bottleneck_bound(problem, per_train, max_resources)
+    result["seconds"] = time.time() - start
+    return result
+
+
+def relative_gap(objective, bound):
+    # Same convention as Gurobi's MIPGap: |objective - bound| / |objective|
+    if objective is None or bound is None:
+        return None
+    if objective == 0:
+        return 0.0 if bound == 0 else float("inf")
+    return abs(objective - bound) / abs(objective)
+
+
+def format_gap(objective, bound):
+    gap = relative_gap(objective, bound)
+    return "n/a" if gap is None else f"{100 * gap:.2f}%"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Combinatorial lower bound of a DISPLIB instance.")
+    parser.add_argument("problem")
+    parser.add_argument("solution", nargs="?", default=None, help="report the gap of this solution")
+    parser.add_argument("--bottleneck", action="store_true", help="add the resource bottleneck bound")
+    args = parser.parse_args()
+
+    with open(args.problem) as f:
+        result = lower_bound(json.load(f), bottleneck=args.bottleneck)
+    if result["infeasible"]:
+        print("❌ Some train has no route within its time windows, the instance is infeasible")
+    else:
+        print(f"📏 Lower bound {result['lower_bound']} ({1000 * result['seconds']:.1f} ms)")
+        if result["bottleneck_resource"] is not None:
+            print(f"  per-train bound {sum(result['per_train'])}, raised by resource {result['bottleneck_resource']}")
+    if args.solution is not None:
+        with open(args.solution) as f:
+            objective = json.load(f)["objective_value"]
+        print(f"  solution objective {objective}, gap {format_gap(objective, result['lower_bound'])}")
@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+"""
+Single command line entry point for the DISPLIB tools.
+Usage: displib_cli.py {verify,verify-batch,solve-cp,solve-mip,solve-rf,solve-ls,race,whatif,tune,pool,results,plot,check,stats} ...
+
+Solver and plotting backends (OR-Tools, gurobipy, matplotlib) are only imported by the
+subcommand that needs them, so short commands such as `verify` and `stats` start fast.
+Startup budgets are checked by benchmarks/bench_startup.py.
+"""
+
+import argparse
+import json
+import sys
+
+
+def cmd_verify(args):
+    import displib_verify
+    displib_verify.main(args.problem, args.solution)
+
+
+def _tuned(args):
+    # Parameters measured by displib_tune for the problem's family, if a report is given
+    if args.tuned is None:
+        return None
+    from displib_tune import tuned_params
+    params = tuned_params(args.tuned, args.problem)
+    print(f"🎛 tuned parameters: {params or 'none for this family'}")
+    return params
+
+
+def cmd_verify_batch(args):
+    import displib_verify
+    sys.exit(displib_verify.batch_main(args.problem, args.solutions, args.workers, args.report))
+
+
+def cmd_solve_cp(args):
+    from main import solve_displib_instance
+    params = _tuned(args)
+    result = solve_displib_instance(args.problem, time_limit=args.time_limit, solution_path=args.output,
+                                    params=params, swapping=args.swapping, symmetry=args.symmetry,
+                                    fix_orders=args.fix_orders, merge_resources=args.merge_resources)
+    if not args.no_record:
+        from displib_results import DEFAULT_DB, record_cp
+        db = args.record or DEFAULT_DB
+        print(f"🗄 recorded run {record_cp(args.problem, params, result, db_path=db)} in {db}")
+    if args.output is None:
+        print(json.dumps(result, indent=2))
+    if not result["events"]:
+        sys.exit(1)
+
+
+def cmd_solve_mip(args):
+    from MIP_solver import solve_mip
+    params = _tuned(args)
+    model, writer = solve_mip(args.problem, solution_path=args.output, time_limit=args.time_limit,
+                              params=params, swapping=args.swapping, symmetry=args.symmetry, fix_orders=args.fix_orders,
+                              contract=args.contract, merge_resources=args.merge_resources,
+                              paths=args.paths)
+    if not args.no_record:
+        from displib_results import DEFAULT_DB, record_mip
+        db = args.record or DEFAULT_DB
+        print(f"🗄 recorded run {record_mip(args.problem, params, model, writer, db_path=db)} in {db}")
+    if writer.best_solution is None:
+        sys.exit(1)
+    if args.output is None:
+        print(json.dumps(writer.best_solution, indent=2))
+
+
+def cmd_solve_rf(args):
+    from MIP_relax_and_fix import relax_and_fix
+    model, writer = relax_and_fix(args.problem, solution_path=args.output, batch_size=args.batch_size,
+                                  order=args.order, group_size=args.group_size, overlap=args.overlap,
+                                  sweeps=args.sweeps, time_limit=args.time_limit, swapping=args.swapping,
+                                  symmetry=args.symmetry, fix_orders=args.fix_orders)
+    if writer.best_solution is None:
+        sys.exit(1)
+    if args.output is None:
+        print(json.dumps(writer.best_solution, indent=2))
+
+
+def cmd_solve_ls(args):
+    from displib_localsearch import local_search
+    initial = None
+    if args.initial is not None:
+        with open(args.initial) as f:
+            initial = json.load(f)["events"]
+    with open(args.problem) as f:
+        result = local_search(json.load(f), initial, time_limit=args.time_limit or 10.0,
+                              solution_path=args.output, seed=args.seed)
+    if not result["verified"]:
+        sys.exit(1)
+    if args.output is None:
+        print(json.dumps({"objective_value": result["objective_value"], "events": result["events"]}, indent=2))
+
+
+def cmd_race(args):
+    from displib_race import race
+    result = race(args.problem, time_limit=args.time_limit or 60.0, solution_path=args.output, backends=args.backends,
+                  threads=args.threads, swapping=args.swapping, symmetry=args.symmetry, fix_orders=args.fix_orders,
+                  merge_resources=args.merge_resources)
+    print(f"🏁 best objective {result['objective_value']} from {result['winner']}"
+          f"{' (optimal)' if result['optimal'] else ''}; {result['statuses']}")
+    if not result["verified"]:
+        sys.exit(1)
+    if args.output is None:
+        print(json.dumps({"objective_value": result["objective_value"], "events": result["events"]}, indent=2))
+
+
+def cmd_whatif(args):
+    from MIP_scenarios import run_scenarios, print_results
+    from displib_anytime import write_json_atomic
+    with open(args.problem) as f:
+        data = json.load(f)
+    with open(args.scenarios) as f:
+        scenarios = json.load(f)
+    results = run_scenarios(data, scenarios, workers=args.workers, time_limit=args.time_limit, swapping=args.swapping)
+    print_results(results)
+    if args.output is not None:
+        write_json_atomic(results, args.output)
+
+
+def cmd_tune(args):
+    from displib_tune import tune, print_summary
+    from displib_anytime import write_json_atomic
+    space = None
+    if args.space is not None:
+        with open(args.space) as f:
+            space = json.load(f)
+    report = tune(args.instances, backend=args.backend, space=space, strategy=args.strategy, samples=args.samples,
+                  seeds=args.seeds, time_limit=args.time_limit, workers=args.workers)
+    print_summary(report)
+    if args.output is not None:
+        write_json_atomic(report, args.output)
+
+
+def cmd_pool(args):
+    from displib_pool import solution_pool
+    pool = solution_pool(args.problem, backend=args.backend, size=args.size, gap=args.gap,
+                         time_limit=args.time_limit, pool_path=args.output, swapping=args.swapping)
+    if not pool.solutions():
+        sys.exit(1)
+
+
+def cmd_results(args):
+    import displib_results
+    sys.exit(displib_results.main(args.rest))
+
+
+def cmd_plot(args):
+    from displib_plot import plot_train_gantt, plot_resource_timeline, print_resource_report
+    if args.by_resource:
+        if args.problem is None:
+            sys.exit("plot --by-resource needs --problem")
+        report = plot_resource_timeline(args.solution, args.problem, output_path=args.output,
+                                        time_window=args.window, title=args.title)
+        print_resource_report(report)
+    else:
+        plot_train_gantt(args.solution, args.problem, output_path=args.output, time_window=args.window,
+                         title=args.title)
+
+
+def cmd_check(args):
+    from displib_infeasibility import diagnose, print_report
+    with open(args.problem) as f:
+        report = diagnose(json.load(f), deep=args.deep, time_limit=args.time_limit)
+    print_report(report)
+    if report["infeasible"]:
+        sys.exit(1)
+
+
+def cmd_stats(args):
+    from displib_model_size import dry_run
+    reports = dry_run(args.problem, backend=args.backend, build=args.build, top=args.top)
+    if args.max_mb is not None and any(r["memory_mb"] is not None and r["memory_mb"] > args.max_mb for r in reports):
+        sys.exit(2)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="displib_cli.py", description="DISPLIB solving and verification tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("verify", help="verify a solution (or only parse a problem)")
+    p.add_argument("problem")
+    p.add_argument("solution", nargs="?", default=None)
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser("verify-batch", help="verify many solutions of one problem in parallel")
+    p.add_argument("problem")
+    p.add_argument("solutions", nargs="+", help="solution files, directories or solution pool files")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--report", default=None, help="JSON report file")
+    p.set_defaults(func=cmd_verify_batch)
+
+    for name, func, help_text in [("solve-cp", cmd_solve_cp, "solve with the CP-SAT model (main.py)"),
+                                  ("solve-mip", cmd_solve_mip, "solve with the Gurobi model (MIP_solver.py)")]:
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("problem")
+        p.add_argument("--time-limit", type=float, default=None)
+        p.add_argument("--output", default=None, help="solution file, rewritten with every verified incumbent")
+        p.add_argument("--swapping", action="store_true", help="add swapping (head-on) conflict constraints")
+        p.add_argument("--symmetry", action="store_true", help="order trains with identical routes (FIFO)")
+        p.add_argument("--fix-orders", action="store_true", help="fix or drop conflict orders decided by time windows")
+        p.add_argument("--merge-resources", action="store_true", help="merge resources used identically by all operations")
+        p.add_argument("--tuned", default=None, help="tuning report (displib_tune.py): use its parameters for this family")
+        p.add_argument("--record", default=None, metavar="DB",
+                       help="results store the run is recorded in (displib_results.py, default displib_results.sqlite)")
+        p.add_argument("--no-record", action="store_true", help="do not record the run")
+        p.set_defaults(func=func)
+    sub.choices["solve-mip"].add_argument("--contract", action="store_true",
+                                          help="solve on contracted single-successor chains (macro-operations)")
+    sub.choices["solve-mip"].add_argument("--paths", action="store_true",
+                                          help="route choice by route columns (column generation)")
+
+    p = sub.add_parser("solve-rf", help="relax-and-fix by train batches, then fix-and-optimize (Gurobi)")
+    p.add_argument("problem")
+    p.add_argument("--time-limit", type=float, default=None)
+    p.add_argument("--output", default=None, help="solution file, rewritten with every verified incumbent")
+    p.add_argument("--batch-size", type=int, default=2, help="trains made integral per stage")
+    p.add_argument("--order", choices=["earliest", "priority"], default="earliest")
+    p.add_argument("--group-size", type=int, default=None, help="trains freed per fix-and-optimize step")
+    p.add_argument("--overlap", type=int, default=1)
+    p.add_argument("--sweeps", type=int, default=1, help="fix-and-optimize passes (0: none)")
+    p.add_argument("--swapping", action="store_true", help="add swapping (head-on) conflict constraints")
+    p.add_argument("--symmetry", action="store_true", help="order trains with identical routes (FIFO)")
+    p.add_argument("--fix-orders", action="store_true", help="fix or drop conflict orders decided by time windows")
+    p.set_defaults(func=cmd_solve_rf)
+
+    p = sub.add_parser("solve-ls", help="repair and improve a schedule by local search (no solver needed)")
+    p.add_argument("problem")
+    p.add_argument("--initial", default=None, help="schedule to start from, possibly invalid (solution format)")
+    p.add_argument("--time-limit", type=float, default=None)
+    p.add_argument("--output", default=None, help="solution file, rewritten with every verified incumbent")
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_solve_ls)
+
+    p = sub.add_parser("race", help="run CP-SAT and Gurobi side by side, sharing incumbents")
+    p.add_argument("problem")
+    p.add_argument("--time-limit", type=float, default=None)
+    p.add_argument("--output", default=None, help="solution file, rewritten with every verified incumbent")
+    p.add_argument("--backends", nargs="+", choices=["cp", "mip"], default=["cp", "mip"])
+    p.add_argument("--threads", type=int, default=None, help="threads per backend (default: an equal share)")
+    p.add_argument("--swapping", action="store_true", help="add swapping (head-on) conflict constraints")
+    p.add_argument("--symmetry", action="store_true", help="order trains with identical routes (FIFO)")
+    p.add_argument("--fix-orders", action="store_true", help="fix or drop conflict orders decided by time windows")
+    p.add_argument("--merge-resources", action="store_true", help="merge resources used identically by all operations")
+    p.set_defaults(func=cmd_race)
+
+    p = sub.add_parser("whatif", help="solve a batch of what-if scenarios on one reusable Gurobi model")
+    p.add_argument("problem")
+    p.add_argument("scenarios", help="JSON list of scenarios (delays, bounds, objective changes)")
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--time-limit", type=float, default=None, help="per scenario")
+    p.add_argument("--swapping", action="store_true", help="add swapping (head-on) conflict constraints")
+    p.add_argument("--output", default=None, help="JSON report with the solution of every scenario")
+    p.set_defaults(func=cmd_whatif)
+
+    p = sub.add_parser("tune", help="tune solver parameters over a directory of instances")
+    p.add_argument("instances", help="directory of problem files")
+    p.add_argument("--backend", choices=["cp", "mip"], default="mip")
+    p.add_argument("--space", default=None, help="JSON file {param: [values]} (default: a built-in space)")
+    p.add_argument("--strategy", choices=["grid", "random"], default="grid")
+    p.add_argument("--samples", type=int, default=10, help="configurations for --strategy random")
+    p.add_argument("--seeds", type=int, default=2, help="solver seeds per configuration and instance")
+    p.add_argument("--time-limit", type=float, default=10.0, help="per run")
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--output", default=None, help="JSON report")
+    p.set_defaults(func=cmd_tune)
+
+    p = sub.add_parser("pool", help="collect several distinct verified solutions (solution pool)")
+    p.add_argument("problem")
+    p.add_argument("--backend", choices=["cp", "mip"], default="mip")
+    p.add_argument("--size", type=int, default=10, help="solutions kept")
+    p.add_argument("--gap", type=float, default=None, help="relative objective gap to the best solution")
+    p.add_argument("--time-limit", type=float, default=None)
+    p.add_argument("--swapping", action="store_true", help="add swapping (head-on) conflict constraints")
+    p.add_argument("--output", default=None, help="pool file (readable by verify-batch)")
+    p.set_defaults(func=cmd_pool)
+
+    p = sub.add_parser("results", help="list and compare recorded runs (SQLite results store)")
+    p.add_argument("rest", nargs=argparse.REMAINDER, help="list [--db DB] ... | compare OLD NEW [--db DB] ...")
+    p.set_defaults(func=cmd_results)
+
+    p = sub.add_parser("plot", help="draw a solution as a train Gantt chart")
+    p.add_argument("solution")
+    p.add_argument("--problem", default=None, help="problem file, for true durations and release times")
+    p.add_argument("--window", nargs=2, type=float, default=None, metavar=("T0", "T1"))
+    p.add_argument("--output", default=None, help="save to PNG/SVG instead of opening a window")
+    p.add_argument("--title", default="")
+    p.add_argument("--by-resource", action="store_true", help="resource occupation view with conflict highlighting")
+    p.set_defaults(func=cmd_plot)
+
+    p = sub.add_parser("check", help="detect and explain infeasibility")
+    p.add_argument("problem")
+    p.add_argument("--deep", action="store_true", help="use the Gurobi model (deletion filter + IIS)")
+    p.add_argument("--time-limit", type=float, default=10)
+    p.set_defaults(func=cmd_check)
+
+    p = sub.add_parser("stats", help="report model sizes without solving")
+    p.add_argument("problem")
+    p.add_argument("--backend", choices=["cp", "mip", "both"], default="both")
+    p.add_argument("--build", action="store_true")
+    p.add_argument("--top", type=int, default=10)
+    p.add_argument("--max-mb", type=float, default=None)
+    p.set_defaults(func=cmd_stats)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    args.func(args)
@@ -0,0 +1,291 @@
+"""
+Fast infeasibility detection and diagnosis.
+
+precheck runs before any model is built and only propagates:
+  * time windows over each train's successor DAG (a train without any route that fits its
+    windows, operations whose propagated window is empty);
+  * conflict orders decided by the windows (displib_presolve.analyze_conflict_orders): two
+    operations that lie on every route of their trains but fit in neither order, and cycles
+    of forced orders and train precedences (an unavoidable deadlock).
+diagnose falls back on the Gurobi model when propagation finds nothing: a deletion filter
+shrinks the instance to a minimal set of trains that is still infeasible, and the IIS of that
+reduced model is mapped back to trains, operations and resources. (The CP-SAT model of
+main.py does not model route choice, so its assumption cores would not be trustworthy.)
+Usage: displib_infeasibility.py PROBLEMFILE [--deep] [--time-limit SECONDS]
+"""
+
+import json
+import re
+from collections import defaultdict
+
+from displib_presolve import _mandatory_ops, _train_graphs, analyze_conflict_orders
+
+
+# ======================== Propagation ========================
+
+def _reason(kind, detail, trains=(), operations=(), resources=()):
+    return {"kind": kind, "detail": detail, "trains": sorted(set(trains)),
+            "operations": sorted(set(operations)), "resources": sorted(set(resources))}
+
+
+def _shared_resources(ops_by_key, a, b):
+    return sorted(set(ops_by_key[a]['resources']) & set(ops_by_key[b]['resources']))
+
+
+def _strongly_connected(nodes, edges):
+    # Tarjan's algorithm, iterative; returns the list of components
+    index, low, on_stack, stack, components = {}, {}, set(), [], []
+    counter = 0
+    for root in nodes:
+        if root in index:
+            continue
+        work = [(root, iter(edges[root]))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, it = work[-1]
+            child = next(it, None)
+            if child is not None:
+                if child not in index:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(edges[child])))
+                elif child in on_stack:
+                    low[node] = min(low[node], index[child])
+                continue
+            work.pop()
+            if work:
+                low[work[-1][0]] = min(low[work[-1][0]], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack.discard(w)
+                    component.append(w)
+                    if w == node:
+                        break
+                components.append(component)
+    return components
+
+
+def _has_positive_cycle(members, edges, weight):
+    # Bellman-Ford on longest paths inside one component: still improving after |members|
+    # rounds means a cycle of positive length
+    dist = {key: 0 for key in members}
+    for _ in range(len(members)):
+        changed = False
+        for u in members:
+            for v in edges[u]:
+                if v in members and dist[u] + weight[u, v] > dist[v]:
+                    dist[v] = dist[u] + weight[u, v]
+                    changed = True
+        if not changed:
+            return False
+    return True
+
+
+def precheck(data):
+    # data: raw problem dict. Returns {"infeasible": True/None, "stage", "reasons"}; None
+    # means propagation proved nothing (the instance may still be infeasible).
+    from MIP_READ_BUILD_MODEL import parse_displib_data
+
+    operations = parse_displib_data(data)['operations']
+    ops_by_key, preds, order = _train_graphs(operations)
+    mandatory = _mandatory_ops(ops_by_key, preds, order)
+    analysis = analyze_conflict_orders(operations)
+    es, ls = analysis['es'], analysis['ls']
+    reasons = []
+
+    # A train whose exit operations all have empty windows has no route at all
+    by_train = defaultdict(list)
+    for key in analysis['empty_windows']:
+        by_train[key[0]].append(key)
+    for train, keys in sorted(by_train.items()):
+        exits = [key for key in ops_by_key if key[0] == train and not ops_by_key[key]['successors']]
+        stuck = [key for key in keys if key in mandatory] or keys
+        if all(key in keys for key in exits) or any(key in mandatory for key in keys):
+            reasons.append(_reason(
+                "empty time window",
+                f"train {train}: no start time fits the windows of operation(s) "
+                + ", ".join(f"{op} (earliest {es[train, op]}, latest {ls[train, op]})" for _, op in stuck),
+                trains=[train], operations=stuck,
+                resources=[r for key in stuck for r in ops_by_key[key]['resources']]))
+
+    # Two unavoidable operations that fit in neither order
+    for (a, b), (kind, _, _) in analysis['decided'].items():
+        if kind == 'exclusive' and a in mandatory and b in mandatory:
+            reasons.append(_reason(
+                "resource conflict",
+                f"train {a[0]} op {a[1]} and train {b[0]} op {b[1]} need resource(s) "
+                f"{', '.join(_shared_resources(ops_by_key, a, b))} and their windows allow neither order",
+                trains=[a[0], b[0]], operations=[a, b], resources=_shared_resources(ops_by_key, a, b)))
+
+    # Forced orders plus train precedences between unavoidable operations: a cycle with a
+    # positive length cannot be scheduled. Edges are minimum start-time gaps (the minimum
+    # duration, plus the release time for a forced order); equal-time handovers and
+    # zero-duration operations make zero-length cycles possible, which prove nothing.
+    edges, weight = defaultdict(list), {}
+    for key in mandatory:
+        op = ops_by_key[key]
+        for s in op['successors']:
+            if (key[0], s) in mandatory:
+                edges[key].append((key[0], s))
+                weight[key, (key[0], s)] = op['min_duration']
+    for (a, b), (kind, first, second) in analysis['decided'].items():
+        if kind == 'forced' and first in mandatory and second in mandatory:
+            edges[first].append(second)
+            gap_ab, gap_ba = analysis['gaps'][a, b]
+            weight[first, second] = gap_ab if first == a else gap_ba
+    for component in _strongly_connected(sorted(mandatory), edges):
+        members = set(component)
+        if len(members) > 1 and len({key[0] for key in members}) > 1 and _has_positive_cycle(
+                members, edges, weight):
+            resources = {r for u in members for v in edges[u] if v in members and u[0] != v[0]
+                         for r in _shared_resources(ops_by_key, u, v)}
+            reasons.append(_reason(
+                "deadlock",
+                f"forced orders between trains {sorted({k[0] for k in members})} form a cycle",
+                trains=[k[0] for k in members], operations=members, resources=resources))
+
+    return {"infeasible": True if reasons else None, "stage": "propagation" if reasons else None,
+            "reasons": reasons}
+
+
+# ======================== Model-based diagnosis ========================
+
+def sub_instance(data, trains):
+    # The instance restricted to the given trains, without objective (feasibility only)
+    return {"trains": [data["trains"][i] for i in trains], "objective": []}
+
+
+def _build(data, time_limit):
+    from MIP_READ_BUILD_MODEL import parse_displib_data, build_mip_model
+    d = parse_displib_data(data)
+    model, t, active, y = build_mip_model(d['trains'], d['operations'], d['conflict_pairs'], d['train_paths'],
+                                          d['headways'], d['time_windows'], d['objectives'])
+    model.setParam('OutputFlag', 0)
+    model.setParam('SolutionLimit', 1)
+    model.setParam('IntFeasTol', 1e-9)
+    if time_limit is not None:
+        model.setParam('TimeLimit', time_limit)
+    return model, d
+
+
+def is_feasible(data, time_limit=None):
+    # True / False, or None when the time limit hit first
+    from gurobipy import GRB
+    model, _ = _build(data, time_limit)
+    model.optimize()
+    if model.SolCount > 0:
+        return True
+    if model.status in (GRB.INFEASIBLE, GRB.INF_OR_UNBD):
+        return False
+    return None
+
+
+def minimal_infeasible_trains(data, time_limit=None):
+    # Deletion filter: drop every train whose removal keeps the instance infeasible. A train
+    # whose test hits the time limit is kept, so the result is then not necessarily minimal.
+    trains = list(range(len(data["trains"])))
+    for train in list(trains):
+        rest = [i for i in trains if i != train]
+        if rest and is_feasible(sub_instance(data, rest), time_limit) is False:
+            trains = rest
+    return trains
+
+
+def _parse_name(name):
+    # "conflict1_0_3_1_3" -> ("conflict1", [(0, 3), (1, 3)]); "succ_time_flow_0_2_3" ->
+    # ("succ_time_flow", [(0, 2), (0, 3)]); variable names such as "t[0,2]" likewise
+    if "[" in name:
+        family, numbers = name.split("[")[0], re.findall(r"\d+", name.split("[")[1])
+    else:
+        tokens = name.split("_")
+        head = 0
+        while head < len(tokens) and not tokens[head].isdigit():
+            head += 1
+        family = "_".join(tokens[:head])
+        numbers = [x for x in tokens[head:] if x.isdigit()]
+    numbers = [int(x) for x in numbers]
+    if len(numbers) == 2:
+        return family, [tuple(numbers)]
+    if len(numbers) == 3:
+        return family, [(numbers[0], numbers[1]), (numbers[0], numbers[2])]
+    if len(numbers) == 4:
+        return family, [(numbers[0], numbers[1]), (numbers[2], numbers[3])]
+    return family, []
+
+
+def iis_reasons(data, trains, time_limit=None):
+    # IIS of the reduced model, grouped by constraint family and mapped to original trains
+    model, d = _build(sub_instance(data, trains), time_limit)
+    model.optimize()
+    model.computeIIS()
+    families = defaultdict(list)
+    for c in model.getConstrs():
+        if c.IISConstr:
+            family, keys = _parse_name(c.ConstrName)
+            families[family].append(keys)
+    for v in model.getVars():
+        if v.IISLB or v.IISUB:
+            family, keys = _parse_name(v.VarName)
+            families[family + " bound"].append(keys)
+
+    ops = {(op['train'], op['op_idx']): op for op in d['operations']}
+    reasons = []
+    for family, members in sorted(families.items()):
+        operations, resources = set(), set()
+        for keys in members:
+            keys = [key for key in keys if key in ops]
+            # reduced model train indices -> original ones
+            operations.update((trains[i], j) for i, j in keys)
+            if len(keys) == 2 and keys[0][0] != keys[1][0]:
+                resources.update(set(ops[keys[0]]['resources']) & set(ops[keys[1]]['resources']))
+        reasons.append(_reason("IIS " + family, f"{len(members)} constraint(s) of family '{family}'",
+                               trains=[k[0] for k in operations], operations=operations, resources=resources))
+    return reasons
+
+
+def diagnose(data, deep=True, time_limit=10):
+    report = precheck(data)
+    if report["infeasible"] or not deep:
+        return report
+    if is_feasible(data, time_limit) is not False:
+        return report  # feasible, or unknown within the time limit
+    trains = minimal_infeasible_trains(data, time_limit)
+    report = {"infeasible": True, "stage": "iis", "trains": trains, "reasons": iis_reasons(data, trains, time_limit)}
+    return report
+
+
+def print_report(report):
+    if not report["infeasible"]:
+        print("✅ No infeasibility found" + (" by propagation" if report["stage"] is None else ""))
+        return
+    print(f"❌ Infeasible (found by {report['stage']})")
+    if "trains" in report:
+        print(f"  minimal infeasible set of trains: {report['trains']}")
+    for reason in report["reasons"]:
+        print(f"  - {reason['kind']}: {reason['detail']}")
+        if reason["operations"]:
+            print(f"    operations: {', '.join(f'train {i} op {j}' for i, j in reason['operations'])}")
+        if reason["resources"]:
+            print(f"    resources: {', '.join(reason['resources'])}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Detect and explain infeasible DISPLIB instances.")
+    parser.add_argument("problem")
+    parser.add_argument("--deep", action="store_true", help="use the Gurobi model (deletion filter + IIS)")
+    parser.add_argument("--time-limit", type=float, default=10)
+    args = parser.parse_args()
+
+    with open(args.problem) as f:
+        report = diagnose(json.load(f), deep=args.deep, time_limit=args.time_limit)
+    print_report(report)
+    raise SystemExit(1 if report["infeasible"] else 0)
@@ -0,0 +1,268 @@
+"""
+Lagrangian relaxation of the resource conflicts of a DISPLIB instance.
+
+Time is expanded into unit cells [0, horizon). The constraint "at most one train occupies
+resource r in cell tau" is moved into the objective with multipliers lambda[r, tau] >= 0, and
+the problem falls apart into one shortest path problem per train over (operation, start
+time), solved by a backward DP with numpy suffix minima. The trains are solved in parallel
+worker processes that read the multipliers from shared memory, and the multipliers follow
+a subgradient method.
+
+Every iteration gives a lower bound on the schedules that fit in the horizon. The default
+horizon is a heuristic that can cut off every optimal schedule, so the value is reported as
+a heuristic estimate, not as a proven bound of the instance. The conflict-priced routes of
+the least conflicting iteration are returned as a start-time hint for
+main.solve_displib_instance and MIP_solver.solve_mip (hint=...).
+Usage: displib_lagrangian.py PROBLEMFILE [--iterations N] [--workers N] [--solve {cp,mip}]
+"""
+
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from displib_verify import INFINITY, parse_problem
+
+
+# ======================== Per-train subproblem ========================
+
+def default_horizon(problem):
+    # Latest finite time window plus the trains' longest paths run one after the other. Trains
+    # without objective terms may wait arbitrarily long, so optimal schedules can end later.
+    windows = [t for ops in problem.trains for op in ops for t in (op.start_lb, op.start_ub) if t < INFINITY]
+    longest = 0
+    for ops in problem.trains:
+        length = [0] * len(ops)
+        for op_idx in reversed(range(len(ops))):
+            op = ops[op_idx]
+            tail = max((r.release_time for r in op.resources), default=0)
+            length[op_idx] = op.min_duration + max([length[s] for s in op.successors] or [tail])
+        longest += length[0]
+    return max(windows, default=0) + longest + 1
+
+
+class TrainSubproblem:
+    # min over routes and start times of  delay cost + sum of lambda over the occupied cells.
+    # A train occupies the resources of operation j from its start t until the start t' of
+    # the next operation, plus the release time unless the next operation keeps the
+    # resource; the exit operation is counted for its minimum duration only. Counting less
+    # than the verifier does keeps every value a valid lower bound.
+    def __init__(self, problem, train_idx, resource_index, horizon):
+        self.ops = problem.trains[train_idx]
+        self.train = train_idx
+        self.horizon = horizon
+        steps = np.arange(horizon)
+        self.delay = []
+        for op_idx in range(len(self.ops)):
+            cost = np.zeros(horizon)
+            for c in problem.objective:
+                if c.train == train_idx and c.operation == op_idx:
+                    cost += c.coeff * np.maximum(0, steps - c.threshold) + c.increment * (steps >= c.threshold)
+            self.delay.append(cost)
+        self.rows = [[resource_index[r.resource] for r in op.resources] for op in self.ops]
+        self.release = [[r.release_time for r in op.resources] for op in self.ops]
+
+    def solve(self, prefix):
+        # prefix[r, k] = sum of lambda[r, tau] for tau < k (shape R x (horizon + 1)).
+        # Returns (value, [(op, start)], [(resource row, first cell, end cell)]).
+        H = self.horizon
+        steps = np.arange(H)
+        ops = self.ops
+        occupied = [prefix[rows].sum(axis=0) if rows else np.zeros(H + 1) for rows in self.rows]
+        value, best_next, best_succ = [None] * len(ops), [None] * len(ops), [None] * len(ops)
+        for j in reversed(range(len(ops))):
+            op = ops[j]
+            d = op.min_duration
+            window = (steps >= op.start_lb) & (steps <= min(op.start_ub, H - 1))
+            if not op.successors:
+                v = self.delay[j] + occupied[j][np.minimum(steps + d, H)] - occupied[j][:H]
+            else:
+                # G[t'] = P_j[t'] + min over successors s of (release tail of j + V_s[t'])
+                candidates = []
+                for s in op.successors:
+                    tail = np.zeros(H)
+                    for row, rel in zip(self.rows[j], self.release[j]):
+                        if rel > 0 and row not in self.rows[s]:
+                            tail += prefix[row][np.minimum(steps + rel, H)] - prefix[row][:H]
+                    candidates.append(tail + value[s])
+                if len(candidates) == 1:
+                    succ, g = np.zeros(H, dtype=int), occupied[j][:H] + candidates[0]
+                else:
+                    candidates = np.vstack(candidates)
+                    succ = candidates.argmin(axis=0)
+                    g = occupied[j][:H] + candidates[succ, steps]
+                suffix = np.minimum.accumulate(g[::-1])[::-1]
+                shifted = np.full(H, np.inf)
+                if d < H:
+                    shifted[:H - d] = suffix[d:]
+                v = self.delay[j] - occupied[j][:H] + shifted
+                best_next[j], best_succ[j] = g, succ
+            value[j] = np.where(window, v, np.inf)
+
+        t = int(np.argmin(value[0]))
+        if not np.isfinite(value[0][t]):
+            return math.inf, [], []
+        total = float(value[0][t])
+        route, cells, j = [], [], 0
+        while True:
+            route.append((j, t))
+            if not ops[j].successors:
+                cells += [(row, t, min(t + ops[j].min_duration, H)) for row in self.rows[j]]
+                break
+            nxt = t + ops[j].min_duration + int(np.argmin(best_next[j][t + ops[j].min_duration:]))
+            s = ops[j].successors[best_succ[j][nxt]]
+            for row, rel in zip(self.rows[j], self.release[j]):
+                end = nxt if row in self.rows[s] else nxt + rel
+                cells.append((row, t, min(end, H)))
+            j, t = s, nxt
+        return total, route, cells
+
+
+# ======================== Parallel workers ========================
+
+_WORKER = {}
+
+
+def _init_worker(data, shm_name, shape, horizon):
+    problem = parse_problem(data)
+    resource_index = _resource_index(problem)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _WORKER["shm"] = shm  # keep the mapping alive
+    _WORKER["prefix"] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _WORKER["subproblems"] = {}
+    _WORKER["problem"], _WORKER["resource_index"], _WORKER["horizon"] = problem, resource_index, horizon
+
+
+def _solve_train(train_idx):
+    sub = _WORKER["subproblems"].get(train_idx)
+    if sub is None:
+        sub = _WORKER["subproblems"][train_idx] = TrainSubproblem(
+            _WORKER["problem"], train_idx, _WORKER["resource_index"], _WORKER["horizon"])
+    return sub.solve(_WORKER["prefix"])
+
+
+def _resource_index(problem):
+    names = sorted({r.resource for ops in problem.trains for op in ops for r in op.resources})
+    return {name: idx for idx, name in enumerate(names)}
+
+
+# ======================== Subgradient method ========================
+
+def lagrangian_bound(data, iterations=50, workers=1, horizon=None, upper_bound=None, verbose=True):
+    # data: raw problem dict. upper_bound (e.g. a known objective) gives Polyak steps towards
+    # it; without one the target is 10% above the best bound so far.
+    # Returns {"lower_bound", "heuristic", "horizon", "best_iteration", "hint", "conflicts",
+    # "iterations", "seconds"}: hint = {(train, op): start time} from the iteration whose routes
+    # conflict least. lower_bound only bounds the schedules within the horizon, hence
+    # heuristic=True: it is not a valid lower bound of the instance.
+    start = time.time()
+    problem = parse_problem(data)
+    horizon = horizon or default_horizon(problem)
+    resource_index = _resource_index(problem)
+    shape = (max(len(resource_index), 1), horizon + 1)
+
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+    pool = None
+    try:
+        prefix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        prefix[:] = 0
+        lam = np.zeros((shape[0], horizon))
+        trains = list(range(len(problem.trains)))
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(data, shm.name, shape, horizon))
+            solve_all = lambda: list(pool.map(_solve_train, trains))
+        else:
+            subproblems = [TrainSubproblem(problem, i, resource_index, horizon) for i in trains]
+            solve_all = lambda: [sub.solve(prefix) for sub in subproblems]
+
+        best = {"lower_bound": -math.inf, "best_iteration": None, "hint": None, "conflicts": None}
+        theta, stalled = 2.0, 0
+        it = -1
+        for it in range(iterations):
+            results = solve_all()
+            if any(r[0] == math.inf for r in results):
+                best["lower_bound"] = math.inf  # some train has no route within the horizon
+                break
+            bound = sum(r[0] for r in results) - lam.sum()
+
+            usage = np.zeros((shape[0], horizon + 1))
+            for _, _, cells in results:
+                for row, a, b in cells:
+                    if b > a:
+                        usage[row, a] += 1
+                        usage[row, b] -= 1
+            usage = np.cumsum(usage, axis=1)[:, :horizon]
+            subgradient = usage - 1
+            conflicts = int(np.maximum(usage - 1, 0).sum())
+
+            if bound > best["lower_bound"] + 1e-9:
+                best["lower_bound"], best["best_iteration"], stalled = bound, it, 0
+            else:
+                stalled += 1
+                if stalled >= 5:
+                    theta, stalled = theta / 2, 0
+            if best["conflicts"] is None or conflicts < best["conflicts"]:
+                best["conflicts"] = conflicts
+                best["hint"] = {(i, op): t for i, (_, route, _) in enumerate(results) for op, t in route}
+            if verbose:
+                print(f"🔁 iteration {it}: bound {bound:.2f}, conflicting cells {conflicts}")
+            if conflicts == 0:
+                break  # no cell is over-used, so there is nothing left to price
+
+            # Projected subgradient step (only cells that may move count towards the norm)
+            direction = np.where((lam > 0) | (subgradient > 0), subgradient, 0)
+            norm = float((direction ** 2).sum())
+            if norm == 0:
+                break
+            target = upper_bound if upper_bound is not None else max(1.1 * best["lower_bound"], best["lower_bound"] + 1)
+            step = theta * max(target - bound, 1e-3) / norm
+            lam = np.maximum(0.0, lam + step * direction)
+            prefix[:, 1:] = np.cumsum(lam, axis=1)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        shm.close()
+        shm.unlink()
+
+    # Objective values are integers, so the bound can be rounded up
+    if math.isfinite(best["lower_bound"]):
+        best["lower_bound"] = max(0, math.ceil(best["lower_bound"] - 1e-6))
+    best["heuristic"], best["horizon"] = True, horizon
+    best["iterations"] = it + 1
+    best["seconds"] = time.time() - start
+    return best
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Lagrangian lower bound and conflict-priced start hints.")
+    parser.add_argument("problem")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--horizon", type=int, default=None)
+    parser.add_argument("--upper-bound", type=float, default=None)
+    parser.add_argument("--solve", choices=["cp", "mip"], default=None, help="solve afterwards, seeded with the hint")
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    with open(args.problem) as f:
+        data = json.load(f)
+    result = lagrangian_bound(data, iterations=args.iterations, workers=args.workers, horizon=args.horizon,
+                              upper_bound=args.upper_bound)
+    print(f"📏 Lagrangian estimate {result['lower_bound']} (heuristic: schedules within horizon {result['horizon']}) "
+          f"after {result['iterations']} iterations "
+          f"({result['seconds']:.2f}s), hint with {result['conflicts']} conflicting cells")
+
+    if args.solve == "cp":
+        from main import solve_displib_instance
+        solve_displib_instance(args.problem, time_limit=args.time_limit, solution_path=args.output,
+                               hint=result["hint"])
+    elif args.solve == "mip":
+        from MIP_solver import solve_mip
+        solve_mip(args.problem, solution_path=args.output, time_limit=args.time_limit, hint=result["hint"])
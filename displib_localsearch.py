@@ -0,0 +1,527 @@
+"""
+Conflict-driven local search on DISPLIB schedules, without a MIP or CP solver.
+
+A schedule is one route and one start time per operation for every train. Successors,
+minimum durations and start lower bounds hold by construction; resource conflicts and
+start upper bounds are the violations. The repair phase takes the earliest violation and
+tries time shifts (one of the two trains waits, at the conflicting operation or a few
+operations before it) and route swaps (another successor at a branching point before it),
+and applies the move that leaves the fewest conflicts (then the least violation and
+objective). Once nothing is violated, improvement moves shift trains earlier and try other
+routes to lower the op_delay objective, and perturbation + repair rounds continue until the
+time limit.
+
+Resource occupations are kept in per-resource interval indices, so a move only
+re-evaluates the moved train (and the trains it conflicts with), about the length of its
+route rather than the size of the schedule. Every feasible schedule goes through
+displib_verify (IncumbentWriter) before it is written.
+Usage: displib_localsearch.py PROBLEMFILE [INITIALSOLUTION] [--time-limit S] [--output SOLUTIONFILE]
+"""
+
+import bisect
+import json
+import random
+import time
+from collections import defaultdict
+
+from displib_bounds import _delay_cost
+from displib_verify import (
+    Event, Solution, SolutionValidationError, INFINITY, parse_problem, verify_solution
+)
+
+# An overlap with an occupation that is never released (exit operations) counts as this long
+OPEN_OVERLAP = 10 ** 6
+# How many operations before a conflict a train may start waiting or take another route
+LOOKBACK = 3
+
+
+# ======================== Interval index ========================
+
+def _overlap(start, end, other_start, other_end):
+    # Whether two occupations [start, end) conflict for the verifier. A zero-length one (the
+    # train passes through at one instant) only conflicts strictly inside the other: at the
+    # end points the events can be ordered around it.
+    if start == end:
+        return other_start < start < other_end
+    if other_start == other_end:
+        return start < other_start < end
+    return max(start, other_start) < min(end, other_end)
+
+
+class ResourceIndex:
+    # Occupations (start, end, train, position) per resource, sorted by start. Intervals that
+    # overlap [start, end) begin after start - max_length; never released ones are kept apart.
+    def __init__(self):
+        self.intervals = defaultdict(list)
+        self.max_length = defaultdict(int)
+        self.open = defaultdict(list)
+
+    def add(self, resource, item):
+        if item[1] >= INFINITY:
+            self.open[resource].append(item)
+        else:
+            bisect.insort(self.intervals[resource], item)
+            self.max_length[resource] = max(self.max_length[resource], item[1] - item[0])
+
+    def remove(self, resource, item):
+        if item[1] >= INFINITY:
+            self.open[resource].remove(item)
+        else:
+            intervals = self.intervals[resource]
+            del intervals[bisect.bisect_left(intervals, item)]
+
+    def overlapping(self, resource, start, end):
+        intervals = self.intervals[resource]
+        i = bisect.bisect_left(intervals, (start - self.max_length[resource],))
+        while i < len(intervals) and intervals[i][0] < end:
+            if _overlap(start, end, intervals[i][0], intervals[i][1]):
+                yield intervals[i]
+            i += 1
+        for item in self.open[resource]:
+            if _overlap(start, end, item[0], item[1]):
+                yield item
+
+    def starting(self, resource, t):
+        intervals = self.intervals[resource]
+        i = bisect.bisect_left(intervals, (t,))
+        while i < len(intervals) and intervals[i][0] == t:
+            yield intervals[i]
+            i += 1
+        for item in self.open[resource]:
+            if item[0] == t:
+                yield item
+
+
+# ======================== Schedule state ========================
+
+class LocalSearch:
+    def __init__(self, problem, seed=0):
+        self.problem = problem
+        self.rng = random.Random(seed)
+        self.components = defaultdict(list)
+        for c in problem.objective:
+            self.components[c.train, c.operation].append(c)
+
+        # Per train: entry operations and the shortest (minimum duration) way to an exit
+        self.entries, self.next_op, self.remaining = [], [], []
+        for ops in problem.trains:
+            targets = {s for op in ops for s in op.successors}
+            self.entries.append([j for j in range(len(ops)) if j not in targets])
+            remaining, next_op = [0] * len(ops), [None] * len(ops)
+            for j in reversed(range(len(ops))):
+                if ops[j].successors:
+                    next_op[j] = min(ops[j].successors, key=lambda s: remaining[s])
+                    remaining[j] = ops[j].min_duration + remaining[next_op[j]]
+            self.next_op.append(next_op)
+            self.remaining.append(remaining)
+
+        self.routes, self.times = [], []
+        self.index = ResourceIndex()
+        self.violation, self.delay, self.conflicts = [], [], []
+
+    # -------- routes and times --------
+
+    def shortest_route(self, train, op_idx):
+        route = [op_idx]
+        while self.next_op[train][route[-1]] is not None:
+            route.append(self.next_op[train][route[-1]])
+        return route
+
+    def normalize(self, train, route, times, start=0):
+        # Raise times (from position start on) to the start lower bounds and minimum durations
+        ops = self.problem.trains[train]
+        for k in range(start, len(route)):
+            low = ops[route[k]].start_lb
+            if k > 0:
+                low = max(low, times[k - 1] + ops[route[k - 1]].min_duration)
+            times[k] = max(times[k], low)
+        return times
+
+    def load(self, events=None):
+        # Routes and times from solution-format events (any prefix of a valid route per train
+        # is kept and completed by the shortest route), or the earliest shortest routes
+        ops_by_train = defaultdict(list)
+        for e in sorted(events or [], key=lambda e: e["time"]):
+            if 0 <= e["train"] < len(self.problem.trains):
+                ops_by_train[e["train"]].append((e["operation"], e["time"]))
+
+        routes, times = [], []
+        for train, ops in enumerate(self.problem.trains):
+            route, start = [], []
+            for op_idx, t in ops_by_train[train]:
+                valid = (op_idx in ops[route[-1]].successors) if route else (op_idx in self.entries[train])
+                if not valid:
+                    break
+                route.append(op_idx)
+                start.append(t)
+            if not route:
+                entry = min(self.entries[train], key=lambda j: (ops[j].start_lb, self.remaining[train][j]))
+                route, start = [entry], [0]
+            tail = self.shortest_route(train, route[-1])[1:]
+            route += tail
+            start += [0] * len(tail)
+            routes.append(route)
+            times.append(self.normalize(train, route, start))
+        self.set_state(routes, times)
+
+    def set_state(self, routes, times):
+        self.routes, self.times = [list(r) for r in routes], [list(t) for t in times]
+        self.index = ResourceIndex()
+        for train in range(len(self.routes)):
+            for resource, item in self.occupations(train, self.routes[train], self.times[train]):
+                self.index.add(resource, item)
+        n = len(self.routes)
+        self.violation, self.delay, self.conflicts = [0] * n, [0] * n, [[] for _ in range(n)]
+        for train in range(n):
+            self.refresh(train)
+
+    def occupations(self, train, route, times):
+        # The verifier's semantics: operation k holds its resources from its start until the
+        # start of operation k + 1 plus the release time; the exit operation forever
+        ops = self.problem.trains[train]
+        result = []
+        for k, op_idx in enumerate(route):
+            end = times[k + 1] if k + 1 < len(route) else INFINITY
+            for usage in ops[op_idx].resources:
+                release = end + usage.release_time if end < INFINITY else INFINITY
+                if release >= times[k]:
+                    result.append((usage.resource, (times[k], release, train, k)))
+        return result
+
+    def evaluate(self, train, route, times):
+        # (violation, delay, conflicts) of the train against all other trains in the index.
+        # conflicts: (time, train, position, other train, other position, resource, start, end,
+        # other start, other end); other train is None for a start upper bound violation.
+        ops = self.problem.trains[train]
+        violation, delay, conflicts = 0, 0, []
+        for k, op_idx in enumerate(route):
+            t = times[k]
+            if t > ops[op_idx].start_ub:
+                violation += t - ops[op_idx].start_ub
+                conflicts.append((t, train, k, None, None, None, t, t, t, t))
+            for c in self.components.get((train, op_idx), ()):
+                delay += _delay_cost(c, t)
+        for resource, (start, end, _, k) in self.occupations(train, route, times):
+            for other_start, other_end, other, other_k in self.index.overlapping(resource, start, end):
+                if other == train:
+                    continue
+                first = max(start, other_start)
+                violation += max(1, min(end, other_end, first + OPEN_OVERLAP) - first)
+                conflicts.append((first, train, k, other, other_k, resource, start, end, other_start, other_end))
+        for conflict in self.swaps(train, route, times):
+            violation += 1
+            conflicts.append(conflict)
+        return violation, delay, conflicts
+
+    def swaps(self, train, route, times):
+        # Touching occupations are fine (the verifier sees the release first), except when
+        # two trains hand resources to each other at the same instant: each event would have
+        # to come first. Yields conflicts in the format of evaluate: the train's occupation of
+        # a resource it releases against the other train's occupation that follows it, so the
+        # repair lets the train wait until the other has passed.
+        ops = self.problem.trains[train]
+        for k in range(1, len(route)):
+            t = times[k]
+            released = {u.resource for u in ops[route[k - 1]].resources if u.release_time == 0}
+            released -= {u.resource for u in ops[route[k]].resources}
+            if not released:
+                continue
+            for usage in ops[route[k]].resources:
+                for _, end, other, other_k in self.index.overlapping(usage.resource, t - 1, t):
+                    if other == train or end != t:
+                        continue
+                    for resource in released:
+                        for _, other_end, item_train, item_k in self.index.starting(resource, t):
+                            if item_train == other and item_k == other_k + 1:
+                                yield (t, train, k - 1, other, item_k, resource, times[k - 1], t, t, other_end)
+
+    def refresh(self, train):
+        self.violation[train], self.delay[train], self.conflicts[train] = self.evaluate(
+            train, self.routes[train], self.times[train])
+
+    def apply(self, train, route, times):
+        touched = {c[3] for c in self.conflicts[train] if c[3] is not None}
+        for resource, item in self.occupations(train, self.routes[train], self.times[train]):
+            self.index.remove(resource, item)
+        self.routes[train], self.times[train] = route, times
+        for resource, item in self.occupations(train, route, times):
+            self.index.add(resource, item)
+        self.refresh(train)
+        touched |= {c[3] for c in self.conflicts[train] if c[3] is not None}
+        for other in touched:
+            self.refresh(other)
+
+    def objective(self):
+        return sum(self.delay)
+
+    def feasible(self):
+        return not any(self.violation)
+
+    def events(self):
+        events = [{"operation": op_idx, "time": t, "train": train}
+                  for train, (route, times) in enumerate(zip(self.routes, self.times))
+                  for op_idx, t in zip(route, times)]
+        return sorted(events, key=lambda e: e["time"])
+
+    # -------- moves --------
+
+    def shift(self, train, anchor, position, delta):
+        # The train waits delta longer before position anchor; positions anchor..position move
+        # by delta and later ones only as far as the minimum durations force them
+        times = list(self.times[train])
+        for k in range(anchor, position + 1):
+            times[k] += delta
+        return self.routes[train], self.normalize(train, self.routes[train], times, anchor)
+
+    def pull(self, train, position, delta):
+        # Positions from position on start up to delta earlier, as far as bounds and durations allow
+        times = list(self.times[train])
+        for k in range(position, len(times)):
+            times[k] = max(0, times[k] - delta)
+        return self.routes[train], self.normalize(train, self.routes[train], times, position)
+
+    def reroute(self, train, position, successor):
+        # Leave the operation at position for another successor, then the shortest route
+        route = self.routes[train][:position + 1] + self.shortest_route(train, successor)
+        times = self.times[train][:position + 2]
+        times += [0] * (len(route) - len(times))
+        return route, self.normalize(train, route, times, position + 1)
+
+    def reroutes(self, train, position, lookback=LOOKBACK):
+        ops = self.problem.trains[train]
+        route = self.routes[train]
+        for p in range(max(0, position - lookback), min(position, len(route) - 1)):
+            for s in ops[route[p]].successors:
+                if s != route[p + 1]:
+                    yield ("route", p, s), self.reroute(train, p, s)
+
+    def earliest(self, train, position):
+        if position == 0:
+            return self.problem.trains[train][self.routes[train][0]].start_lb
+        ops = self.problem.trains[train]
+        route = self.routes[train]
+        return max(ops[route[position]].start_lb, self.times[train][position - 1] + ops[route[position - 1]].min_duration)
+
+    # -------- repair --------
+
+    def repair_candidates(self, conflict):
+        _, train, k, other, other_k, _, start, end, other_start, other_end = conflict
+        if other is None:
+            # Start upper bound: start earlier, or take another route
+            for anchor in range(max(0, k - LOOKBACK), k + 1):
+                delta = self.times[train][anchor] - self.earliest(train, anchor)
+                if delta > 0:
+                    yield train, ("pull", anchor), self.pull(train, anchor, delta)
+            for tag, move in self.reroutes(train, k):
+                yield train, tag, move
+            return
+        # One of the two trains waits until the other has released the resource
+        for waiting, position, wait_start, blocking_end in ((train, k, start, other_end),
+                                                            (other, other_k, other_start, end)):
+            if blocking_end < INFINITY:
+                delta = max(1, blocking_end - wait_start)  # touching occupations of a swap: one step
+                for anchor in sorted({position, *range(max(0, position - LOOKBACK), position), 0}):
+                    yield waiting, ("shift", anchor), self.shift(waiting, anchor, position, delta)
+            for tag, move in self.reroutes(waiting, position):
+                yield waiting, tag, move
+
+    def repair(self, deadline, max_steps, tabu_tenure=10):
+        # Steepest descent on (conflicts, violation, objective) over the moves for the
+        # earliest violation; the best move is applied even if it is worse, and recently used route
+        # swaps are tabu. Returns True when the schedule is conflict free.
+        tabu = {}
+        step = 0
+        while not self.feasible() and step < max_steps and time.time() < deadline:
+            first = min((c for train in range(len(self.conflicts)) for c in self.conflicts[train]),
+                        key=lambda c: c[0])
+            # The same conflict as seen from both trains (they differ for simultaneous swaps)
+            pair = {first[1], first[3]}
+            same = [c for train in pair if train is not None for c in self.conflicts[train]
+                    if c[0] == first[0] and {c[1], c[3]} == pair]
+            best = None
+            for train, tag, (route, times) in (move for c in same for move in self.repair_candidates(c)):
+                if tag[0] == "route" and tabu.get((train, tag), -1) >= step:
+                    continue
+                violation, delay, conflicts = self.evaluate(train, route, times)
+                key = (len(conflicts) - len(self.conflicts[train]), violation - self.violation[train],
+                       delay - self.delay[train], self.rng.random())
+                if best is None or key < best[0]:
+                    best = (key, train, tag, route, times)
+            if best is None:
+                break
+            _, train, tag, route, times = best
+            if tag[0] == "route":
+                tabu[train, ("route", tag[1], self.routes[train][tag[1] + 1])] = step + tabu_tenure
+            self.apply(train, route, times)
+            step += 1
+        return self.feasible()
+
+    def settle(self, deadline, max_steps, max_fixes=100):
+        # A conflict-free schedule can still fail displib_verify when trains swap resources at
+        # the same instant (each releases what the other acquires, so no event order works).
+        # The verifier names the two events; the acquiring train waits one time unit and the
+        # schedule is repaired again. Returns the verified, ordered events or None.
+        from displib_anytime import order_simultaneous_events
+        for _ in range(max_fixes):
+            if not self.repair(deadline, max_steps):
+                return None
+            events = order_simultaneous_events(self.problem, self.events())
+            try:
+                verify_solution(self.problem, Solution(INFINITY, [Event(e["time"], e["train"], e["operation"])
+                                                                  for e in events]))
+                return events
+            except SolutionValidationError as e:
+                idxs = e.relevant_event_idxs or []
+                if len(idxs) != 2 or events[idxs[0]]["train"] == events[idxs[1]]["train"]:
+                    return None
+                train = events[idxs[1]]["train"]
+                k = self.routes[train].index(events[idxs[1]]["operation"])
+                self.apply(train, *self.shift(train, k, k, 1))
+        return None
+
+    # -------- improvement --------
+
+    def improve_train(self, train):
+        # First improving move for the train: start earlier at some position (as early as
+        # possible, or just when a blocking occupation ends) or take another route, without
+        # creating a violation. Moves that keep the objective but start earlier compact the
+        # schedule and make room for the other trains.
+        ops = self.problem.trains[train]
+        for k in range(len(self.routes[train])):
+            earliest = self.earliest(train, k)
+            t = self.times[train][k]
+            if t <= earliest:
+                continue
+            targets = {earliest}
+            for usage in ops[self.routes[train][k]].resources:
+                for _, end, other, _ in self.index.overlapping(usage.resource, earliest, t):
+                    if other != train and earliest < end < t:
+                        targets.add(end)
+            for target in sorted(targets):
+                route, times = self.pull(train, k, t - target)
+                violation, delay, _ = self.evaluate(train, route, times)
+                if violation == 0 and (delay, sum(times)) < (self.delay[train], sum(self.times[train])):
+                    self.apply(train, route, times)
+                    return True
+        if self.delay[train] > 0:
+            for tag, (route, times) in self.reroutes(train, len(self.routes[train])):
+                violation, delay, _ = self.evaluate(train, route, times)
+                if violation == 0 and delay < self.delay[train]:
+                    self.apply(train, route, times)
+                    return True
+        return False
+
+    def improve(self, deadline):
+        improved = True
+        while improved and time.time() < deadline:
+            improved = False
+            for train in sorted(range(len(self.routes)), key=lambda i: -self.delay[i]):
+                while self.improve_train(train) and time.time() < deadline:
+                    improved = True
+
+    def perturb(self):
+        # Pull one delayed train (or any train) as early as possible from a random position
+        # where it waits; a train that never waits takes another route instead
+        delayed = [train for train in range(len(self.routes)) if self.delay[train] > 0]
+        train = self.rng.choice(delayed or range(len(self.routes)))
+        waiting = [k for k in range(len(self.routes[train])) if self.times[train][k] > self.earliest(train, k)]
+        if waiting:
+            position = self.rng.choice(waiting)
+            delta = self.times[train][position] - self.earliest(train, position)
+            self.apply(train, *self.pull(train, position, delta))
+        elif len(self.routes[train]) > 1:
+            moves = list(self.reroutes(train, len(self.routes[train])))
+            if moves:
+                self.apply(train, *self.rng.choice(moves)[1])
+
+
+# ======================== Driver ========================
+
+def local_search(problem, initial_events=None, time_limit=10.0, solution_path=None, listener=None, seed=0,
+                 max_repair_steps=None, acceptance=0.01, verbose=True):
+    # problem: parsed Problem or raw problem dict; initial_events: any schedule in solution
+    # format (e.g. from a relaxation, a greedy run or an earlier solve), possibly invalid.
+    # Returns {"objective_value", "events", "verified", "iterations", "seconds"}.
+    from displib_anytime import IncumbentWriter
+    from displib_bounds import lower_bound
+
+    start = time.time()
+    deadline = start + time_limit
+    if isinstance(problem, dict):
+        problem = parse_problem(problem)
+    bound = lower_bound(problem)["lower_bound"]
+    writer = IncumbentWriter(problem, solution_path, listener=listener, lower_bound=bound)
+
+    if initial_events is not None and verbose:
+        try:
+            value = verify_solution(problem, Solution(INFINITY, [Event(e["time"], e["train"], e["operation"])
+                                                                  for e in initial_events]))
+            print(f"✅ Initial schedule is valid with objective {value}")
+        except SolutionValidationError as e:
+            print(f"🔧 Initial schedule needs repair: {e}")
+
+    search = LocalSearch(problem, seed=seed)
+    search.load(initial_events)
+    num_events = sum(len(route) for route in search.routes)
+    max_steps = max_repair_steps or 20 * num_events
+
+    def settled(steps):
+        # Repair, improve, and repair again if the verifier needed a fix-up
+        if search.settle(deadline, steps) is None:
+            return None
+        search.improve(deadline)
+        return search.settle(deadline, steps)
+
+    best = None
+    events = settled(max_steps)
+    if events is not None:
+        writer.offer(events)
+        best = (search.objective(), [list(r) for r in search.routes], [list(t) for t in search.times])
+    elif verbose:
+        print(f"❌ No valid schedule after repair ({sum(search.violation) // 2} conflicting time units left)")
+
+    # Perturb + repair rounds; a round is kept if its objective is within a threshold of the
+    # current one that shrinks to zero at the time limit (record-to-record travel)
+    iterations = 0
+    current = best
+    while best is not None and time.time() < deadline and (bound is None or best[0] > bound):
+        iterations += 1
+        search.perturb()
+        events = settled(max_steps // 10 + 1)
+        threshold = acceptance * current[0] * (deadline - time.time()) / time_limit
+        if events is not None and search.objective() <= current[0] + threshold:
+            current = (search.objective(), [list(r) for r in search.routes], [list(t) for t in search.times])
+            if current[0] < best[0]:
+                writer.offer(events)
+                best = current
+        else:
+            search.set_state(current[1], current[2])
+
+    if verbose and writer.best_solution is not None:
+        print(f"🔁 {iterations} perturbation rounds, best objective {writer.best_objective} "
+              f"({time.time() - start:.2f}s)")
+    solution = writer.best_solution or {}
+    return {"objective_value": solution.get("objective_value"), "events": solution.get("events"),
+            "verified": writer.best_solution is not None, "iterations": iterations,
+            "seconds": time.time() - start}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Repair and improve a DISPLIB schedule by local search.")
+    parser.add_argument("problem")
+    parser.add_argument("initial", nargs="?", default=None, help="schedule to start from (solution format)")
+    parser.add_argument("--time-limit", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    with open(args.problem) as f:
+        data = json.load(f)
+    initial = None
+    if args.initial is not None:
+        with open(args.initial) as f:
+            initial = json.load(f)["events"]
+    result = local_search(data, initial, time_limit=args.time_limit, solution_path=args.output, seed=args.seed)
+    raise SystemExit(0 if result["verified"] else 1)
@@ -0,0 +1,348 @@
+"""
+Dry-run size report for the CP-SAT model of main.py and the Gurobi model of build_mip_model.
+Usage: displib_model_size.py PROBLEMFILE [--backend cp|mip|both] [--build] [--top N] [--max-mb MB]
+
+By default the per-family variable/constraint counts are estimated directly from the
+instance (no model is built, no conflict pair list is materialized). With --build the
+models are really built and counted, which is exact but costs the full build.
+"""
+
+import json
+import re
+import sys
+from collections import Counter, defaultdict
+from math import comb
+
+# Rough per-object memory figures (bytes), including the Python-side wrappers that the
+# builders keep around (tupledicts, dict entries, conflict pair tuples).
+MIP_BYTES_PER_VAR = 160
+MIP_BYTES_PER_CONSTR = 120
+MIP_BYTES_PER_NONZERO = 24
+MIP_BYTES_PER_CONFLICT_PAIR = 200
+CP_BYTES_PER_VAR = 150
+CP_BYTES_PER_CONSTR = 120
+CP_BYTES_PER_TERM = 16
+
+
+# ======================== Instance scan ========================
+
+def _resource_usage(trains):
+    # resource -> Counter(train -> number of (op, resource) usages), in one pass
+    usage = defaultdict(Counter)
+    for t_idx, train in enumerate(trains):
+        for op in train:
+            for r in op.get("resources", []):
+                usage[r["resource"]][t_idx] += 1
+    return usage
+
+
+def resource_pair_counts(trains):
+    # Per resource: (all pairs of usages, pairs between different trains)
+    counts = {}
+    for res, per_train in _resource_usage(trains).items():
+        n = sum(per_train.values())
+        all_pairs = comb(n, 2)
+        cross_pairs = all_pairs - sum(comb(c, 2) for c in per_train.values())
+        counts[res] = (all_pairs, cross_pairs)
+    return counts
+
+
+def _cp_successor_id(succ, op_map):
+    # Mirrors the successor parsing of main.build_cp_model ("t<train>_<op>" strings)
+    if isinstance(succ, str) and "_" in succ:
+        parts = succ[1:].split("_")
+        return int(parts[0]), op_map.get((int(parts[0]), int(parts[1])))
+    return None, None
+
+
+# ======================== Estimates ========================
+
+def estimate_mip_model_size(data):
+    trains = data["trains"]
+    objectives = data.get("objective", [])
+    pair_counts = resource_pair_counts(trains)
+    n_pairs = 2 * sum(cross for _, cross in pair_counts.values())
+
+    n_ops = sum(len(train) for train in trains)
+    n_succ = sum(len(op.get("successors", [])) for train in trains for op in train)
+    n_choice = sum(1 for train in trains for op in train if op.get("successors"))
+    n_choice_nz = n_succ
+    n_pred_nz = n_succ + n_ops
+    n_inc = sum(1 for obj in objectives if obj.get("increment", 0) > 0)
+    n_obj = len(objectives)
+
+    # family -> (count, nonzeros)
+    variables = {
+        "t": (n_ops, 0),
+        "active": (n_ops, 0),
+        "y": (n_succ, 0),
+        "b (upper bound)": (n_pairs, 0),
+        "delay": (n_obj, 0),
+        "diff": (n_obj, 0),
+        "penalty_trigger": (n_inc, 0),
+    }
+    constraints = {
+        "mutual": (n_pairs, 2 * n_pairs),
+        "conflict1": (n_pairs, 5 * n_pairs),
+        "conflict2": (n_pairs, 5 * n_pairs),
+        "time_lb": (n_ops, 2 * n_ops),
+        "time_ub": (n_ops, 2 * n_ops),
+        "succ_choice": (n_choice, n_choice_nz),
+        "succ_active_link": (n_succ, 2 * n_succ),
+        "succ_time_flow": (n_succ, 3 * n_succ),
+        "active_from_preds/source_active": (n_ops, n_pred_nz),
+        "t_lb_active": (n_ops, 2 * n_ops),
+        "t_ub_active": (n_ops, 2 * n_ops),
+        "calc_diff": (n_obj, 2 * n_obj),
+        "gen_max_delay (general)": (n_obj, 2 * n_obj),
+        "penalty_ind (general)": (n_inc, 2 * n_inc),
+    }
+    n_vars = sum(c for c, _ in variables.values())
+    n_constrs = sum(c for c, _ in constraints.values())
+    n_nz = sum(nz for _, nz in constraints.values())
+    memory = (n_vars * MIP_BYTES_PER_VAR + n_constrs * MIP_BYTES_PER_CONSTR
+              + n_nz * MIP_BYTES_PER_NONZERO + n_pairs * MIP_BYTES_PER_CONFLICT_PAIR)
+    worst = sorted(((cross, res) for res, (_, cross) in pair_counts.items()), reverse=True)
+    return {
+        "backend": "mip",
+        "variables": {k: c for k, (c, _) in variables.items()},
+        "constraints": {k: c for k, (c, _) in constraints.items()},
+        "num_vars": n_vars,
+        "num_constrs": n_constrs,
+        "num_nonzeros": n_nz,
+        "memory_mb": memory / 2**20,
+        "worst_resources": [(res, 2 * cross) for cross, res in worst],
+    }
+
+
+def _cp_operations(data):
+    # Same operation list as main.load_operations, without importing OR-Tools
+    operations = []
+    op_map = {}
+    for t_idx, train in enumerate(data["trains"]):
+        for o_idx, op in enumerate(train):
+            op_map[(t_idx, o_idx)] = len(operations)
+            operations.append({
+                "train": t_idx,
+                "op_idx": o_idx,
+                "resources": [r["resource"] for r in op.get("resources", [])],
+                "successors": op.get("successors", []),
+            })
+    return operations, op_map
+
+
+def estimate_cp_model_size(data):
+    objectives = data.get("objective", [])
+    operations, op_map = _cp_operations(data)
+    pair_counts = resource_pair_counts(data["trains"])
+    n_pairs = sum(all_pairs for all_pairs, _ in pair_counts.values())
+    n_ops = len(operations)
+
+    n_prec = 0
+    choice_points = []
+    for op in operations:
+        for succ in op["successors"]:
+            if _cp_successor_id(succ, op_map)[1] is not None:
+                n_prec += 1
+        if len(op["successors"]) > 1:
+            n_y = sum(1 for succ in op["successors"]
+                      if _cp_successor_id(succ, op_map)[0] == op["train"]
+                      and _cp_successor_id(succ, op_map)[1] is not None)
+            if n_y:
+                choice_points.append((n_y, set(op["resources"])))
+    n_y = sum(n for n, _ in choice_points)
+    n_mutex = sum(n1 * n2 for idx, (n1, res1) in enumerate(choice_points)
+                  for n2, res2 in choice_points[idx + 1:] if res1 & res2)
+
+    segments = Counter()
+    for op in operations:
+        for i in range(len(op["resources"]) - 1):
+            segments[(op["resources"][i], op["resources"][i + 1])] += 1
+    n_seg_intervals = sum(segments.values())
+    n_seg_no_overlap = sum(1 for c in segments.values() if c > 1)
+
+    delay_objs = [obj for obj in objectives if obj["type"] == "op_delay"
+                  and (obj["train"], obj["operation"]) in op_map]
+    n_obj = len(delay_objs)
+    n_inc = sum(1 for obj in delay_objs if obj.get("increment", 0) > 0)
+    n_continuity = sum(1 for op in operations if op["op_idx"] > 0)
+    n_priority = 1 if (0, 1) in op_map and (1, 1) in op_map else 0
+
+    # family -> (count, terms)
+    variables = {
+        "start": (n_ops, 0),
+        "end": (n_ops, 0),
+        "y": (n_y, 0),
+        "order": (n_pairs, 0),
+        "release_conflict": (n_pairs, 0),
+        "delay": (n_obj, 0),
+        "has_delay/inc": (2 * n_inc, 0),
+        "penalty": (n_obj, 0),
+        "total_penalty": (1 if n_obj else 0, 0),
+    }
+    constraints = {
+        "interval": (n_ops, 3 * n_ops),
+        "pathseg interval": (n_seg_intervals, 3 * n_seg_intervals),
+        "precedence": (n_prec, 2 * n_prec),
+        "path selection": (n_y + len(choice_points), 3 * n_y + n_y),
+        "path mutual exclusion": (n_mutex, 2 * n_mutex),
+        "continuity": (n_continuity, 2 * n_continuity),
+        "order": (2 * n_pairs, 6 * n_pairs),
+        "no_overlap": (len(pair_counts), sum(1 for op in operations for _ in op["resources"])),
+        "release_conflict": (2 * n_pairs, 6 * n_pairs),
+        "pathseg no_overlap": (n_seg_no_overlap, n_seg_intervals),
+        "priority": (n_priority, 2 * n_priority),
+        "objective": (2 * n_obj + 4 * n_inc + 1, 5 * n_obj + 8 * n_inc + n_obj + 1),
+    }
+    n_vars = sum(c for c, _ in variables.values())
+    n_constrs = sum(c for c, _ in constraints.values())
+    n_terms = sum(terms for _, terms in constraints.values())
+    memory = n_vars * CP_BYTES_PER_VAR + n_constrs * CP_BYTES_PER_CONSTR + n_terms * CP_BYTES_PER_TERM
+    worst = sorted(((all_pairs, res) for res, (all_pairs, _) in pair_counts.items()), reverse=True)
+    return {
+        "backend": "cp",
+        "variables": {k: c for k, (c, _) in variables.items()},
+        "constraints": {k: c for k, (c, _) in constraints.items()},
+        "num_vars": n_vars,
+        "num_constrs": n_constrs,
+        "num_nonzeros": n_terms,
+        "memory_mb": memory / 2**20,
+        "worst_resources": [(res, all_pairs) for all_pairs, res in worst],
+    }
+
+
+# ======================== Exact counts from a built model ========================
+
+def _family(name):
+    return re.split(r"\[|_(?=\d)|_(?=train\d)", name)[0] or "(unnamed)"
+
+
+def _max_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def count_mip_model(filepath):
+    from MIP_READ_BUILD_MODEL import read_displib_json, build_mip_model
+
+    rss_before = _max_rss_mb()
+    d = read_displib_json(filepath)
+    model, t, active, y = build_mip_model(
+        d['trains'], d['operations'], d['conflict_pairs'], d['train_paths'],
+        d['headways'], d['time_windows'], d['objectives']
+    )
+    model.update()
+    variables = Counter(_family(v.VarName) for v in model.getVars())
+    constraints = Counter(_family(c.ConstrName) for c in model.getConstrs())
+    for gc in model.getGenConstrs():
+        constraints[_family(gc.GenConstrName) + " (general)"] += 1
+    rss_after = _max_rss_mb()
+    report = {
+        "backend": "mip",
+        "variables": dict(variables),
+        "constraints": dict(constraints),
+        "num_vars": model.NumVars,
+        "num_constrs": model.NumConstrs + model.NumGenConstrs,
+        "num_nonzeros": model.NumNZs,
+        "memory_mb": None if rss_before is None else rss_after - rss_before,
+    }
+    model.dispose()
+    return report
+
+
+def count_cp_model(data):
+    from main import build_cp_model
+
+    rss_before = _max_rss_mb()
+    model = build_cp_model(data)[0]
+    proto = model.Proto()
+    variables = Counter(_family(v.name) for v in proto.variables)
+    constraints = Counter()
+    n_terms = 0
+    for c in proto.constraints:
+        if hasattr(c, "WhichOneof"):
+            kind = c.WhichOneof("constraint")
+        else:
+            kind = next(k for k in CP_CONSTRAINT_KINDS if getattr(c, "has_" + k)())
+        if len(c.enforcement_literal) > 0:
+            kind += " (enforced)"
+        constraints[kind] += 1
+        if c.has_linear() if hasattr(c, "has_linear") else c.HasField("linear"):
+            n_terms += len(c.linear.vars)
+    rss_after = _max_rss_mb()
+    return {
+        "backend": "cp",
+        "variables": dict(variables),
+        "constraints": dict(constraints),
+        "num_vars": len(proto.variables),
+        "num_constrs": len(proto.constraints),
+        "num_nonzeros": n_terms,
+        "memory_mb": None if rss_before is None else rss_after - rss_before,
+    }
+
+
+CP_CONSTRAINT_KINDS = [
+    "linear", "interval", "no_overlap", "bool_or", "bool_and", "at_most_one", "exactly_one",
+    "bool_xor", "int_prod", "int_div", "int_mod", "lin_max", "element", "table", "automaton",
+    "inverse", "reservoir", "circuit", "routes", "all_diff", "cumulative", "no_overlap_2d",
+]
+
+
+# ======================== Report ========================
+
+def print_report(report, top=10):
+    title = {"cp": "CP-SAT model (main.py)", "mip": "Gurobi model (build_mip_model)"}[report["backend"]]
+    print(f"\n📐 {title}")
+    print("  Variables:")
+    for family, count in sorted(report["variables"].items(), key=lambda kv: -kv[1]):
+        print(f"    {family:<36}{count:>14,}")
+    print("  Constraints:")
+    for family, count in sorted(report["constraints"].items(), key=lambda kv: -kv[1]):
+        print(f"    {family:<36}{count:>14,}")
+    print(f"  Total: {report['num_vars']:,} variables, {report['num_constrs']:,} constraints, "
+          f"{report['num_nonzeros']:,} nonzeros")
+    if report["memory_mb"] is not None:
+        print(f"  Memory: ~{report['memory_mb']:,.1f} MB")
+    if report.get("worst_resources"):
+        print(f"  Worst resources by conflict pairs (top {top}):")
+        for res, pairs in report["worst_resources"][:top]:
+            print(f"    {res:<36}{pairs:>14,}")
+
+
+def dry_run(filepath, backend="both", build=False, top=10):
+    with open(filepath) as f:
+        data = json.load(f)
+    backends = ["cp", "mip"] if backend == "both" else [backend]
+    reports = []
+    for b in backends:
+        if build:
+            report = count_cp_model(data) if b == "cp" else count_mip_model(filepath)
+        else:
+            report = estimate_cp_model_size(data) if b == "cp" else estimate_mip_model_size(data)
+        print_report(report, top=top)
+        reports.append(report)
+    return reports
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report per-family model sizes without solving.")
+    parser.add_argument("problem")
+    parser.add_argument("--backend", choices=["cp", "mip", "both"], default="both")
+    parser.add_argument("--build", action="store_true", help="build the models and count exactly")
+    parser.add_argument("--top", type=int, default=10, help="number of worst resources to list")
+    parser.add_argument("--max-mb", type=float, default=None,
+                        help="exit with status 2 if any estimated model exceeds this size")
+    args = parser.parse_args()
+
+    reports = dry_run(args.problem, backend=args.backend, build=args.build, top=args.top)
+    if args.max_mb is not None:
+        too_big = [r["backend"] for r in reports if r["memory_mb"] is not None and r["memory_mb"] > args.max_mb]
+        if too_big:
+            print(f"\n❌ Model(s) {', '.join(too_big)} exceed {args.max_mb} MB, reject or decompose the instance.")
+            sys.exit(2)
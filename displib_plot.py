@@ -0,0 +1,400 @@
+"""
+Gantt rendering of DISPLIB solutions that scales to schedules with tens of thousands of events.
+Usage: displib_plot.py SOLUTIONFILE [SOLUTIONFILE ...] [--problem PROBLEMFILE] [--window T0 T1]
+                       [--output-dir DIR] [--format png|svg]
+
+Occupation intervals are computed with numpy: an event occupies its train from the event
+time until the train's next event, followed by the operation's release time (taken from
+the problem; without a problem only the time until the next event is known). Each train is
+drawn with a single broken_barh call and all release tails with one PolyCollection, and
+intervals starting within the same pixel column are merged before drawing.
+"""
+
+import json
+
+import numpy as np
+
+
+def _load_json(obj):
+    if isinstance(obj, str):
+        with open(obj, encoding="utf-8") as f:
+            return json.load(f)
+    return obj
+
+
+def _operation_table(problem):
+    # Flat per-operation arrays indexed by offsets[train] + op
+    trains = problem["trains"]
+    offsets = np.zeros(len(trains) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(train) for train in trains])
+    min_duration = np.array([op.get("min_duration", 0) for train in trains for op in train], dtype=np.int64)
+    release = np.array([max((r.get("release_time", 0) for r in op.get("resources", [])), default=0)
+                        for train in trains for op in train], dtype=np.int64)
+    return offsets, min_duration, release
+
+
+def occupation_intervals(solution, problem=None):
+    # Returns a dict of equally long arrays sorted by (train, start): event (index in the
+    # solution's event list), train, operation, start, end (next event of the train),
+    # release_end (end + release time)
+    solution = _load_json(solution)
+    events = solution["events"]
+    train = np.fromiter((e["train"] for e in events), dtype=np.int64, count=len(events))
+    operation = np.fromiter((e["operation"] for e in events), dtype=np.int64, count=len(events))
+    start = np.fromiter((e["time"] for e in events), dtype=np.int64, count=len(events))
+
+    # Events are in time order, so a stable sort by train keeps each train's sequence
+    order = np.argsort(train, kind="stable")
+    train, operation, start = train[order], operation[order], start[order]
+
+    is_last = np.ones(len(train), dtype=bool)
+    is_last[:-1] = train[1:] != train[:-1]
+    end = np.empty_like(start)
+    end[:-1] = start[1:]
+    if problem is not None:
+        offsets, min_duration, release = _operation_table(_load_json(problem))
+        flat = offsets[train] + operation
+        end[is_last] = start[is_last] + min_duration[flat[is_last]]
+        release_end = end + release[flat]
+    else:
+        end[is_last] = start[is_last]
+        release_end = end.copy()
+    return {"event": order, "train": train, "operation": operation, "start": start, "end": end,
+            "release_end": release_end}
+
+
+def clip_to_window(intervals, t0=None, t1=None):
+    keep = np.ones(len(intervals["start"]), dtype=bool)
+    if t0 is not None:
+        keep &= intervals["release_end"] >= t0
+    if t1 is not None:
+        keep &= intervals["start"] <= t1
+    return {k: v[keep] for k, v in intervals.items()}
+
+
+def merge_close_intervals(train, start, end, origin, resolution):
+    # Level of detail: merge the intervals of a row that start within the same pixel
+    # column (`resolution` time units wide), so at most one rectangle per pixel and train
+    # is drawn. Inputs must be sorted by (train, start).
+    if len(start) == 0 or resolution <= 0:
+        return train, start, end
+    column = np.floor((start - origin) / resolution).astype(np.int64)
+    new_group = np.ones(len(start), dtype=bool)
+    new_group[1:] = (train[1:] != train[:-1]) | (column[1:] != column[:-1])
+    idx = np.flatnonzero(new_group)
+    return train[idx], start[idx], np.maximum.reduceat(end, idx)
+
+
+def _rectangles(rows, start, end, height):
+    # Vertices of axis-aligned rectangles for a PolyCollection, shape (n, 4, 2)
+    y0 = rows - height / 2
+    y1 = rows + height / 2
+    return np.stack([
+        np.stack([start, y0], axis=1), np.stack([end, y0], axis=1),
+        np.stack([end, y1], axis=1), np.stack([start, y1], axis=1),
+    ], axis=1).astype(float)
+
+
+def _new_figure(output_path, figsize):
+    if output_path is not None:
+        # Headless rendering, no GUI backend or pyplot state involved
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=figsize)
+    else:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=figsize)
+    return fig, fig.add_subplot(1, 1, 1)
+
+
+def _finish_figure(fig, output_path, dpi):
+    if output_path is None:
+        import matplotlib.pyplot as plt
+        plt.show()
+    else:
+        fig.savefig(output_path, dpi=dpi)
+
+
+def plot_train_gantt(solution, problem=None, output_path=None, time_window=None, title=None,
+                     width_px=2400, max_labels=60, dpi=150):
+    import matplotlib
+    from matplotlib.collections import PolyCollection
+
+    solution = _load_json(solution)
+    intervals = occupation_intervals(solution, problem)
+    t0, t1 = time_window if time_window is not None else (None, None)
+    intervals = clip_to_window(intervals, t0, t1)
+
+    train_ids = np.unique(intervals["train"])
+    row_of = {int(tr): row for row, tr in enumerate(train_ids)}
+    n_rows = max(len(train_ids), 1)
+    lo = t0 if t0 is not None else (intervals["start"].min() if len(train_ids) else 0)
+    hi = t1 if t1 is not None else (intervals["release_end"].max() if len(train_ids) else 1)
+    resolution = max(hi - lo, 1) / width_px
+
+    fig, ax = _new_figure(output_path, figsize=(width_px / dpi, min(0.25 * n_rows + 2, 200)))
+    cmap = matplotlib.colormaps["tab20"]
+
+    # Occupation: one broken_barh per train after level-of-detail merging
+    train, start, end = merge_close_intervals(intervals["train"], intervals["start"], intervals["end"],
+                                              lo, resolution)
+    bounds = np.flatnonzero(np.r_[True, train[1:] != train[:-1], True]) if len(train) else []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        tr = int(train[a])
+        ax.broken_barh(np.stack([start[a:b], end[a:b] - start[a:b]], axis=1),
+                       (row_of[tr] - 0.3, 0.6), facecolors=cmap(tr % 20), edgecolors="white", linewidth=0.2)
+
+    # Release tails: a single collection for the whole chart, in a thin band under each row
+    has_tail = intervals["release_end"] > intervals["end"]
+    if has_tail.any():
+        train, start, end = merge_close_intervals(intervals["train"][has_tail], intervals["end"][has_tail],
+                                                  intervals["release_end"][has_tail], lo, resolution)
+        rows = np.searchsorted(train_ids, train)
+        tails = _rectangles(rows + 0.38, start, end, 0.12)
+        ax.add_collection(PolyCollection(tails, facecolors="0.5", edgecolors="none"))
+
+    step = max(1, n_rows // max_labels)
+    ax.set_yticks(range(0, len(train_ids), step))
+    ax.set_yticklabels([f"Train {train_ids[i]}" for i in range(0, len(train_ids), step)], fontsize=8)
+    ax.set_ylim(-1, n_rows)
+    ax.set_xlim(lo, hi)
+    ax.set_xlabel("Time", fontsize=11)
+    objective_value = solution.get("objective_value")
+    ax.set_title(f"Train Operation Schedule{' for ' + title if title else ''} (Objective: {objective_value})",
+                 fontsize=13, pad=15)
+    ax.grid(True, axis="x", linestyle="--", alpha=0.4)
+    fig.tight_layout()
+    _finish_figure(fig, output_path, dpi)
+    return fig
+
+
+# ======================== Resource view ========================
+
+def _resource_table(problem):
+    # CSR layout of resource usages per flat operation: ptr, resource ids, release times
+    trains = problem["trains"]
+    names = sorted({r["resource"] for train in trains for op in train for r in op.get("resources", [])})
+    res_id = {name: i for i, name in enumerate(names)}
+    counts, usage_res, usage_rel = [], [], []
+    for train in trains:
+        for op in train:
+            resources = op.get("resources", [])
+            counts.append(len(resources))
+            usage_res.extend(res_id[r["resource"]] for r in resources)
+            usage_rel.extend(r.get("release_time", 0) for r in resources)
+    ptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum(counts)
+    return names, ptr, np.array(usage_res, dtype=np.int64), np.array(usage_rel, dtype=np.int64)
+
+
+def _group_running_max(values, groups):
+    # np.maximum.accumulate restarted at every group; `groups` must be sorted
+    if len(values) == 0:
+        return values
+    base = values.min()
+    span = values.max() - base + 1
+    shifted = (values - base) + groups * span
+    return np.maximum.accumulate(shifted) - groups * span + base
+
+
+def resource_intervals(solution, problem):
+    # One row per (event, resource used by its operation), merged so that a train holding
+    # a resource over several consecutive operations forms one interval. Sorted by
+    # (resource, start). Returns the intervals and the resource names.
+    solution, problem = _load_json(solution), _load_json(problem)
+    occ = occupation_intervals(solution, problem)
+    offsets = _operation_table(problem)[0]
+    names, ptr, usage_res, usage_rel = _resource_table(problem)
+
+    flat = offsets[occ["train"]] + occ["operation"]
+    n_use = ptr[flat + 1] - ptr[flat]
+    row = np.repeat(np.arange(len(flat)), n_use)
+    # position of each usage inside the CSR arrays
+    use = np.repeat(ptr[flat], n_use) + (np.arange(len(row)) - np.repeat(np.cumsum(n_use) - n_use, n_use))
+    iv = {
+        "resource": usage_res[use],
+        "train": occ["train"][row],
+        "event": occ["event"][row],
+        "start": occ["start"][row],
+        "end": occ["end"][row],
+        "release_end": occ["end"][row] + usage_rel[use],
+    }
+
+    # Merge same-train occupations of a resource that touch or overlap
+    order = np.lexsort((iv["start"], iv["train"], iv["resource"]))
+    iv = {k: v[order] for k, v in iv.items()}
+    if len(order):
+        same = np.r_[False, (iv["resource"][1:] == iv["resource"][:-1]) & (iv["train"][1:] == iv["train"][:-1])]
+        group = np.cumsum(~same) - 1
+        reach = _group_running_max(iv["release_end"], group)
+        new = ~same
+        new[1:] |= iv["start"][1:] > reach[:-1]
+        idx = np.flatnonzero(new)
+        iv = {
+            "resource": iv["resource"][idx],
+            "train": iv["train"][idx],
+            "event": iv["event"][idx],
+            "start": iv["start"][idx],
+            "end": np.maximum.reduceat(iv["end"], idx),
+            "release_end": np.maximum.reduceat(iv["release_end"], idx),
+        }
+
+    order = np.lexsort((iv["start"], iv["resource"]))
+    return {k: v[order] for k, v in iv.items()}, names
+
+
+def find_resource_conflicts(iv):
+    # Sweep over each resource's intervals sorted by start: an interval conflicts if it
+    # starts before the running maximum end (overlap) or release end (release violation)
+    # of the earlier intervals on the same resource, which belong to other trains after
+    # the same-train merge above.
+    n = len(iv["start"])
+    overlap = np.zeros(n, dtype=bool)
+    release = np.zeros(n, dtype=bool)
+    if n > 1:
+        same_res = iv["resource"][1:] == iv["resource"][:-1]
+        group = np.cumsum(np.r_[True, ~same_res]) - 1
+        prev_end = _group_running_max(iv["end"], group)[:-1]
+        prev_release = _group_running_max(iv["release_end"], group)[:-1]
+        overlap[1:] = same_res & (iv["start"][1:] < prev_end)
+        release[1:] = same_res & ~overlap[1:] & (iv["start"][1:] < prev_release)
+    return overlap, release
+
+
+def resource_utilization(iv, num_resources):
+    # Fraction of the schedule's time span during which each resource is occupied
+    # (occupation only, release tails excluded)
+    busy = np.bincount(iv["resource"], weights=iv["end"] - iv["start"], minlength=num_resources)
+    span = max(iv["release_end"].max() - iv["start"].min(), 1) if len(iv["start"]) else 1
+    return busy / span
+
+
+def resource_report(solution, problem):
+    from displib_verify import parse_problem, parse_solution, verify_solution, SolutionValidationError
+
+    solution, problem = _load_json(solution), _load_json(problem)
+    iv, names = resource_intervals(solution, problem)
+    overlap, release = find_resource_conflicts(iv)
+    utilization = resource_utilization(iv, len(names))
+
+    verify_error, flagged_events = None, []
+    try:
+        verify_solution(parse_problem(problem), parse_solution(solution))
+    except SolutionValidationError as e:
+        verify_error = str(e)
+        flagged_events = e.relevant_event_idxs or []
+
+    ranking = np.argsort(-utilization, kind="stable")
+    return {
+        "intervals": iv,
+        "resources": names,
+        "overlap": overlap,
+        "release_violation": release,
+        "utilization": utilization,
+        "ranking": ranking,
+        "verify_error": verify_error,
+        "flagged": np.isin(iv["event"], flagged_events),
+    }
+
+
+def plot_resource_timeline(solution, problem, output_path=None, time_window=None, max_resources=200,
+                           title=None, width_px=2400, dpi=150):
+    # Resources ranked by utilization (top `max_resources`) against time. Every layer is a
+    # single PolyCollection: occupations coloured by train, release tails, and in red the
+    # overlaps / release-time violations found by the sweep and the events reported by
+    # displib_verify.
+    import matplotlib
+    from matplotlib.collections import PolyCollection
+
+    solution, problem = _load_json(solution), _load_json(problem)
+    report = resource_report(solution, problem)
+    iv = report["intervals"]
+    shown = report["ranking"][:max_resources] if max_resources else report["ranking"]
+    row_of = np.full(len(report["resources"]), -1, dtype=np.int64)
+    row_of[shown] = np.arange(len(shown))
+
+    keep = row_of[iv["resource"]] >= 0
+    t0, t1 = time_window if time_window is not None else (None, None)
+    if t0 is not None:
+        keep &= iv["release_end"] >= t0
+    if t1 is not None:
+        keep &= iv["start"] <= t1
+    rows = row_of[iv["resource"][keep]]
+    start, end, release_end = iv["start"][keep], iv["end"][keep], iv["release_end"][keep]
+    train = iv["train"][keep]
+    conflict = (report["overlap"] | report["release_violation"])[keep]
+    flagged = report["flagged"][keep]
+
+    lo = t0 if t0 is not None else (start.min() if len(start) else 0)
+    hi = t1 if t1 is not None else (release_end.max() if len(start) else 1)
+    n_rows = max(len(shown), 1)
+    fig, ax = _new_figure(output_path, figsize=(width_px / dpi, min(0.12 * n_rows + 2, 200)))
+    cmap = matplotlib.colormaps["tab20"]
+
+    ax.add_collection(PolyCollection(_rectangles(rows, start, end, 0.8),
+                                     facecolors=cmap(train % 20), edgecolors="none"))
+    tail = release_end > end
+    ax.add_collection(PolyCollection(_rectangles(rows[tail], end[tail], release_end[tail], 0.8),
+                                     facecolors="0.75", edgecolors="none"))
+    bad = conflict | flagged
+    if bad.any():
+        ax.add_collection(PolyCollection(_rectangles(rows[bad], start[bad], release_end[bad], 0.9),
+                                         facecolors="none", edgecolors="red", linewidths=1.0))
+
+    step = max(1, n_rows // 80)
+    ax.set_yticks(range(0, len(shown), step))
+    ax.set_yticklabels([f"{report['resources'][shown[i]]} ({report['utilization'][shown[i]]:.0%})"
+                        for i in range(0, len(shown), step)], fontsize=6)
+    ax.set_ylim(n_rows, -1)
+    ax.set_xlim(lo, hi)
+    ax.set_xlabel("Time", fontsize=11)
+    n_conflicts = int((report["overlap"] | report["release_violation"]).sum())
+    ax.set_title(f"Resource occupation{' for ' + title if title else ''} "
+                 f"({n_conflicts} conflicts{', verify: ' + report['verify_error'] if report['verify_error'] else ''})",
+                 fontsize=11, pad=15)
+    ax.grid(True, axis="x", linestyle="--", alpha=0.4)
+    fig.tight_layout()
+    _finish_figure(fig, output_path, dpi)
+    return report
+
+
+def print_resource_report(report, top=10):
+    iv = report["intervals"]
+    print(f"📊 {len(report['resources'])} resources, {int(report['overlap'].sum())} overlaps, "
+          f"{int(report['release_violation'].sum())} release-time violations")
+    if report["verify_error"]:
+        print(f"❌ displib_verify: {report['verify_error']}")
+    for r in report["ranking"][:top]:
+        print(f"  {report['resources'][r]:<30}{report['utilization'][r]:>7.1%}")
+    for idx in np.flatnonzero(report["overlap"] | report["release_violation"])[:top]:
+        kind = "overlap" if report["overlap"][idx] else "release"
+        print(f"  ⚠ {kind} on {report['resources'][iv['resource'][idx]]}: train {iv['train'][idx]} "
+              f"at {iv['start'][idx]} (event {iv['event'][idx]})")
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Render DISPLIB solutions as Gantt charts.")
+    parser.add_argument("solutions", nargs="+")
+    parser.add_argument("--problem", default=None)
+    parser.add_argument("--window", nargs=2, type=float, default=None, metavar=("T0", "T1"))
+    parser.add_argument("--output-dir", default=None, help="write charts here instead of showing them")
+    parser.add_argument("--format", choices=["png", "svg"], default="png")
+    parser.add_argument("--by-resource", action="store_true", help="resource occupation view (needs --problem)")
+    args = parser.parse_args()
+
+    problem = _load_json(args.problem) if args.problem else None
+    for path in args.solutions:
+        name = os.path.splitext(os.path.basename(path))[0]
+        output_path = None
+        if args.output_dir is not None:
+            os.makedirs(args.output_dir, exist_ok=True)
+            output_path = os.path.join(args.output_dir, f"{name}.{args.format}")
+        if args.by_resource:
+            report = plot_resource_timeline(path, problem, output_path=output_path, time_window=args.window, title=name)
+            print_resource_report(report)
+        else:
+            plot_train_gantt(path, problem, output_path=output_path, time_window=args.window, title=name)
+        if output_path is not None:
+            print(f"✅ {output_path}")
@@ -0,0 +1,199 @@
+"""
+Pools of distinct good solutions from one solve, for operators to choose from.
+
+SolutionPool verifies every offered schedule (displib_verify), drops duplicates by event
+signature (the set of (train, operation, time) events) and keeps the best `size` ones,
+optionally only those within a relative `gap` of the best objective.
+  * Gurobi: one solve with PoolSolutions / PoolSearchMode=2 / PoolGap; every pool member
+    (model.Xn) is read back into a schedule.
+  * CP-SAT has no solution pool: every incumbent of the main solve is collected by the
+    solution callback, then the same model is re-solved in short rounds, each with a
+    no-good that forces at least one ordering or route decision (order_*, y_*, swap_*
+    literals) to differ from every schedule found in earlier rounds, and an objective
+    cutoff at the gap.
+The pool file is compact JSON {"problem", "backend", "solutions": [{"objective_value",
+"events"}, ...]} (best first), which `displib_verify.py --batch` reads as a solution pool.
+Usage: displib_pool.py PROBLEMFILE [--backend cp|mip] [--size N] [--gap G] [--time-limit S] [--output POOLFILE]
+"""
+
+import json
+import os
+import time
+
+from displib_anytime import order_simultaneous_events, write_json_atomic
+from displib_verify import Event, Solution, SolutionValidationError, INFINITY, parse_problem, verify_solution
+
+# CP-SAT literals that encode ordering and route decisions (see main.build_cp_model)
+DECISION_PREFIXES = ("order_", "y_", "swap_")
+
+
+# ======================== Pool ========================
+
+def event_signature(events):
+    return tuple(sorted((e["train"], e["operation"], e["time"]) for e in events))
+
+
+class SolutionPool:
+    def __init__(self, problem, size=10, gap=None):
+        # problem: raw problem dict or parsed Problem; gap: keep objectives <= best + gap * max(best, 1)
+        self.problem = parse_problem(problem) if isinstance(problem, dict) else problem
+        self.size = size
+        self.gap = gap
+        self.members = {}  # signature -> {"objective_value", "events"}
+        self.num_offered = 0
+        self.num_rejected = 0
+        self.num_duplicates = 0
+
+    def offer(self, events):
+        # Returns True if the schedule is valid and new (it may still fall outside the best `size`)
+        self.num_offered += 1
+        events = order_simultaneous_events(self.problem, events)
+        signature = event_signature(events)
+        if signature in self.members:
+            self.num_duplicates += 1
+            return False
+        try:
+            value = verify_solution(self.problem, Solution(INFINITY, [Event(e["time"], e["train"], e["operation"])
+                                                                      for e in events]))
+        except SolutionValidationError:
+            self.num_rejected += 1
+            return False
+        self.members[signature] = {"objective_value": value, "events": list(events)}
+        return True
+
+    @property
+    def best_objective(self):
+        return min((m["objective_value"] for m in self.members.values()), default=None)
+
+    def within_gap(self, value):
+        best = self.best_objective
+        return self.gap is None or best is None or value <= best + self.gap * max(best, 1)
+
+    def solutions(self):
+        # Best first, at most `size`, within the gap
+        ranked = sorted(self.members.values(), key=lambda m: (m["objective_value"], event_signature(m["events"])))
+        return [m for m in ranked if self.within_gap(m["objective_value"])][:self.size]
+
+    def write(self, path, problem_name=None, backend=None):
+        write_json_atomic({"problem": problem_name, "backend": backend, "solutions": self.solutions()}, path,
+                          indent=None)
+
+    def report(self):
+        solutions = self.solutions()
+        print(f"🗂 pool: {len(solutions)} distinct solution(s) "
+              f"(objectives {[s['objective_value'] for s in solutions]}); {self.num_offered} offered, "
+              f"{self.num_duplicates} duplicate(s), {self.num_rejected} rejected by the verifier")
+
+
+# ======================== Gurobi ========================
+
+def mip_pool(problem_path, size=10, gap=None, time_limit=None, params=None, **solve_options):
+    # solve_options: passed on to MIP_solver.solve_mip (swapping, contract, paths, ...)
+    from MIP_solver import solve_mip, get_solution_events, original_events
+
+    pool_params = {"PoolSolutions": size, "PoolSearchMode": 2}
+    if gap is not None:
+        pool_params["PoolGap"] = gap
+    model, writer = solve_mip(problem_path, time_limit=time_limit, params=dict(pool_params, **(params or {})),
+                              **solve_options)
+    pool = SolutionPool(writer.problem, size, gap)
+    if model is None:
+        return pool
+    for k in range(model.SolCount):
+        model.setParam('SolutionNumber', k)
+        pool.offer(original_events(model, get_solution_events(
+            model._successor_index, model.getAttr('Xn', model._t), model.getAttr('Xn', model._active),
+            model.getAttr('Xn', model._y))))
+    return pool
+
+
+# ======================== CP-SAT ========================
+
+def _decision_literals(model):
+    proto = model.Proto()
+    return [model.GetBoolVarFromProtoIndex(idx) for idx, var in enumerate(proto.variables)
+            if var.name.startswith(DECISION_PREFIXES)]
+
+
+def cp_pool(problem_path, size=10, gap=0.1, time_limit=60.0, round_time=None, params=None, swapping=False,
+            symmetry=False, fix_orders=False):
+    # The main solve gets half of the time limit, the diversity rounds share the rest
+    # (round_time each, default a tenth of the time limit)
+    from ortools.sat.python import cp_model
+    from main import build_cp_model, get_events
+
+    class PoolCallback(cp_model.CpSolverSolutionCallback):
+        def __init__(self):
+            super().__init__()
+
+        def OnSolutionCallback(self):
+            pool.offer(get_events(self.Value, operations, start_vars))
+
+    start = time.time()
+    with open(problem_path) as f:
+        data = json.load(f)
+    pool = SolutionPool(data, size, gap)
+    model, operations, op_map, start_vars, total_penalty = build_cp_model(data, swapping=swapping, symmetry=symmetry,
+                                                                          fix_orders=fix_orders)
+    literals = _decision_literals(model)
+    solver = cp_model.CpSolver()
+    for name, value in (params or {}).items():
+        setattr(solver.parameters, name, value)
+
+    solver.parameters.max_time_in_seconds = time_limit / 2
+    status = solver.Solve(model, PoolCallback())
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        print(f"❌ CP-SAT found no solution ({solver.StatusName(status)})")
+        return pool
+    if total_penalty is not None and gap is not None:
+        best = solver.Value(total_penalty)
+        model.Add(total_penalty <= int(best + gap * max(best, 1)))
+
+    round_time = round_time or max(1.0, time_limit / 10)
+    rounds = 0
+    while len(pool.solutions()) < size and time.time() - start < time_limit:
+        # Forbid the decisions of the last schedule, hint its start times
+        values = [solver.BooleanValue(lit) for lit in literals]
+        if not literals:
+            break
+        model.AddBoolOr([lit.Not() if value else lit for lit, value in zip(literals, values)])
+        model.ClearHints()
+        for oid, var in start_vars.items():
+            model.AddHint(var, solver.Value(var))
+        solver.parameters.max_time_in_seconds = max(0.5, min(round_time, time_limit - (time.time() - start)))
+        status = solver.Solve(model, PoolCallback())
+        rounds += 1
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            break  # no other decisions within the gap (or none found in time)
+    print(f"🔁 {rounds} diversity round(s) in {time.time() - start:.2f}s, last {solver.StatusName(status)}")
+    return pool
+
+
+def solution_pool(problem_path, backend="mip", size=10, gap=None, time_limit=None, pool_path=None, **options):
+    # Collects, reports and (with pool_path) writes the pool; returns it
+    if backend == "mip":
+        pool = mip_pool(problem_path, size=size, gap=gap, time_limit=time_limit, **options)
+    else:
+        pool = cp_pool(problem_path, size=size, gap=0.1 if gap is None else gap, time_limit=time_limit or 60.0,
+                       **options)
+    pool.report()
+    if pool_path is not None:
+        pool.write(pool_path, problem_name=os.path.basename(problem_path), backend=backend)
+    return pool
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Collect a pool of distinct verified solutions.")
+    parser.add_argument("problem")
+    parser.add_argument("--backend", choices=["cp", "mip"], default="mip")
+    parser.add_argument("--size", type=int, default=10)
+    parser.add_argument("--gap", type=float, default=None, help="relative objective gap to the best solution")
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument("--output", default=None, help="pool file")
+    args = parser.parse_args()
+
+    pool = solution_pool(args.problem, backend=args.backend, size=args.size, gap=args.gap,
+                         time_limit=args.time_limit, pool_path=args.output)
+    raise SystemExit(0 if pool.solutions() else 1)
@@ -0,0 +1,505 @@
+"""
+Instance analysis shared by the CP-SAT (main.py) and Gurobi (MIP_READ_BUILD_MODEL.py) models.
+
+The functions work on operation dicts with 'train', 'op_idx', 'resources' and integer
+'successors' keys, which both the CP-SAT operation list (main.load_operations) and
+read_displib_json provide. Release times are stored under 'release_times' by main.py and
+'resource_release_times' by read_displib_json, hence the release_key arguments.
+"""
+
+from collections import defaultdict
+
+
+# ======================== Swapping (head-on) conflicts ========================
+
+def find_swapping_pairs(operations, release_key="resource_release_times"):
+    # A swapping conflict: train A moves u -> v from resource r1 to r2 while train B moves
+    # u' -> v' from r2 to r1. Each train's transitions are hashed by (r1, r2) and joined on
+    # the reversed key, so the cost is linear in the number of transitions plus the number
+    # of pairs found (instead of all train pairs times all op pairs).
+    #
+    # Returns a list of (a, b, release_a, release_b) with a = (train, u, v) and
+    # b = (train', u', v'), train < train'. release_a is A's release time of r2 at v (what B
+    # has to wait for when A goes first), release_b is B's release time of r1 at v'.
+    op_by_key = {(op['train'], op['op_idx']): op for op in operations}
+
+    def release(op, res):
+        return op[release_key][op['resources'].index(res)]
+
+    transitions = defaultdict(list)  # (r1, r2) -> [(train, u, v)]
+    for op in operations:
+        i, u = op['train'], op['op_idx']
+        for v in op['successors']:
+            succ = op_by_key.get((i, v))
+            if succ is None:
+                continue
+            left = [r for r in op['resources'] if r not in succ['resources']]
+            entered = [r for r in succ['resources'] if r not in op['resources']]
+            for r1 in left:
+                for r2 in entered:
+                    transitions[r1, r2].append((i, u, v))
+
+    pairs = {}
+    for (r1, r2), moves in transitions.items():
+        if r1 > r2:
+            continue  # every unordered resource pair is joined once
+        for a in moves:
+            for b in transitions.get((r2, r1), ()):
+                if a[0] == b[0]:
+                    continue
+                first, second, ra, rb = (a, b, r2, r1) if a[0] < b[0] else (b, a, r1, r2)
+                rel_a = release(op_by_key[first[0], first[2]], ra)
+                rel_b = release(op_by_key[second[0], second[2]], rb)
+                # Several resource pairs can give the same operation quadruple; keep the
+                # largest release times so one constraint pair covers all of them.
+                old = pairs.get((first, second))
+                if old is not None:
+                    rel_a, rel_b = max(rel_a, old[0]), max(rel_b, old[1])
+                pairs[first, second] = (rel_a, rel_b)
+
+    return [(a, b, rel_a, rel_b) for (a, b), (rel_a, rel_b) in pairs.items()]
+
+
+# ======================== Symmetry breaking (identical trains) ========================
+
+def _route_signature(ops, release_key):
+    # Everything the conflict structure depends on: durations, resources with release
+    # times and the successor graph. Windows and objective terms are compared separately.
+    return tuple(
+        (op['min_duration'], tuple(zip(op['resources'], op[release_key])), tuple(op['successors']))
+        for op in ops
+    )
+
+
+def _fifo_block(ops):
+    # For a single-route train (op 0 -> 1 -> ... with one successor each) return the indices
+    # of its resource-using operations if they form one contiguous run, else None. Inside such
+    # a run two trains on the same route can never overtake each other, because every
+    # operation holds (exclusive) resources until the train has entered the next one.
+    for idx, op in enumerate(ops):
+        if op['successors'] not in ([idx + 1], []) or (not op['successors'] and idx != len(ops) - 1):
+            return None
+    block = [idx for idx, op in enumerate(ops) if op['resources']]
+    if not block or block != list(range(block[0], block[-1] + 1)):
+        return None
+    return block
+
+
+def _dominates(ops_a, ops_b, terms_a, terms_b, block):
+    # A may always be scheduled ahead of B: swapping the schedules of a solution in which B
+    # goes first gives A the earlier times and B the later ones. That stays feasible and no
+    # worse if, on the FIFO block, A's windows are not later than B's and A's delay cost is
+    # not lower (same coeff/increment, threshold not later; thresholds must be equal when
+    # there is a step increment). Outside the block windows and objective terms must match.
+    in_block = set(block)
+    for k, (op_a, op_b) in enumerate(zip(ops_a, ops_b)):
+        term_a, term_b = terms_a.get(k), terms_b.get(k)
+        if k not in in_block:
+            if (op_a['start_lb'], op_a['start_ub'], term_a) != (op_b['start_lb'], op_b['start_ub'], term_b):
+                return False
+            continue
+        if op_a['start_lb'] > op_b['start_lb'] or op_a['start_ub'] > op_b['start_ub']:
+            return False
+        if term_a is None and term_b is None:
+            continue
+        if term_a is None or term_b is None:
+            return False
+        (theta_a, coeff_a, inc_a), (theta_b, coeff_b, inc_b) = term_a, term_b
+        if (coeff_a, inc_a) != (coeff_b, inc_b) or theta_a > theta_b or (inc_a > 0 and theta_a != theta_b):
+            return False
+    return True
+
+
+def find_symmetric_train_orders(operations, objectives, release_key="resource_release_times", fixed_pair=None):
+    # Trains with identical routes are grouped into equivalence classes. Within a class a
+    # train pair (a, b) is returned when a can be forced to run ahead of b without losing any
+    # optimal solution:
+    #   * single-route trains whose resource use is one contiguous run: FIFO on the whole run
+    #     whenever a dominates b (see _dominates);
+    #   * any other route structure: only fully identical trains (same windows and objective
+    #     terms), which are ordered by the start of their first operation.
+    #
+    # Returns a list of (a, b, entry, block): a's operation `entry` starts no later than b's,
+    # and for block operations k <= k' (a, k) uses any shared resource before (b, k').
+    # In the multi-route case entry is 0 and block is empty (only the start order holds).
+    #
+    # fixed_pair: two trains the caller orders by other means. The swap argument behind the
+    # orders does not hold next to such a rule: an order could push either train later than
+    # the rule allows for the optimum, and orders through other trains could chain to the
+    # opposite order (e.g. (1, 2) and (2, 0) against "0 before 1"). A class holding either
+    # train gets no orders.
+    ops_by_train = defaultdict(list)
+    for op in operations:
+        ops_by_train[op['train']].append(op)
+    terms_by_train = defaultdict(dict)
+    for obj in objectives:
+        if obj.get('type', 'op_delay') == 'op_delay':
+            terms_by_train[obj['train']][obj['operation']] = (
+                obj.get('threshold', 0), obj.get('coeff', 0), obj.get('increment', 0))
+
+    classes = defaultdict(list)
+    for train, ops in ops_by_train.items():
+        ops.sort(key=lambda op: op['op_idx'])
+        classes[_route_signature(ops, release_key)].append(train)
+
+    orders = []
+    for trains in classes.values():
+        if len(trains) < 2 or (fixed_pair is not None and set(fixed_pair) & set(trains)):
+            continue
+        trains.sort()
+        block = _fifo_block(ops_by_train[trains[0]])
+        for x, a in enumerate(trains):
+            for b in trains[x + 1:]:
+                ops_a, ops_b = ops_by_train[a], ops_by_train[b]
+                terms_a, terms_b = terms_by_train[a], terms_by_train[b]
+                if block is not None:
+                    if _dominates(ops_a, ops_b, terms_a, terms_b, block):
+                        orders.append((a, b, block[0], block))  # mutual dominance keeps index order
+                    elif _dominates(ops_b, ops_a, terms_b, terms_a, block):
+                        orders.append((b, a, block[0], block))
+                elif terms_a == terms_b and all(
+                        (p['start_lb'], p['start_ub']) == (q['start_lb'], q['start_ub'])
+                        for p, q in zip(ops_a, ops_b)):
+                    orders.append((a, b, 0, []))
+    return orders
+
+
+def symmetry_precedences(orders):
+    # Resource-sharing operation pairs whose order is decided by the symmetry breaking:
+    # a set of ((a, k), (b, k')) meaning (a, k) goes first.
+    decided = set()
+    for a, b, entry, block in orders:
+        for k in block:
+            for k2 in block:
+                if k <= k2:
+                    decided.add(((a, k), (b, k2)))
+    return decided
+
+
+# ======================== Static conflict-order fixing ========================
+
+def _train_graphs(operations):
+    # Per train: ops by index, predecessors and a topological order of the successor DAG
+    ops_by_key = {(op['train'], op['op_idx']): op for op in operations}
+    preds = defaultdict(list)
+    for op in operations:
+        for s in op['successors']:
+            preds[op['train'], s].append(op['op_idx'])
+    order = []
+    indegree = {key: len(preds[key]) for key in ops_by_key}
+    stack = [key for key, n in indegree.items() if n == 0]
+    while stack:
+        key = stack.pop()
+        order.append(key)
+        for s in ops_by_key[key]['successors']:
+            indegree[key[0], s] -= 1
+            if indegree[key[0], s] == 0:
+                stack.append((key[0], s))
+    return ops_by_key, preds, order
+
+
+def propagate_time_bounds(operations, es=None, ls=None, graphs=None):
+    # Earliest / latest start of every operation over all routes of its train:
+    #   es[j] = max(start_lb, min over predecessors p of es[p] + d_p)
+    #   ls[j] = min(start_ub, max over successors s of ls[s]) - d_j
+    # Passing es/ls continues from tightened bounds (they only ever move inwards).
+    ops_by_key, preds, order = graphs or _train_graphs(operations)
+    es = dict(es) if es else {key: op['start_lb'] for key, op in ops_by_key.items()}
+    ls = dict(ls) if ls else {key: op['start_ub'] for key, op in ops_by_key.items()}
+    for key in order:
+        p = preds[key]
+        if p:
+            es[key] = max(es[key], min(es[key[0], q] + ops_by_key[key[0], q]['min_duration'] for q in p))
+    for key in reversed(order):
+        op = ops_by_key[key]
+        if op['successors']:
+            ls[key] = min(ls[key], max(ls[key[0], s] for s in op['successors']) - op['min_duration'])
+    return es, ls
+
+
+def _mandatory_ops(ops_by_key, preds, order):
+    # Operations on every route of their train: #paths(source -> j) * #paths(j -> sink)
+    # equals the train's number of routes.
+    into, out = {}, {}
+    for key in order:
+        into[key] = sum(into[key[0], q] for q in preds[key]) if preds[key] else 1
+    for key in reversed(order):
+        succs = ops_by_key[key]['successors']
+        out[key] = sum(out[key[0], s] for s in succs) if succs else 1
+    routes = defaultdict(int)
+    for key in order:
+        if not preds[key]:
+            routes[key[0]] += out[key]
+    return {key for key in order if into[key] * out[key] == routes[key[0]]}
+
+
+def analyze_conflict_orders(operations, release_key="resource_release_times", max_rounds=20):
+    # Classify every pair of operations of different trains sharing a resource, using the
+    # propagated time windows (conditions hold whenever both operations are active):
+    #   implied:   a's latest release is before b's earliest acquire, so "a before b" holds in
+    #              every schedule and the ordering variable can be dropped;
+    #   forced:    "b before a" cannot fit the windows, so the order is fixed to "a before b";
+    #   exclusive: neither order fits, the two operations cannot both be on the chosen routes.
+    # A decided order between operations that lie on every route of their trains moves the
+    # windows (b cannot start before a has released), so decisions are re-propagated along
+    # the train DAGs until nothing changes.
+    #
+    # Macro-operations (contract_chains) occupy a resource only from start + acquire offset to
+    # start + hold, so each resource r gives the same condition as the MIP conflict constraint,
+    # start_a + hold_a,r + release_a,r <= start_b + acquire_b,r, and a pair keeps the largest
+    # gap over its shared resources. Without the offsets (main.py) acquire is 0, hold the
+    # minimum duration.
+    graphs = _train_graphs(operations)
+    ops_by_key, preds, order = graphs
+    mandatory = _mandatory_ops(*graphs)
+
+    def occupation(op):
+        acquire = op.get('resource_acquire_offsets') or [0] * len(op['resources'])
+        hold = op.get('resource_holds') or [op['min_duration']] * len(op['resources'])
+        return zip(op['resources'], op[release_key], acquire, hold)
+
+    # (a, b) -> [min start gap for a before b, for b before a, leave gap a -> b, b -> a, #resources]
+    shared = defaultdict(lambda: [float('-inf')] * 4 + [0])
+    users = defaultdict(list)
+    for op in operations:
+        for res, rel, acq, hold in occupation(op):
+            users[res].append(((op['train'], op['op_idx']), rel, acq, hold))
+    for res, ops in users.items():
+        for x in range(len(ops)):
+            for y in range(x + 1, len(ops)):
+                (a, rel_a, acq_a, hold_a), (b, rel_b, acq_b, hold_b) = sorted((ops[x], ops[y]))
+                if a[0] == b[0]:
+                    continue
+                entry = shared[a, b]
+                entry[0] = max(entry[0], hold_a + rel_a - acq_b)
+                entry[1] = max(entry[1], hold_b + rel_b - acq_a)
+                entry[2] = max(entry[2], rel_a - acq_b)
+                entry[3] = max(entry[3], rel_b - acq_a)
+                entry[4] += 1
+
+    def latest_leave(key, ls):
+        op = ops_by_key[key]
+        if op['successors']:
+            return max(ls[key[0], s] for s in op['successors'])
+        return ls[key] + op['min_duration']
+
+    es, ls = propagate_time_bounds(operations, graphs=graphs)
+    decided = {}
+    rounds = 0
+    while rounds < max_rounds:
+        rounds += 1
+        tightened = False
+        for (a, b), (gap_ab, gap_ba, leave_ab, leave_ba, _) in shared.items():
+            if (a, b) in decided:
+                continue
+            a_first = es[a] + gap_ab <= ls[b]
+            b_first = es[b] + gap_ba <= ls[a]
+            if a_first and b_first:
+                if latest_leave(a, ls) + leave_ab <= es[b]:
+                    decided[a, b] = ('implied', a, b)
+                elif latest_leave(b, ls) + leave_ba <= es[a]:
+                    decided[a, b] = ('implied', b, a)
+                continue
+            if not a_first and not b_first:
+                decided[a, b] = ('exclusive', a, b)
+                continue
+            first, second, gap = (a, b, gap_ab) if a_first else (b, a, gap_ba)
+            decided[a, b] = ('forced', first, second)
+            if first in mandatory and es[first] + gap > es[second]:
+                es[second] = es[first] + gap
+                tightened = True
+            if second in mandatory and ls[second] - gap < ls[first]:
+                ls[first] = ls[second] - gap
+                tightened = True
+        if not tightened:
+            break
+        es, ls = propagate_time_bounds(operations, es, ls, graphs=graphs)
+
+    return {
+        'num_pairs': len(shared),
+        'decided': decided,
+        'shared_resources': {pair: entry[4] for pair, entry in shared.items()},
+        # (a, b) -> (min start gap for a before b, for b before a)
+        'gaps': {pair: (entry[0], entry[1]) for pair, entry in shared.items()},
+        'empty_windows': sorted(key for key in ops_by_key if es[key] > ls[key]),
+        'rounds': rounds,
+        'es': es,
+        'ls': ls,
+    }
+
+
+def order_precedences(analysis, kinds=("implied", "forced")):
+    # {(first, second)} for the decided orders of the given kinds
+    return {(first, second) for kind, first, second in analysis['decided'].values() if kind in kinds}
+
+
+def order_report(analysis):
+    counts = defaultdict(int)
+    cp_bools = 0
+    for pair, (kind, _, _) in analysis['decided'].items():
+        counts[kind] += 1
+        if kind != 'exclusive':
+            # main.py creates an order_ and a release_conflict_ boolean per shared resource
+            cp_bools += 2 * analysis['shared_resources'][pair]
+    return {
+        'pairs': analysis['num_pairs'],
+        'implied': counts['implied'],
+        'forced': counts['forced'],
+        'exclusive': counts['exclusive'],
+        # build_mip_model has b[a, b] and b[b, a] per operation pair
+        'mip_binaries_eliminated': 2 * (counts['implied'] + counts['forced'] + counts['exclusive']),
+        'cp_booleans_fixed': cp_bools,
+        'empty_windows': len(analysis['empty_windows']),
+        'rounds': analysis['rounds'],
+    }
+
+
+def print_order_report(name, report):
+    print(f"📉 {name}: {report['pairs']} conflict pairs, {report['implied']} implied, "
+          f"{report['forced']} forced, {report['exclusive']} exclusive "
+          f"({report['rounds']} rounds) -> MIP binaries eliminated: {report['mip_binaries_eliminated']}, "
+          f"CP booleans fixed: {report['cp_booleans_fixed']}")
+    if report['empty_windows']:
+        print(f"⚠️ {report['empty_windows']} operations have an empty propagated time window")
+
+
+# ======================== Resource merging ========================
+
+def merge_equivalent_resources(data):
+    # Resources used by exactly the same operations with the same release time (and, for
+    # macro-operations, the same occupation offsets) in each of them are interchangeable:
+    # every conflict on one is a conflict on the others. Each group keeps one representative,
+    # which removes the duplicated NoOverlap / conflict constraints without changing the set of
+    # feasible schedules. Solutions do not mention resources, so nothing has to be mapped back.
+    #
+    # Returns (problem dict with merged resources, {resource: representative}).
+    usage = defaultdict(list)
+    for train_idx, ops in enumerate(data['trains']):
+        for op_idx, op in enumerate(ops):
+            for r in op.get('resources', []):
+                usage[r['resource']].append((train_idx, op_idx, r.get('release_time', 0),
+                                             r.get('acquire_offset'), r.get('hold')))
+
+    representative = {}
+    groups = {}
+    for res in sorted(usage):
+        representative[res] = groups.setdefault(tuple(sorted(usage[res])), res)
+
+    merged = dict(data)
+    merged['trains'] = []
+    for ops in data['trains']:
+        new_ops = []
+        for op in ops:
+            if op.get('resources'):
+                op = dict(op, resources=[r for r in op['resources'] if representative[r['resource']] == r['resource']])
+            new_ops.append(op)
+        merged['trains'].append(new_ops)
+    return merged, representative
+
+
+def print_merge_report(representative):
+    kept = len(set(representative.values()))
+    print(f"🧩 {len(representative)} resources merged into {kept} representatives")
+
+
+# ======================== Chain contraction ========================
+
+def contract_chains(data, max_length=None):
+    # Contract chains u -> v (u has the single successor v, v the single predecessor u,
+    # v has no objective term and no time window, both use resources) into macro-operations,
+    # on the raw problem dict. Resource-free operations such as the entry and exit of a train
+    # stay separate, so trains can still be held before entering the network. A macro-operation starts with its first operation and its minimum duration is
+    # the sum of the members'. Inside a macro the members follow each other without waiting
+    # (a train now waits at the end of the chain), and every resource is occupied from the
+    # first to the end of the last member using it, written as "acquire_offset" / "hold"
+    # next to its release time (read by MIP_READ_BUILD_MODEL.parse_displib_data).
+    #
+    # Returns (contracted problem dict, expansion) with
+    # expansion[train, macro index] = [(original op index, time offset), ...].
+    objective_ops = {(obj['train'], obj['operation']) for obj in data.get('objective', [])}
+    trains, expansion, op_index = [], {}, {}
+    for train_idx, ops in enumerate(data['trains']):
+        num_preds = defaultdict(int)
+        for op in ops:
+            for s in op.get('successors', []):
+                num_preds[s] += 1
+
+        def absorbable(op_idx):
+            op = ops[op_idx]
+            return (num_preds[op_idx] == 1 and (train_idx, op_idx) not in objective_ops and op.get('resources')
+                    and 'start_lb' not in op and 'start_ub' not in op)
+
+        absorbed = set()
+        for op_idx, op in enumerate(ops):
+            succs = op.get('successors', [])
+            if len(succs) == 1 and op.get('resources') and absorbable(succs[0]):
+                absorbed.add(succs[0])
+
+        macros = []
+        for op_idx in range(len(ops)):
+            if op_idx in absorbed:
+                continue
+            chain = [op_idx]
+            while len(ops[chain[-1]].get('successors', [])) == 1 and ops[chain[-1]]['successors'][0] in absorbed:
+                chain.append(ops[chain[-1]]['successors'][0])
+            step = max_length or len(chain)
+            macros += [chain[x:x + step] for x in range(0, len(chain), step)]
+        macros.sort(key=lambda members: members[0])
+
+        new_ops = []
+        for new_idx, members in enumerate(macros):
+            for i in members:
+                op_index[train_idx, i] = new_idx
+        for new_idx, members in enumerate(macros):
+            head, offset, occupation, order = ops[members[0]], 0, {}, []
+            expansion[train_idx, new_idx] = []
+            for i in members:
+                op = ops[i]
+                expansion[train_idx, new_idx].append((i, offset))
+                for r in op.get('resources', []):
+                    res = r['resource']
+                    if res not in occupation:
+                        occupation[res] = [offset, 0, 0]
+                        order.append(res)
+                    occupation[res][1] = offset + op['min_duration']
+                    occupation[res][2] = r.get('release_time', 0)
+                offset += op['min_duration']
+            new_op = {key: value for key, value in head.items() if key in ('start_lb', 'start_ub')}
+            new_op['min_duration'] = offset
+            if order:
+                new_op['resources'] = []
+                for res in order:
+                    acquire, hold, release = occupation[res]
+                    entry = {'resource': res, 'release_time': release}
+                    if len(members) > 1:
+                        entry['acquire_offset'], entry['hold'] = acquire, hold
+                    new_op['resources'].append(entry)
+            new_op['successors'] = [op_index[train_idx, s] for s in ops[members[-1]].get('successors', [])]
+            new_ops.append(new_op)
+        trains.append(new_ops)
+
+    contracted = dict(data)
+    contracted['trains'] = trains
+    contracted['objective'] = [dict(obj, operation=op_index[obj['train'], obj['operation']])
+                               for obj in data.get('objective', [])]
+    return contracted, expansion
+
+
+def expand_events(expansion, events):
+    # Per-operation events of the original problem from the events of a contracted solution
+    expanded = []
+    for e in events:
+        for op_idx, offset in expansion[e['train'], e['operation']]:
+            expanded.append({'operation': op_idx, 'time': e['time'] + offset, 'train': e['train']})
+    expanded.sort(key=lambda e: e['time'])
+    return expanded
+
+
+if __name__ == "__main__":
+    import sys
+    from MIP_READ_BUILD_MODEL import read_displib_json
+
+    # Usage: python displib_presolve.py instance.json [instance.json ...]
+    for path in sys.argv[1:]:
+        data = read_displib_json(path)
+        print_order_report(path, order_report(analyze_conflict_orders(data['operations'])))
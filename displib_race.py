@@ -0,0 +1,210 @@
+"""
+Race the CP-SAT (main.py) and Gurobi (MIP_solver.py) backends on one instance.
+
+Both backends run in their own process on the same instance and options, each with its share
+of the cores. Every incumbent goes to the parent, which verifies it (IncumbentWriter) and
+passes improving ones to the other backend: Gurobi picks them up at its next MIP node as a
+partial solution (solve_mip(incoming=...)); CP-SAT cannot take a solution while it runs, so
+it solves in rounds and starts every round hinted with the best known solution and cut off
+at its objective. The race ends when the best verified objective reaches a proven bound
+(the combinatorial lower bound, or Gurobi's ObjBound once it stops), both backends are
+done, or the time limit expires. Solver statuses are not taken as proofs: Gurobi's OPTIMAL
+is within MIPGap of an objective with a small route term, and main.py's model fixes the
+order of trains 0 and 1 and ignores route choice, so CP-SAT's OPTIMAL only ends its side.
+Usage: displib_race.py PROBLEMFILE [--time-limit S] [--output SOLUTIONFILE] [--backends cp mip]
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+BACKENDS = ("cp", "mip")
+# Time a worker gets after the deadline to report before it is stopped
+GRACE = 5.0
+
+
+# ======================== Workers ========================
+
+def _latest(inbox):
+    # The last message in the inbox (the best incumbent, as the parent only forwards improvements)
+    latest = None
+    while True:
+        try:
+            latest = inbox.get_nowait()
+        except queue.Empty:
+            return latest
+
+
+def _quiet(verbose):
+    if not verbose:
+        sys.stdout = open(os.devnull, "w")
+
+
+def _cp_worker(path, options, params, outbox, inbox, deadline, round_time, verbose):
+    _quiet(verbose)
+    from displib_anytime import hint_from_events
+    from main import solve_displib_instance
+
+    def listener(value, solution):
+        outbox.put(("incumbent", "cp", value, solution["events"]))
+
+    status, known = None, None
+    try:
+        while time.time() < deadline:
+            latest = _latest(inbox)
+            if latest is not None and (known is None or latest[0] < known[0]):
+                known = latest
+            result = solve_displib_instance(
+                path, time_limit=max(1.0, min(round_time, deadline - time.time())), params=params,
+                listener=listener, precheck=False, hint=hint_from_events(known[1]) if known else None,
+                cutoff=known[0] if known else None, **options)
+            status = result["status"]
+            if status in ("OPTIMAL", "INFEASIBLE", "MODEL_INVALID"):
+                break  # nothing better in this model (below the cutoff)
+            if result["events"] and (known is None or result["objective_value"] < known[0]):
+                known = (result["objective_value"], result["events"])
+        outbox.put(("done", "cp", status))
+    except Exception as e:
+        outbox.put(("error", "cp", f"{type(e).__name__}: {e}"))
+
+
+def _mip_worker(path, options, params, outbox, inbox, deadline, round_time, verbose):
+    _quiet(verbose)
+    from gurobipy import GRB
+    from MIP_solver import solve_mip
+
+    def listener(value, solution):
+        outbox.put(("incumbent", "mip", value, solution["events"]))
+
+    def incoming():
+        latest = _latest(inbox)
+        return latest[1] if latest is not None else None
+
+    try:
+        model, _ = solve_mip(path, time_limit=max(1.0, deadline - time.time()), params=params, listener=listener,
+                             precheck=False, incoming=incoming, **options)
+        bound = model.ObjBound if model.SolCount > 0 else None
+        outbox.put(("done", "mip", "OPTIMAL" if model.Status == GRB.OPTIMAL else str(model.Status), bound))
+    except Exception as e:  # e.g. a size-limited license
+        outbox.put(("error", "mip", f"{type(e).__name__}: {e}"))
+
+
+WORKERS = {"cp": _cp_worker, "mip": _mip_worker}
+
+
+# ======================== Race ========================
+
+def race(problem_path, time_limit=60.0, solution_path=None, listener=None, backends=BACKENDS, threads=None,
+         params=None, round_time=None, swapping=False, symmetry=False, fix_orders=False, merge_resources=False,
+         verbose=False):
+    # params: {"cp": {...}, "mip": {...}} solver parameters per backend. threads: per backend,
+    # default an equal share of the cores. round_time: length of a CP-SAT round, default a
+    # fifth of the time limit.
+    # Returns {"objective_value", "events", "verified", "winner", "optimal", "statuses", "seconds"}
+    # (and "infeasibility" when the precheck proves the instance infeasible).
+    from displib_anytime import IncumbentWriter
+    from displib_bounds import lower_bound
+    from displib_infeasibility import precheck, print_report
+    from displib_verify import parse_problem
+
+    start = time.time()
+    with open(problem_path) as f:
+        data = json.load(f)
+    result = {"objective_value": None, "events": None, "verified": False, "winner": None, "optimal": False,
+              "statuses": {}}
+    report = precheck(data)
+    if report["infeasible"]:
+        print_report(report)
+        result.update(infeasibility=report, seconds=time.time() - start)
+        return result
+
+    problem = parse_problem(data)
+    bound = lower_bound(problem)["lower_bound"]
+    writer = IncumbentWriter(problem, solution_path, listener=listener, lower_bound=bound)
+
+    threads = threads or max(1, (os.cpu_count() or 1) // len(backends))
+    defaults = {"cp": {"num_workers": threads}, "mip": {"Threads": threads, "OutputFlag": 0}}
+    options = {"swapping": swapping, "symmetry": symmetry, "fix_orders": fix_orders,
+               "merge_resources": merge_resources}
+    deadline = start + time_limit
+    outbox = multiprocessing.Queue()
+    inboxes = {backend: multiprocessing.Queue() for backend in backends}
+    processes = {}
+    for backend in backends:
+        backend_params = dict(defaults[backend], **(params or {}).get(backend, {}))
+        processes[backend] = multiprocessing.Process(
+            target=WORKERS[backend], daemon=True,
+            args=(problem_path, options, backend_params, outbox, inboxes[backend], deadline,
+                  round_time or max(1.0, time_limit / 5), verbose))
+        processes[backend].start()
+
+    bounds = [bound] if bound is not None else []
+
+    def proven():
+        return writer.best_solution is not None and any(writer.best_objective <= b + 1e-6 for b in bounds)
+
+    def handle(message):
+        kind, backend = message[0], message[1]
+        if kind == "incumbent":
+            if writer.offer(message[3]):
+                result["winner"] = backend
+                for other, inbox in inboxes.items():
+                    if other != backend:
+                        inbox.put((writer.best_objective, writer.best_solution["events"]))
+        else:
+            result["statuses"][backend] = message[2]
+            if kind == "error":
+                print(f"⚠️ {backend} failed: {message[2]}")
+            elif backend == "mip" and message[3] is not None:
+                bounds.append(message[3])
+        result["optimal"] = proven()
+
+    try:
+        while (not result["optimal"] and len(result["statuses"]) < len(backends)
+               and time.time() < deadline + GRACE):
+            try:
+                handle(outbox.get(timeout=0.1))
+            except queue.Empty:
+                pass
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        # Incumbents sent just before the end
+        while True:
+            try:
+                message = outbox.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "incumbent":
+                handle(message)
+
+    for backend in backends:
+        result["statuses"].setdefault(backend, "stopped")
+    if writer.best_solution is not None:
+        result.update(objective_value=writer.best_objective, events=writer.best_solution["events"], verified=True)
+    result["seconds"] = time.time() - start
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Race CP-SAT and Gurobi with shared incumbents.")
+    parser.add_argument("problem")
+    parser.add_argument("--time-limit", type=float, default=60.0)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--threads", type=int, default=None, help="threads per backend")
+    parser.add_argument("--verbose", action="store_true", help="show the backends' own output")
+    args = parser.parse_args()
+
+    result = race(args.problem, time_limit=args.time_limit, solution_path=args.output, backends=args.backends,
+                  threads=args.threads, verbose=args.verbose)
+    print(f"🏁 best objective {result['objective_value']} from {result['winner']}"
+          f"{' (optimal)' if result['optimal'] else ''} in {result['seconds']:.2f}s; {result['statuses']}")
+    raise SystemExit(0 if result["verified"] else 1)
@@ -0,0 +1,287 @@
+"""
+Real-time rescheduling: re-plan the future of a running timetable after a disruption.
+
+Given the instance, the current time, the events that have already happened and the delays
+now known, reduce_problem builds a smaller DISPLIB instance with only what can still change:
+per train, the operations still reachable from its current operation, plus the executed
+operations that still hold a resource (fixed at their executed times). The reduced instance is
+solved by either backend in a subprocess that is stopped at the latency budget, warm-started
+from the previous plan, and the answer is mapped back, prefixed with the executed events and verified against the original
+instance and the executed events before it is returned.
+Usage: displib_reschedule.py PROBLEMFILE EXECUTEDFILE --now T [--delay TRAIN MINUTES] [--plan PLANFILE]
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+
+from displib_verify import (
+    Event, Solution, SolutionValidationError, INFINITY, parse_problem, verify_solution
+)
+
+
+# ======================== Reduced instance ========================
+
+def earliest_start(current_time, delays, train):
+    # Every event at or before current_time has been executed, so the future starts after it
+    return current_time + max(delays.get(train, 0), 1)
+
+
+def reduce_problem(data, current_time, executed_events, delays=None):
+    # data: raw problem dict; executed_events: the events with time <= current_time, in
+    # solution format; delays: {train: delay}, the train cannot start its next operation
+    # before current_time + delay (and never at or before current_time).
+    # Returns (reduced problem dict, mapping) with mapping[train] = list of original op
+    # indices of the reduced operations and mapping["fixed"] = {(train, reduced op): time}.
+    delays = delays or {}
+    executed = {}
+    for e in sorted(executed_events, key=lambda e: e["time"]):
+        if e["time"] > current_time:
+            raise ValueError(f"executed event {e} lies after the current time {current_time}")
+        executed.setdefault(e["train"], []).append((e["operation"], e["time"]))
+
+    reduced = {"trains": [], "objective": []}
+    mapping = {"fixed": {}}
+    for train_idx, ops in enumerate(data["trains"]):
+        history = executed.get(train_idx, [])
+        earliest = earliest_start(current_time, delays, train_idx)
+        if history:
+            # Executed operations stay while their resources may still be held: until the
+            # next event plus the release time (the current operation is always kept).
+            first = len(history) - 1
+            while first > 0:
+                op_idx, _ = history[first - 1]
+                next_time = history[first][1]
+                tail = max((r.get("release_time", 0) for r in ops[op_idx].get("resources", [])), default=0)
+                if next_time + tail <= current_time:
+                    break
+                first -= 1
+            kept_history = history[first:]
+            future = set()
+            stack = list(ops[history[-1][0]].get("successors", []))
+            while stack:
+                op_idx = stack.pop()
+                if op_idx not in future:
+                    future.add(op_idx)
+                    stack.extend(ops[op_idx].get("successors", []))
+            kept = [op_idx for op_idx, _ in kept_history] + sorted(future)
+        else:
+            kept_history = []
+            kept = list(range(len(ops)))
+
+        index = {op_idx: new_idx for new_idx, op_idx in enumerate(kept)}
+        fixed = dict(kept_history)
+        new_ops = []
+        for new_idx, op_idx in enumerate(kept):
+            op = dict(ops[op_idx])
+            if op_idx in fixed:
+                op["start_lb"] = op["start_ub"] = fixed[op_idx]
+                mapping["fixed"][train_idx, new_idx] = fixed[op_idx]
+                if new_idx + 1 < len(kept_history):
+                    op["successors"] = [index[kept_history[new_idx + 1][0]]]  # the route already taken
+                else:
+                    op["successors"] = [index[s] for s in op.get("successors", [])]
+            else:
+                # Nothing can happen in the past, and a delayed train not before its delay
+                op["start_lb"] = max(op.get("start_lb", 0), earliest)
+                op["successors"] = [index[s] for s in op.get("successors", [])]
+            new_ops.append(op)
+        reduced["trains"].append(new_ops)
+        mapping[train_idx] = kept
+
+        for obj in data.get("objective", []):
+            if obj["train"] == train_idx and obj["operation"] in index:
+                reduced["objective"].append(dict(obj, operation=index[obj["operation"]]))
+    return reduced, mapping
+
+
+def expand_solution(mapping, executed_events, reduced_events):
+    # Full schedule: every executed event, then the future events of the reduced solution
+    events = [dict(e) for e in executed_events]
+    for e in reduced_events:
+        if (e["train"], e["operation"]) in mapping["fixed"]:
+            continue
+        events.append({"operation": mapping[e["train"]][e["operation"]], "time": e["time"], "train": e["train"]})
+    events.sort(key=lambda e: e["time"])
+    return events
+
+
+def plan_hint(mapping, previous_plan, current_time, delays=None):
+    # Warm start: the previous plan's future start times, pushed behind the current time and
+    # each train's delay, on the reduced operation indices
+    delays = delays or {}
+    index = {(train, op_idx): new_idx for train, ops in mapping.items() if train != "fixed"
+             for new_idx, op_idx in enumerate(ops)}
+    hint = {}
+    for e in previous_plan["events"]:
+        key = (e["train"], e["operation"])
+        if key in index and (e["train"], index[key]) not in mapping["fixed"]:
+            hint[e["train"], index[key]] = max(e["time"], earliest_start(current_time, delays, e["train"]))
+    return hint
+
+
+def plan_fallback(previous_plan, current_time, executed_events, delays=None):
+    # The executed events, then per train the previous plan's events after the train's last
+    # executed operation, shifted by the train's delay (which keeps their durations) and
+    # further if needed to lie after the current time
+    delays = delays or {}
+    last = {}
+    for e in sorted(executed_events, key=lambda e: e["time"]):
+        last[e["train"]] = (e["operation"], e["time"])
+    planned = {}
+    for e in sorted(previous_plan["events"], key=lambda e: e["time"]):
+        planned.setdefault(e["train"], []).append(e)
+    events = [dict(e) for e in executed_events]
+    for train, plan in planned.items():
+        future = plan
+        if train in last:
+            op_idx, time_done = last[train]
+            done = [n for n, e in enumerate(plan) if e["operation"] == op_idx]
+            future = plan[done[-1] + 1:] if done else [e for e in plan if e["time"] > time_done]
+        if not future:
+            continue
+        shift = max(delays.get(train, 0), earliest_start(current_time, delays, train) - future[0]["time"])
+        events += [dict(e, time=e["time"] + shift) for e in future]
+    events.sort(key=lambda e: e["time"])
+    return events
+
+
+def matches_past(events, current_time, executed_events):
+    # A schedule can only be returned if its events up to the current time are the executed ones
+    def past(evs):
+        return sorted((e["time"], e["train"], e["operation"]) for e in evs if e["time"] <= current_time)
+    return past(events) == past(executed_events)
+
+
+# ======================== Rescheduling ========================
+
+def _verify(problem, events, current_time, executed_events):
+    if not matches_past(events, current_time, executed_events):
+        return None
+    try:
+        return verify_solution(problem, Solution(INFINITY, [Event(e["time"], e["train"], e["operation"]) for e in events]))
+    except SolutionValidationError:
+        return None
+
+
+def _solve_worker(backend, path, time_limit, params, hint, outbox):
+    # Runs in its own process: every verified incumbent of the reduced instance goes to outbox
+    def listener(value, solution):
+        outbox.put(("incumbent", solution["events"]))
+
+    try:
+        if backend == "cp":
+            from main import solve_displib_instance
+            solve_displib_instance(path, time_limit=time_limit, params=params, listener=listener, hint=hint,
+                                   precheck=False)
+        else:
+            from MIP_solver import solve_mip
+            solve_mip(path, time_limit=time_limit, params=params, listener=listener, hint=hint, precheck=False)
+        outbox.put(("done", None))
+    except Exception as e:  # e.g. a license limit: the parent still answers with the fallback
+        outbox.put(("error", f"{type(e).__name__}: {e}"))
+
+
+def reschedule(data, current_time, executed_events, delays=None, previous_plan=None, latency=5.0, backend="mip",
+               params=None):
+    # Returns {"objective_value", "events", "verified", "source", "seconds"} (and "message" if
+    # the solver failed); source is the backend, "previous plan" when only the delayed
+    # previous plan verifies, or None.
+    # latency is a wall-clock budget for the whole call: reduction, solving and verification.
+    # Everything the solver does (imports, model building, bounds) runs in a subprocess that
+    # is stopped at its share of the budget, whatever stage it is in.
+    start = time.time()
+    from displib_anytime import order_simultaneous_events
+    problem = parse_problem(data)
+    reduced, mapping = reduce_problem(data, current_time, executed_events, delays)
+    hint = plan_hint(mapping, previous_plan, current_time, delays) if previous_plan else None
+
+    # Keep a margin for the final expansion and verification
+    solver_deadline = time.time() + 0.8 * max(0.0, latency - (time.time() - start))
+    result = {"objective_value": None, "events": None, "verified": False, "source": None}
+    best = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "reduced.json")
+        with open(path, "w") as f:
+            json.dump(reduced, f)
+        outbox = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=_solve_worker, daemon=True,
+            args=(backend, path, max(0.05, solver_deadline - time.time()), params, hint, outbox))
+        process.start()
+
+        def handle(message):
+            if message[0] == "incumbent":
+                best["events"] = message[1]
+            elif message[0] == "error":
+                result["message"] = message[1]
+            return message[0] != "incumbent"
+
+        finished = False
+        while not finished and time.time() < solver_deadline:
+            try:
+                finished = handle(outbox.get(timeout=min(0.05, max(0.0, solver_deadline - time.time()))))
+            except queue.Empty:
+                pass
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        # Incumbents sent just before the end
+        while True:
+            try:
+                handle(outbox.get_nowait())
+            except queue.Empty:
+                break
+    if "events" in best:
+        events = order_simultaneous_events(problem, expand_solution(mapping, executed_events, best["events"]))
+        value = _verify(problem, events, current_time, executed_events)
+        if value is not None:
+            result.update(objective_value=value, events=events, verified=True, source=backend)
+    if not result["verified"] and previous_plan is not None:
+        # Fallback: what was executed, then the rest of the previous plan behind the delays,
+        # if it still verifies
+        events = order_simultaneous_events(problem, plan_fallback(previous_plan, current_time, executed_events, delays))
+        value = _verify(problem, events, current_time, executed_events)
+        if value is not None:
+            result.update(objective_value=value, events=events, verified=True, source="previous plan")
+    result["seconds"] = time.time() - start
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Re-plan the future of a running timetable.")
+    parser.add_argument("problem")
+    parser.add_argument("executed", help="solution-format file with the events that already happened")
+    parser.add_argument("--now", type=int, required=True, help="current time")
+    parser.add_argument("--delay", nargs=2, type=int, action="append", default=[], metavar=("TRAIN", "DELAY"))
+    parser.add_argument("--plan", default=None, help="previous plan (solution file) to warm start from")
+    parser.add_argument("--latency", type=float, default=5.0, help="wall-clock budget in seconds")
+    parser.add_argument("--backend", choices=["cp", "mip"], default="mip")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    with open(args.problem) as f:
+        data = json.load(f)
+    with open(args.executed) as f:
+        executed = [e for e in json.load(f)["events"] if e["time"] <= args.now]
+    plan = None
+    if args.plan is not None:
+        with open(args.plan) as f:
+            plan = json.load(f)
+    result = reschedule(data, args.now, executed, delays=dict(args.delay), previous_plan=plan,
+                        latency=args.latency, backend=args.backend)
+    if not result["verified"]:
+        print(f"❌ No verified schedule within {args.latency}s ({result['seconds']:.2f}s used)")
+        if "message" in result:
+            print(f"  solver error: {result['message']}")
+        raise SystemExit(1)
+    print(f"✅ Verified schedule from {result['source']} with objective {result['objective_value']} "
+          f"in {result['seconds']:.2f}s")
+    if args.output is not None:
+        from displib_anytime import write_json_atomic
+        write_json_atomic({"objective_value": result["objective_value"], "events": result["events"]}, args.output)
@@ -0,0 +1,256 @@
+"""
+Local results store (SQLite) and regression comparison between runs or code versions.
+
+Every recorded run keeps the instance (file name and a hash of its canonical JSON), the
+backend and its parameters, the per-stage timings (read, build, solve, total), the model
+size, the objective, the solver's bound, whether the solution passed the verifier, the
+solver status and the code version (git commit, "-dirty" with uncommitted changes).
+compare() pairs the runs of two run ids or two code versions by (instance hash, backend,
+parameters) and flags a regression when the new side is slower by more than `threshold`
+(relative, and by at least `min_seconds`), finds a worse objective, or loses verification.
+Usage: displib_results.py list [--db DB] [--instance NAME] [--last N]
+       displib_results.py compare OLD NEW [--db DB] [--threshold 0.1] [--min-seconds 0.5]
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import time
+
+DEFAULT_DB = "displib_results.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    instance TEXT NOT NULL,
+    instance_hash TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    params TEXT NOT NULL,
+    code_version TEXT NOT NULL,
+    timings TEXT NOT NULL,
+    model_size TEXT NOT NULL,
+    solver_stats TEXT NOT NULL,
+    objective REAL,
+    bound REAL,
+    verified INTEGER NOT NULL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_instance ON runs (instance_hash, backend);
+CREATE INDEX IF NOT EXISTS runs_version ON runs (code_version);
+"""
+JSON_COLUMNS = ("params", "timings", "model_size", "solver_stats")
+
+
+# ======================== Store ========================
+
+def connect(db_path=DEFAULT_DB):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def instance_hash(data):
+    # Hash of the canonical JSON, so formatting changes of a file do not make a new instance
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(",", ":")).encode()).hexdigest()[:16]
+
+
+def code_version():
+    # Short git commit of this checkout, "-dirty" with uncommitted changes; "unknown" outside git
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def record_run(problem_path, backend, params=None, timings=None, model_size=None, solver_stats=None,
+               objective=None, bound=None, verified=False, status=None, db_path=DEFAULT_DB, version=None):
+    # Returns the id of the new run
+    with open(problem_path) as f:
+        data = json.load(f)
+    row = {
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "instance": os.path.basename(problem_path), "instance_hash": instance_hash(data), "backend": backend,
+        "params": json.dumps(params or {}, sort_keys=True), "code_version": version or code_version(),
+        "timings": json.dumps(timings or {}), "model_size": json.dumps(model_size or {}),
+        "solver_stats": json.dumps(solver_stats or {}), "objective": objective, "bound": bound,
+        "verified": int(bool(verified)), "status": status,
+    }
+    with connect(db_path) as conn:
+        cursor = conn.execute(f"INSERT INTO runs ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                              list(row.values()))
+        return cursor.lastrowid
+
+
+def record_cp(problem_path, params, result, db_path=DEFAULT_DB):
+    # result: the dict of main.solve_displib_instance. Its events are ordered and verified like
+    # IncumbentWriter does, and the objective stored is the verifier's (the CP model's
+    # total_penalty has its own delay semantics); without a verified schedule it is None.
+    objective = None
+    if result["events"]:
+        from displib_anytime import order_simultaneous_events
+        from displib_verify import Event, Solution, SolutionValidationError, INFINITY, parse_problem, verify_solution
+        with open(problem_path) as f:
+            problem = parse_problem(json.load(f))
+        events = order_simultaneous_events(problem, result["events"])
+        try:
+            objective = verify_solution(problem, Solution(INFINITY, [Event(e["time"], e["train"], e["operation"])
+                                                                     for e in events]))
+        except SolutionValidationError:
+            pass
+    stats = result.get("solver_stats", {})
+    return record_run(problem_path, "cp", params, result.get("timings"), result.get("model_size"), stats,
+                      objective, stats.get("best_bound"), objective is not None, result.get("status"), db_path)
+
+
+def record_mip(problem_path, params, model, writer, db_path=DEFAULT_DB):
+    # model, writer: the pair returned by MIP_solver.solve_mip (model is None after a failed precheck)
+    if model is None:
+        return record_run(problem_path, "mip", params, status="INFEASIBLE", db_path=db_path)
+    size = {"variables": model.NumVars, "binaries": model.NumBinVars, "constraints": model.NumConstrs,
+            "general_constraints": model.NumGenConstrs, "nonzeros": model.NumNZs}
+    stats = {"nodes": model.NodeCount, "simplex_iterations": model.IterCount}
+    bound = model.ObjBound if model.SolCount > 0 else None
+    return record_run(problem_path, "mip", params, getattr(model, "_timings", {}), size, stats,
+                      writer.best_objective, bound, writer.best_solution is not None, str(model.Status), db_path)
+
+
+def load_runs(conn, where="1", args=()):
+    runs = []
+    for row in conn.execute(f"SELECT * FROM runs WHERE {where} ORDER BY id", args):
+        run = dict(row)
+        for column in JSON_COLUMNS:
+            run[column] = json.loads(run[column])
+        runs.append(run)
+    return runs
+
+
+# ======================== Comparison ========================
+
+def _select(conn, ref):
+    # A run id, or every run of a code version (exact, or a unique prefix of the commit)
+    if str(ref).isdigit():
+        runs = load_runs(conn, "id = ?", (int(ref),))
+    else:
+        runs = load_runs(conn, "code_version = ?", (ref,))
+        if not runs:
+            versions = {r[0] for r in conn.execute("SELECT DISTINCT code_version FROM runs WHERE code_version LIKE ?",
+                                                   (f"{ref}%",))}
+            if len(versions) > 1:
+                raise ValueError(f"{ref} matches several versions: {', '.join(sorted(versions))}")
+            runs = load_runs(conn, "code_version = ?", (versions.pop(),)) if versions else []
+    if not runs:
+        raise ValueError(f"no runs for {ref}")
+    return runs
+
+
+def _aggregate(runs):
+    # Per (instance hash, backend, params): median total time, best objective, all verified
+    groups = {}
+    for run in runs:
+        key = (run["instance_hash"], run["backend"], json.dumps(run["params"], sort_keys=True))
+        groups.setdefault(key, []).append(run)
+    summary = {}
+    for key, members in groups.items():
+        totals = [m["timings"]["total"] for m in members if "total" in m["timings"]]
+        objectives = [m["objective"] for m in members if m["objective"] is not None]
+        summary[key] = {"instance": members[-1]["instance"], "runs": len(members),
+                        "seconds": statistics.median(totals) if totals else None,
+                        "objective": min(objectives) if objectives else None,
+                        "verified": all(m["verified"] for m in members)}
+    return summary
+
+
+def compare(conn, old, new, threshold=0.1, min_seconds=0.5):
+    # Returns [{"instance", "backend", "old", "new", "time_ratio", "regressions": [...]}]; two run
+    # ids are compared with each other even when their instances or parameters differ
+    old_summary, new_summary = _aggregate(_select(conn, old)), _aggregate(_select(conn, new))
+    if str(old).isdigit() and str(new).isdigit():
+        pairs = [(next(iter(old_summary.items())), next(iter(new_summary.items())))]
+    else:
+        pairs = [((key, old_summary[key]), (key, new_summary[key])) for key in sorted(old_summary)
+                 if key in new_summary]
+    rows = []
+    for (key, a), (_, b) in pairs:
+        regressions = []
+        ratio = None
+        if a["seconds"] is not None and b["seconds"] is not None:
+            ratio = b["seconds"] / a["seconds"] if a["seconds"] > 0 else None
+            if b["seconds"] > a["seconds"] * (1 + threshold) and b["seconds"] - a["seconds"] >= min_seconds:
+                regressions.append(f"slower: {a['seconds']:.2f}s -> {b['seconds']:.2f}s")
+        if a["objective"] is not None and (b["objective"] is None or b["objective"] > a["objective"] + 1e-6):
+            regressions.append(f"objective: {a['objective']} -> {b['objective']}")
+        if a["verified"] and not b["verified"]:
+            regressions.append("no longer verified")
+        rows.append({"instance": b["instance"], "backend": key[1], "params": json.loads(key[2]), "old": a, "new": b,
+                     "time_ratio": ratio, "regressions": regressions})
+    return rows
+
+
+def print_runs(runs):
+    print(f"{'id':>5} {'created':<19} {'version':<14} {'backend':<7} {'instance':<32} {'objective':>10} "
+          f"{'bound':>10} {'total':>8}  verified")
+    for run in runs:
+        total = run["timings"].get("total")
+        bound = f"{run['bound']:.2f}" if run["bound"] is not None else "-"
+        print(f"{run['id']:>5} {run['created_at']:<19} {run['code_version']:<14} {run['backend']:<7} "
+              f"{run['instance'][:32]:<32} {run['objective'] if run['objective'] is not None else '-':>10} "
+              f"{bound:>10} {f'{total:.2f}s' if total is not None else '-':>8}  {'✅' if run['verified'] else '❌'}")
+
+
+def print_comparison(rows):
+    if not rows:
+        print("⚠️ no instance was run by both sides")
+        return
+    print(f"{'instance':<32} {'backend':<7} {'old s':>8} {'new s':>8} {'ratio':>6} {'old obj':>10} {'new obj':>10}")
+    for row in rows:
+        a, b = row["old"], row["new"]
+        seconds = [f"{x['seconds']:.2f}" if x["seconds"] is not None else "-" for x in (a, b)]
+        ratio = f"{row['time_ratio']:.2f}" if row["time_ratio"] is not None else "-"
+        print(f"{row['instance'][:32]:<32} {row['backend']:<7} {seconds[0]:>8} {seconds[1]:>8} {ratio:>6} "
+              f"{a['objective'] if a['objective'] is not None else '-':>10} "
+              f"{b['objective'] if b['objective'] is not None else '-':>10}")
+        for regression in row["regressions"]:
+            print(f"  ❌ {regression}")
+    flagged = sum(bool(row["regressions"]) for row in rows)
+    print(f"{'❌' if flagged else '✅'} {flagged} regression(s) in {len(rows)} comparison(s)")
+
+
+def main(argv=None):
+    import argparse
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=DEFAULT_DB, help="SQLite results file")
+    parser = argparse.ArgumentParser(description="Inspect and compare recorded solver runs.")
+    sub = parser.add_subparsers(dest="action", required=True)
+    p = sub.add_parser("list", parents=[common], help="recorded runs, latest last")
+    p.add_argument("--instance", default=None, help="file name of the instance")
+    p.add_argument("--last", type=int, default=20)
+    p = sub.add_parser("compare", parents=[common], help="compare two run ids or two code versions")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.1, help="relative slowdown that counts as a regression")
+    p.add_argument("--min-seconds", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    with connect(args.db) as conn:
+        if args.action == "list":
+            where, params = ("instance = ?", (args.instance,)) if args.instance else ("1", ())
+            print_runs(load_runs(conn, where, params)[-args.last:])
+            return 0
+        rows = compare(conn, args.old, args.new, threshold=args.threshold, min_seconds=args.min_seconds)
+    print_comparison(rows)
+    return 1 if any(row["regressions"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,272 @@
+"""
+Long-running local solve-and-verify service with a job queue and warm worker processes.
+Usage: displib_service.py serve [--port PORT] [--workers N]
+       displib_service.py submit PROBLEMFILE [--port PORT] [--backend cp|mip] [--time-limit S] [--output SOLUTIONFILE]
+
+Protocol: newline-delimited JSON over a TCP socket on localhost. A client sends one
+request line
+
+    {"instance": {...DISPLIB problem...}, "backend": "cp" | "mip", "time_limit": 60, "params": {...}}
+
+and receives a stream of message lines for its job:
+
+    {"job": 3, "status": "queued", "position": 1}
+    {"job": 3, "status": "running"}
+    {"job": 3, "status": "incumbent", "objective_value": 120, "elapsed": 0.8}
+    {"job": 3, "status": "done", "verified": true, "objective_value": 95, "solution": {...}}
+
+or {"job": 3, "status": "error", "message": "..."}. Solves run in a process pool whose
+workers import OR-Tools/gurobipy once at startup, and the pool size caps concurrency.
+Each job runs single-threaded with a fixed seed, so the same request gives the same
+answer regardless of how many other jobs are in flight (use a deterministic/work limit
+in "params" rather than "time_limit" for bit-for-bit reproducibility).
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_PORT = 8765
+
+# Per-backend defaults that make a single job deterministic
+DETERMINISTIC_PARAMS = {
+    "cp": {"num_workers": 1, "random_seed": 0},
+    "mip": {"Threads": 1, "Seed": 0, "OutputFlag": 0},
+}
+
+
+# ======================== Worker process ========================
+
+def _warm_worker():
+    # Pay the solver import costs once per worker instead of once per job
+    try:
+        import main  # noqa: F401  (imports OR-Tools)
+    except ImportError:
+        pass
+    try:
+        import MIP_solver  # noqa: F401  (imports gurobipy)
+    except ImportError:
+        pass
+
+
+def run_job(job_id, request, progress):
+    from displib_verify import (
+        parse_problem, parse_solution, verify_solution, ProblemParseError, SolutionValidationError
+    )
+
+    start = time.time()
+    backend = request.get("backend", "cp")
+    if backend not in DETERMINISTIC_PARAMS:
+        return {"job": job_id, "status": "error", "message": f"unknown backend '{backend}'"}
+    params = dict(DETERMINISTIC_PARAMS[backend])
+    params.update(request.get("params") or {})
+    best = {}
+
+    def listener(objective, solution):
+        best["solution"] = solution
+        progress.put({"job": job_id, "status": "incumbent", "objective_value": objective,
+                      "elapsed": round(time.time() - start, 3)})
+
+    try:
+        problem = parse_problem(request["instance"])
+    except (KeyError, ProblemParseError) as e:
+        return {"job": job_id, "status": "error", "message": f"problem parse error: {e}"}
+
+    progress.put({"job": job_id, "status": "running"})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            problem_path = os.path.join(tmp, "problem.json")
+            with open(problem_path, "w") as f:
+                json.dump(request["instance"], f)
+            if backend == "cp":
+                from main import solve_displib_instance
+                solve_displib_instance(problem_path, time_limit=request.get("time_limit"),
+                                       params=params, listener=listener)
+            else:
+                from MIP_solver import solve_mip
+                solve_mip(problem_path, time_limit=request.get("time_limit"),
+                          params=params, listener=listener)
+    except Exception as e:  # report solver failures to the client instead of losing the worker
+        return {"job": job_id, "status": "error", "message": f"{type(e).__name__}: {e}"}
+
+    result = {"job": job_id, "status": "done", "verified": False, "objective_value": None, "solution": None,
+              "lower_bound": None, "gap": None}
+    if "solution" in best:
+        # The solvers only report verified incumbents, but the final answer is checked
+        # once more in the exact serialized form the client receives.
+        raw_solution = json.loads(json.dumps(best["solution"]))
+        try:
+            result["objective_value"] = verify_solution(problem, parse_solution(raw_solution))
+            result["verified"] = True
+            result["solution"] = raw_solution
+        except SolutionValidationError as e:
+            result["message"] = str(e)
+    else:
+        result["message"] = "no feasible solution found"
+    if result["verified"]:
+        # The bound only serves to judge the gap of a solution
+        from displib_bounds import lower_bound, relative_gap
+        result["lower_bound"] = lower_bound(problem)["lower_bound"]
+        result["gap"] = relative_gap(result["objective_value"], result["lower_bound"])
+    result["elapsed"] = round(time.time() - start, 3)
+    return result
+
+
+# ======================== Server ========================
+
+class SolveService:
+    def __init__(self, workers=None, port=DEFAULT_PORT):
+        self.workers = workers or os.cpu_count() or 1
+        self.port = port
+        self.next_job_id = 0
+        self.jobs = {}  # job id -> asyncio.Queue of messages for the submitting client
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        self.manager = multiprocessing.Manager()
+        self.progress = self.manager.Queue()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        self.queue = asyncio.Queue()
+        dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        relay = loop.run_in_executor(None, self._relay_progress, loop)
+
+        server = await asyncio.start_server(self._handle_client, "127.0.0.1", self.port, limit=2**30)
+        print(f"🚀 DISPLIB service listening on 127.0.0.1:{self.port} with {self.workers} workers")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in dispatchers:
+                task.cancel()
+            self.progress.put(None)
+            await relay
+            self.pool.shutdown(cancel_futures=True)
+            self.manager.shutdown()
+
+    def _relay_progress(self, loop):
+        # Runs in a thread: forwards worker progress messages to the owning client queue
+        while True:
+            msg = self.progress.get()
+            if msg is None:
+                return
+            job_queue = self.jobs.get(msg["job"])
+            if job_queue is not None:
+                loop.call_soon_threadsafe(job_queue.put_nowait, msg)
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id, request = await self.queue.get()
+            if job_id not in self.jobs:
+                self.queue.task_done()  # the client disconnected before the job started
+                continue
+            try:
+                result = await loop.run_in_executor(self.pool, run_job, job_id, request, self.progress)
+            except Exception as e:  # e.g. a worker process died
+                result = {"job": job_id, "status": "error", "message": f"{type(e).__name__}: {e}"}
+            # Route the result through the progress queue too, so it reaches the client
+            # after every progress message the worker sent before finishing
+            await loop.run_in_executor(None, self.progress.put, result)
+            self.queue.task_done()
+
+    async def _handle_client(self, reader, writer):
+        async def send(msg):
+            writer.write((json.dumps(msg) + "\n").encode())
+            await writer.drain()
+
+        job_id = None
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                await send({"job": None, "status": "error", "message": f"invalid request JSON: {e}"})
+                return
+
+            job_id = self.next_job_id
+            self.next_job_id += 1
+            self.jobs[job_id] = asyncio.Queue()
+            await self.queue.put((job_id, request))
+            await send({"job": job_id, "status": "queued", "position": self.queue.qsize()})
+
+            while True:
+                msg = await self.jobs[job_id].get()
+                await send(msg)
+                if msg["status"] in ("done", "error"):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            # Also when the client went away: a queued job is then skipped, and the messages
+            # of a running one are dropped by _relay_progress
+            self.jobs.pop(job_id, None)
+            writer.close()
+
+
+# ======================== Client ========================
+
+async def submit(instance, backend="cp", time_limit=None, params=None, port=DEFAULT_PORT):
+    # Async generator over the messages streamed back for one job
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=2**30)
+    request = {"instance": instance, "backend": backend, "time_limit": time_limit, "params": params or {}}
+    writer.write((json.dumps(request) + "\n").encode())
+    await writer.drain()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            msg = json.loads(line)
+            yield msg
+            if msg["status"] in ("done", "error"):
+                return
+    finally:
+        writer.close()
+
+
+async def _submit_cli(args):
+    with open(args.problem) as f:
+        instance = json.load(f)
+    final = None
+    async for msg in submit(instance, backend=args.backend, time_limit=args.time_limit, port=args.port):
+        shown = {k: v for k, v in msg.items() if k != "solution"}
+        print(json.dumps(shown, ensure_ascii=False))
+        final = msg
+    if final is None or final["status"] != "done" or not final["verified"]:
+        sys.exit(1)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(final["solution"], f, indent=4, ensure_ascii=False)
+        print(f"✅ 解决方案已保存：{args.output}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local DISPLIB solve-and-verify service.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_serve = sub.add_parser("serve")
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_serve.add_argument("--workers", type=int, default=None)
+    p_submit = sub.add_parser("submit")
+    p_submit.add_argument("problem")
+    p_submit.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_submit.add_argument("--backend", choices=["cp", "mip"], default="cp")
+    p_submit.add_argument("--time-limit", type=float, default=None)
+    p_submit.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(SolveService(workers=args.workers, port=args.port).serve())
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(_submit_cli(args))
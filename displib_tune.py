@@ -0,0 +1,214 @@
+"""
+Solver parameter tuning over a directory of instances.
+
+Every parameter configuration of a search space (the full grid, or `samples` random
+configurations of it) is run on every instance with several seeds, in parallel worker
+processes, each run single-threaded under the same time limit. A run scores the gap of its
+best verified objective to the best objective any run found on that instance (a run without
+a solution scores 1, i.e. 100%). Instances are grouped into families by name (line1_critical_0
+and line1_critical_1 form "line1_critical"), and the configuration with the lowest mean score
+per family wins, ties broken by the mean time to the best solution, then the mean run time.
+The report is JSON, and solve-cp / solve-mip take it back with --tuned REPORT.
+(Model-based "Bayesian" search needs an optimizer package this repo does not depend on;
+random sampling covers large spaces instead.)
+Usage: displib_tune.py INSTANCEDIR [--backend cp|mip] [--strategy grid|random] [--samples N] [--seeds N] [--time-limit S] [--workers N] [--output REPORTFILE]
+"""
+
+import itertools
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Default search spaces: parameters by name with the values to try
+DEFAULT_SPACES = {
+    "mip": {"MIPFocus": [0, 1, 2], "Heuristics": [0.05, 0.25], "Cuts": [-1, 2], "Presolve": [-1, 2]},
+    "cp": {"linearization_level": [0, 1, 2], "cp_model_probing_level": [0, 2], "symmetry_level": [0, 2]},
+}
+# Fixed for every run, so that configurations are compared on the same footing
+FIXED_PARAMS = {"mip": {"Threads": 1, "OutputFlag": 0}, "cp": {"num_workers": 1}}
+SEED_PARAM = {"mip": "Seed", "cp": "random_seed"}
+
+
+# ======================== Instances and configurations ========================
+
+def find_instances(directory):
+    # Problem files (JSON with "trains") in the directory, sorted by name
+    paths = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            path = os.path.join(directory, name)
+            with open(path) as f:
+                if "trains" in json.load(f):
+                    paths.append(path)
+    return paths
+
+
+def instance_family(path):
+    # File name without the trailing instance number: line1_critical_0 -> line1_critical
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r"[_-]?\d+$", "", stem) or stem
+
+
+def configurations(space, strategy="grid", samples=10, seed=0):
+    # List of {param: value} dicts: the full grid, or `samples` distinct random points of it
+    names = sorted(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+    if strategy == "grid" or samples >= len(grid):
+        return grid
+    return random.Random(seed).sample(grid, samples)
+
+
+# ======================== Runs ========================
+
+def run_once(backend, path, params, time_limit):
+    # One solve with the output silenced. Returns {"objective_value", "seconds", "time_to_best"}
+    # with the best verified objective (None if there is none).
+    best = {"objective_value": None, "time_to_best": None}
+    start = time.time()
+
+    def listener(value, solution):
+        best.update(objective_value=value, time_to_best=time.time() - start)
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        if backend == "mip":
+            from MIP_solver import solve_mip
+            solve_mip(path, time_limit=time_limit, params=params, listener=listener)
+        else:
+            from main import solve_displib_instance
+            solve_displib_instance(path, time_limit=time_limit, params=params, listener=listener)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    best["seconds"] = time.time() - start
+    return best
+
+
+def _run_task(task):
+    backend, path, config_idx, config, seed, time_limit = task
+    params = dict(FIXED_PARAMS[backend], **config)
+    params[SEED_PARAM[backend]] = seed
+    try:
+        result = run_once(backend, path, params, time_limit)
+        error = None
+    except Exception as e:  # e.g. a size-limited Gurobi license: the run counts as failed
+        result = {"objective_value": None, "time_to_best": None, "seconds": None}
+        error = f"{type(e).__name__}: {e}"
+    return dict(result, instance=os.path.basename(path), family=instance_family(path), config=config_idx,
+                seed=seed, error=error)
+
+
+# ======================== Statistics ========================
+
+def _or_inf(value):
+    return float("inf") if value is None else value
+
+
+def summarize(runs, configs):
+    # {family: {"best": params, "best_config": idx, "configs": [stats sorted best first]}}
+    best_known = {}
+    for run in runs:
+        if run["objective_value"] is not None:
+            best_known[run["instance"]] = min(best_known.get(run["instance"], run["objective_value"]),
+                                              run["objective_value"])
+    for run in runs:
+        value, best = run["objective_value"], best_known.get(run["instance"])
+        run["score"] = 1.0 if value is None else (value - best) / max(abs(best), 1)
+
+    families = {}
+    for family in sorted({run["family"] for run in runs}):
+        stats = []
+        for idx, config in enumerate(configs):
+            mine = [run for run in runs if run["family"] == family and run["config"] == idx]
+            scores = [run["score"] for run in mine]
+            times = [run["time_to_best"] for run in mine if run["time_to_best"] is not None]
+            seconds = [run["seconds"] for run in mine if run["seconds"] is not None]
+            stats.append({
+                "config": idx, "params": config, "runs": len(mine),
+                "solved": sum(run["objective_value"] is not None for run in mine),
+                "mean_score": statistics.mean(scores), "stdev_score": statistics.pstdev(scores),
+                "worst_score": max(scores),
+                "mean_time_to_best": statistics.mean(times) if times else None,
+                "mean_seconds": statistics.mean(seconds) if seconds else None,
+            })
+        stats.sort(key=lambda s: (s["mean_score"], _or_inf(s["mean_time_to_best"]), _or_inf(s["mean_seconds"]),
+                                  s["config"]))
+        families[family] = {"best": stats[0]["params"], "best_config": stats[0]["config"], "configs": stats}
+    return families
+
+
+def tune(directory, backend="mip", space=None, strategy="grid", samples=10, seeds=2, time_limit=10.0,
+         workers=1, search_seed=0, verbose=True):
+    # Returns {"backend", "strategy", "time_limit", "seeds", "configs", "runs", "families"}
+    instances = find_instances(directory)
+    if not instances:
+        raise ValueError(f"no problem files in {directory}")
+    configs = configurations(space or DEFAULT_SPACES[backend], strategy, samples, search_seed)
+    tasks = [(backend, path, idx, config, seed, time_limit)
+             for idx, config in enumerate(configs) for path in instances for seed in range(seeds)]
+    if verbose:
+        print(f"🎛 {len(configs)} configurations x {len(instances)} instances x {seeds} seeds = {len(tasks)} runs "
+              f"of {time_limit}s on {workers} worker(s)")
+    runs = []
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for run in pool.map(_run_task, tasks):
+            runs.append(run)
+            if verbose and run["error"]:
+                print(f"⚠️ config {run['config']} on {run['instance']} (seed {run['seed']}): {run['error']}")
+    if verbose:
+        print(f"⏱ {len(runs)} runs in {time.time() - start:.1f}s")
+    return {"backend": backend, "strategy": strategy, "time_limit": time_limit, "seeds": seeds, "configs": configs,
+            "runs": runs, "families": summarize(runs, configs)}
+
+
+def tuned_params(report, problem_path):
+    # The best parameters of the problem's family in a tuning report (a dict or a file path), or {}
+    if isinstance(report, str):
+        with open(report) as f:
+            report = json.load(f)
+    family = report["families"].get(instance_family(problem_path))
+    return dict(family["best"]) if family else {}
+
+
+def print_summary(report, top=3):
+    for family, entry in report["families"].items():
+        print(f"\n📊 {family}: best {entry['best']}")
+        print(f"  {'config':>6} {'solved':>8} {'mean gap':>9} {'stdev':>7} {'worst':>7} {'to best':>8}  params")
+        for s in entry["configs"][:top]:
+            to_best = f"{s['mean_time_to_best']:.2f}s" if s["mean_time_to_best"] is not None else "-"
+            print(f"  {s['config']:>6} {s['solved']:>3}/{s['runs']:<4} {100 * s['mean_score']:>8.2f}% "
+                  f"{100 * s['stdev_score']:>6.2f}% {100 * s['worst_score']:>6.2f}% {to_best:>8}  {s['params']}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tune solver parameters over a directory of instances.")
+    parser.add_argument("instances", help="directory of problem files")
+    parser.add_argument("--backend", choices=["cp", "mip"], default="mip")
+    parser.add_argument("--space", default=None, help="JSON file {param: [values]} (default: a built-in space)")
+    parser.add_argument("--strategy", choices=["grid", "random"], default="grid")
+    parser.add_argument("--samples", type=int, default=10, help="configurations for --strategy random")
+    parser.add_argument("--seeds", type=int, default=2, help="solver seeds per configuration and instance")
+    parser.add_argument("--time-limit", type=float, default=10.0, help="per run")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default=None, help="JSON report")
+    args = parser.parse_args()
+
+    space = None
+    if args.space is not None:
+        with open(args.space) as f:
+            space = json.load(f)
+    report = tune(args.instances, backend=args.backend, space=space, strategy=args.strategy, samples=args.samples,
+                  seeds=args.seeds, time_limit=args.time_limit, workers=args.workers)
+    print_summary(report)
+    if args.output is not None:
+        from displib_anytime import write_json_atomic
+        write_json_atomic(report, args.output)
@@ -6,10 +6,13 @@
 """
 This script verifies a solution to a DISPLIB problem instance.
 Usage: displib_verify.py [--test | PROBLEMFILE SOLUTIONFILE]
+       displib_verify.py --batch PROBLEMFILE SOLUTION... [--workers N] [--report REPORTFILE]
 """
 
 #
 # Changelog:
+#  * 2026-10-19: Batch mode: one parsed problem, many solutions (files, directories or solution
+#                pools) verified in a process pool, with a single JSON report.
 #  * 2024-10-08: Allow parsing the problem without providing a solution, and check for 
 #                referencing (indexing) errors in objective components.
 #  * 2024-09-06: Additional checks for topological order, unknown keys, and unordered events.
@@ -480,6 +483,142 @@ def main(problemfilename, solutionfilename):
         sys.exit(1)
 
 
+#
+#
+# Batch verification: the problem is parsed once and shared with the worker processes
+# (inherited copy-on-write where processes are forked, sent once per worker otherwise).
+#
+
+_batch_problem = None
+
+
+def _set_batch_problem(problem):
+    global _batch_problem
+    _batch_problem = problem
+
+
+def expand_solution_inputs(paths):
+    # Directories give their *.json files (sorted); a file holding a list of solutions or a
+    # {"solutions": [...]} pool gives one candidate per entry, named "FILE#INDEX".
+    # Returns [(name, path, raw solution or None)]; None means the worker reads the file.
+    candidates = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".json")]
+        else:
+            files = [path]
+        for filename in files:
+            try:
+                with open(filename) as f:
+                    raw = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                candidates.append((filename, filename, None))  # reported by the worker
+                continue
+            if isinstance(raw, dict) and isinstance(raw.get("solutions"), list):
+                raw = raw["solutions"]
+            if isinstance(raw, list):
+                candidates.extend((f"{filename}#{idx}", filename, entry) for idx, entry in enumerate(raw))
+            elif isinstance(raw, dict) and "trains" in raw:
+                continue  # a problem file next to the solutions
+            else:
+                candidates.append((filename, filename, None))
+    return candidates
+
+
+def verify_candidate(candidate, problem=None):
+    # Verifies one (name, path, raw solution or None) against the shared problem.
+    # Returns {"solution", "status", "objective_value", "declared_objective_value", "error", "relevant_events"}
+    # with status "feasible", "infeasible", "invalid" (not a solution) or "unreadable".
+    name, path, raw_solution = candidate
+    problem = problem or _batch_problem
+    result = {"solution": name, "status": None, "objective_value": None, "declared_objective_value": None,
+              "error": None, "relevant_events": None}
+    try:
+        if raw_solution is None:
+            with open(path) as f:
+                raw_solution = json.load(f)
+        solution = parse_solution(raw_solution)
+        if solution.objective_value < INFINITY:
+            result["declared_objective_value"] = solution.objective_value
+        result["objective_value"] = verify_solution(problem, solution)
+        result["status"] = "feasible"
+        if result["declared_objective_value"] not in (None, result["objective_value"]):
+            result["error"] = "the declared objective value does not match the computed one"
+    except (OSError, json.JSONDecodeError) as e:
+        result.update(status="unreadable", error=str(e))
+    except (SolutionParseError, ProblemParseError) as e:  # parse_solution reports unknown keys as ProblemParseError
+        result.update(status="invalid", error=str(e))
+    except SolutionValidationError as e:
+        result.update(status="infeasible", error=str(e))
+        if e.relevant_event_idxs is not None:
+            result["relevant_events"] = [{"index": idx, "event": raw_solution["events"][idx]}
+                                         for idx in e.relevant_event_idxs]
+    return result
+
+
+def verify_batch(problem, candidates, workers=None):
+    # problem: parsed Problem; candidates: from expand_solution_inputs. Results keep the input order.
+    import multiprocessing
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(candidates) <= 1:
+        return [verify_candidate(candidate, problem) for candidate in candidates]
+    chunksize = max(1, len(candidates) // (4 * workers))
+    if "fork" in multiprocessing.get_all_start_methods():
+        _set_batch_problem(problem)
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            return pool.map(verify_candidate, candidates, chunksize)
+    with multiprocessing.Pool(workers, initializer=_set_batch_problem, initargs=(problem,)) as pool:
+        return pool.map(verify_candidate, candidates, chunksize)
+
+
+def batch_report(problemfilename, problem, results):
+    feasible = [r for r in results if r["status"] == "feasible"]
+    best = min(feasible, key=lambda r: r["objective_value"], default=None)
+    counts = defaultdict(int)
+    for r in results:
+        counts[r["status"]] += 1
+    return {
+        "problem": problemfilename,
+        "trains": len(problem.trains),
+        "summary": {
+            "solutions": len(results),
+            "feasible": counts["feasible"],
+            "infeasible": counts["infeasible"],
+            "invalid": counts["invalid"] + counts["unreadable"],
+            "best_solution": best["solution"] if best else None,
+            "best_objective_value": best["objective_value"] if best else None,
+        },
+        "results": results,
+    }
+
+
+def batch_main(problemfilename, paths, workers=None, reportfilename=None):
+    # Returns the exit status: 0 if every candidate is a feasible solution, 1 otherwise
+    print(f"{bcolors.HEADER}DISPLIB 2025 batch solution verification{bcolors.ENDC}")
+    try:
+        with open(problemfilename) as f:
+            problem = parse_problem(json.load(f))
+    except (json.JSONDecodeError, ProblemParseError) as e:
+        print(f"{bcolors.FAIL}Error parsing problem file{bcolors.ENDC} ({problemfilename})")
+        print(f"  {str(e)}")
+        return 1
+    report = batch_report(problemfilename, problem, verify_batch(problem, expand_solution_inputs(paths), workers))
+    for r in report["results"]:
+        if r["status"] == "feasible":
+            print(f"{bcolors.OKGREEN}✓{bcolors.ENDC} - {r['solution']}: objective value {r['objective_value']}.")
+            if r["error"]:
+                warn(f"{r['solution']}: {r['error']}")
+        else:
+            print(f"{bcolors.FAIL}✗{bcolors.ENDC} - {r['solution']} ({r['status']}): {r['error']}")
+    summary = report["summary"]
+    print(f"{summary['feasible']}/{summary['solutions']} feasible, best {summary['best_objective_value']}"
+          f" ({summary['best_solution']})")
+    if reportfilename is not None:
+        with open(reportfilename, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if summary["solutions"] and summary["feasible"] == summary["solutions"] else 1
+
+
 #
 #
 # Tests.
@@ -693,6 +832,59 @@ class TestSolutions(unittest.TestCase):
         self.assertEqual(str(cm.exception), "event 3 starts earlier than the previous event")
 
 
+class TestBatch(unittest.TestCase):
+    problem = TestSolutions.problem
+    correct = {
+        "objective_value": 10,
+        "events": [
+            {"time": 0, "train": 0, "operation": 0},
+            {"time": 0, "train": 1, "operation": 0},
+            {"time": 5, "train": 0, "operation": 2},
+            {"time": 5, "train": 1, "operation": 1},
+            {"time": 10, "train": 1, "operation": 2},
+            {"time": 10, "train": 0, "operation": 3},
+        ],
+    }
+    conflicting = {
+        "objective_value": 10,
+        "events": [
+            {"time": 0, "train": 0, "operation": 0},
+            {"time": 0, "train": 1, "operation": 0},
+            {"time": 5, "train": 0, "operation": 1},
+            {"time": 5, "train": 1, "operation": 1},
+            {"time": 10, "train": 1, "operation": 2},
+            {"time": 10, "train": 0, "operation": 3},
+        ],
+    }
+
+    def test_pool_in_parallel(self):
+        candidates = [(f"pool#{idx}", "pool", raw) for idx, raw in
+                      enumerate([self.correct, self.conflicting, {"events": "none"}, self.correct])]
+        results = verify_batch(self.problem, candidates, workers=2)
+        self.assertEqual([r["status"] for r in results], ["feasible", "infeasible", "invalid", "feasible"])
+        self.assertEqual(results[0]["objective_value"], 10)
+        self.assertEqual([e["index"] for e in results[1]["relevant_events"]], [1, 2])
+        self.assertEqual(results, verify_batch(self.problem, candidates, workers=1))
+
+    def test_inputs_and_report(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, content in [("a.json", self.correct), ("pool.json", {"solutions": [self.conflicting, self.correct]}),
+                                  ("problem.json", json.loads(TestSolutions.problem_str))]:
+                with open(os.path.join(tmp, name), "w") as f:
+                    json.dump(content, f)
+            with open(os.path.join(tmp, "broken.json"), "w") as f:
+                f.write("{")
+            candidates = expand_solution_inputs([tmp])
+            names = [os.path.basename(name) for name, _, _ in candidates]
+            self.assertEqual(names, ["a.json", "broken.json", "pool.json#0", "pool.json#1"])
+            report = batch_report("problem.json", self.problem, verify_batch(self.problem, candidates, workers=1))
+        self.assertEqual(report["summary"]["feasible"], 2)
+        self.assertEqual(report["summary"]["infeasible"], 1)
+        self.assertEqual(report["summary"]["invalid"], 1)
+        self.assertEqual(report["summary"]["best_objective_value"], 10)
+
+
 
 #
 #
@@ -707,6 +899,16 @@ if __name__ == "__main__":
         unittest.main(argv=[sys.argv[0]], verbosity=2)
         sys.exit(0)
 
+    if len(sys.argv) >= 2 and sys.argv[1] == "--batch":
+        import argparse
+        parser = argparse.ArgumentParser(prog="displib_verify.py --batch")
+        parser.add_argument("problem")
+        parser.add_argument("solutions", nargs="+", help="solution files, directories or solution pool files")
+        parser.add_argument("--workers", type=int, default=None)
+        parser.add_argument("--report", default=None, help="JSON report file")
+        args = parser.parse_args(sys.argv[2:])
+        sys.exit(batch_main(args.problem, args.solutions, args.workers, args.report))
+
     if len(sys.argv) not in [2,3]:
         print(__doc__)
         sys.exit(1)
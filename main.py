@@ -1,5 +1,6 @@
 import os
 import json
+import time
 from ortools.sat.python import cp_model
 from collections import defaultdict
 
@@ -21,12 +22,8 @@ def add_path_segment_conflict_intervals(model, operations, start_vars):
         if len(intervals) > 1:
             model.AddNoOverlap(intervals)
 
-def solve_displib_instance(json_path):
-    with open(json_path, "r") as f:
-        data = json.load(f)
-
+def load_operations(data):
     trains = data["trains"]
-    objectives = data.get("objective", [])
 
     # Build global operation list
     operations = []
@@ -47,6 +44,12 @@ def solve_displib_instance(json_path):
             })
             op_map[(t_idx, o_idx)] = op_id
             op_id += 1
+    return operations, op_map
+
+
+def build_cp_model(data, swapping=False, symmetry=False, fix_orders=False):
+    objectives = data.get("objective", [])
+    operations, op_map = load_operations(data)
 
     model = cp_model.CpModel()
     horizon = 10000
@@ -123,6 +126,29 @@ def solve_displib_instance(json_path):
         if prev_key in op_map and curr_key in op_map:
             model.Add(start_vars[op_map[curr_key]] >= end_vars[op_map[prev_key]])
 
+    # Symmetry breaking: FIFO between dominating trains with identical routes
+    decided = set()
+    if symmetry:
+        from displib_presolve import find_symmetric_train_orders, symmetry_precedences
+        # Train 0 is always put ahead of train 1 below, so their classes must stay unordered
+        orders = find_symmetric_train_orders(operations, objectives, release_key="release_times", fixed_pair=(0, 1))
+        for a, b, entry, block in orders:
+            model.Add(start_vars[op_map[(a, entry)]] <= start_vars[op_map[(b, entry)]])
+        decided = {(op_map[x], op_map[y]) for x, y in symmetry_precedences(orders)}
+
+    # Orders decided by the propagated time windows (displib_presolve.analyze_conflict_orders)
+    if fix_orders:
+        from displib_presolve import analyze_conflict_orders, order_precedences, order_report, print_order_report
+        analysis = analyze_conflict_orders(operations, release_key="release_times")
+        print_order_report("Conflict orders", order_report(analysis))
+        decided |= {(op_map[x], op_map[y]) for x, y in order_precedences(analysis)}
+
+    def fix_order(bvar, a, b):
+        if (a, b) in decided:
+            model.Add(bvar == 1)
+        elif (b, a) in decided:
+            model.Add(bvar == 0)
+
     # Resource conflict with headway
     headway = 0
     resource_to_ops = defaultdict(list)
@@ -135,6 +161,7 @@ def solve_displib_instance(json_path):
             for j in range(i + 1, len(ops)):
                 a, b = ops[i], ops[j]
                 bvar = model.NewBoolVar(f"order_{a}_{b}")
+                fix_order(bvar, a, b)
                 model.Add(start_vars[a] + operations[a]["min_duration"] + headway <= start_vars[b]).OnlyEnforceIf(bvar)
                 model.Add(start_vars[b] + operations[b]["min_duration"] + headway <= start_vars[a]).OnlyEnforceIf(bvar.Not())
 
@@ -150,12 +177,22 @@ def solve_displib_instance(json_path):
                 release_a = operations[a]["release_times"][operations[a]["resources"].index(res)] if res in operations[a]["resources"] else 0
                 release_b = operations[b]["release_times"][operations[b]["resources"].index(res)] if res in operations[b]["resources"] else 0
                 rel_bool = model.NewBoolVar(f"release_conflict_{a}_{b}_res_{res}")
+                fix_order(rel_bool, a, b)
                 model.Add(start_vars[a] + operations[a]["min_duration"] + release_a <= start_vars[b]).OnlyEnforceIf(rel_bool)
                 model.Add(start_vars[b] + operations[b]["min_duration"] + release_b <= start_vars[a]).OnlyEnforceIf(rel_bool.Not())
 
     # Segment conflict constraint
     add_path_segment_conflict_intervals(model, operations, start_vars)
 
+    # Swapping (head-on) conflicts, found by joining reversed resource transitions
+    if swapping:
+        from displib_presolve import find_swapping_pairs
+        for (i, u, v), (k, u2, v2), rel_a, rel_b in find_swapping_pairs(operations, release_key="release_times"):
+            a_first = model.NewBoolVar(f"swap_{i}_{u}_{v}_{k}_{u2}_{v2}")
+            a_v, b_v = op_map[(i, v)], op_map[(k, v2)]
+            model.Add(end_vars[a_v] + rel_a <= start_vars[op_map[(k, u2)]]).OnlyEnforceIf(a_first)
+            model.Add(end_vars[b_v] + rel_b <= start_vars[op_map[(i, u)]]).OnlyEnforceIf(a_first.Not())
+
     # Global priority constraint: train 0 op1 must precede train 1 op1
     buffer = 5
     if (0, 1) in op_map and (1, 1) in op_map:
@@ -190,25 +227,109 @@ def solve_displib_instance(json_path):
                 model.AddMultiplicationEquality(penalty, [delay, coeff])
             penalties.append(penalty)
 
+    total_penalty = None
     if penalties:
         total_penalty = model.NewIntVar(0, horizon * len(penalties), "total_penalty")
         model.Add(total_penalty == sum(penalties))
         model.Minimize(total_penalty)
 
+    return model, operations, op_map, start_vars, total_penalty
+
+
+def get_events(value, operations, start_vars):
+    events = []
+    for op in operations:
+        events.append({
+            "operation": op["op_idx"],
+            "train": op["train"],
+            "time": value(start_vars[op["id"]])
+        })
+    events.sort(key=lambda x: x["time"])
+    return events
+
+
+class AnytimeSolutionCallback(cp_model.CpSolverSolutionCallback):
+    # Hands every CP-SAT incumbent to an IncumbentWriter, which verifies it and
+    # atomically rewrites the solution file when it improves.
+    def __init__(self, writer, operations, start_vars):
+        super().__init__()
+        self.writer = writer
+        self.operations = operations
+        self.start_vars = start_vars
+
+    def OnSolutionCallback(self):
+        self.writer.offer(get_events(self.Value, self.operations, self.start_vars))
+
+
+def solve_displib_instance(json_path, time_limit=None, solution_path=None, params=None, listener=None,
+                           swapping=False, symmetry=False, fix_orders=False, merge_resources=False, hint=None,
+                           precheck=True, cutoff=None):
+    # params: CP-SAT parameters by name, e.g. {"num_workers": 1, "random_seed": 0}
+    # hint: {(train, op): start time}, e.g. the routes of displib_lagrangian.lagrangian_bound
+    # listener(objective, solution): called for every verified improving incumbent
+    # precheck: stop before building the model if propagation proves the instance infeasible
+    # cutoff: only look for solutions with objective <= cutoff (e.g. the best one known elsewhere)
+    # The result also carries stage timings and model sizes (e.g. for displib_results)
+    stage_start = time.time()
+    with open(json_path, "r") as f:
+        data = json.load(f)
+
+    if precheck:
+        from displib_infeasibility import precheck as infeasibility_precheck, print_report
+        report = infeasibility_precheck(data)
+        if report["infeasible"]:
+            print_report(report)
+            return {"events": [], "objective_value": None, "lower_bound": None, "gap": None, "infeasibility": report}
+
+    model_data = data
+    if merge_resources:
+        # One NoOverlap / set of order booleans per group of equivalent resources
+        from displib_presolve import merge_equivalent_resources, print_merge_report
+        model_data, representative = merge_equivalent_resources(data)
+        print_merge_report(representative)
+
+    timings = {"read": time.time() - stage_start}
+    model, operations, op_map, start_vars, total_penalty = build_cp_model(model_data, swapping=swapping,
+                                                                          symmetry=symmetry, fix_orders=fix_orders)
+
+    for key, value in (hint or {}).items():
+        if key in op_map:
+            model.AddHint(start_vars[op_map[key]], value)
+    if cutoff is not None and total_penalty is not None:
+        model.Add(total_penalty <= cutoff)
+
+    timings["build"] = time.time() - stage_start - timings["read"]
+
+    # Cheap combinatorial bound (displib_bounds), reported with the result to judge the gap
+    from displib_bounds import lower_bound, relative_gap
+    bound = lower_bound(data)["lower_bound"]
+
     solver = cp_model.CpSolver()
-    status = solver.Solve(model)
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = time_limit
+    for name, value in (params or {}).items():
+        setattr(solver.parameters, name, value)
+    if solution_path is not None or listener is not None:
+        # Anytime mode: stream every verified improving incumbent to solution_path
+        from displib_anytime import IncumbentWriter
+        writer = IncumbentWriter(data, solution_path, listener=listener, lower_bound=bound)
+        status = solver.Solve(model, AnytimeSolutionCallback(writer, operations, start_vars))
+    else:
+        status = solver.Solve(model)
     print(f"⏱ Solver wall time: {solver.WallTime():.3f} seconds")
 
-    results = {"events": [], "objective_value": None}
+    results = {"events": [], "objective_value": None, "status": solver.StatusName(status)}
     if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-        for op in operations:
-            results["events"].append({
-                "operation": op["op_idx"],
-                "train": op["train"],
-                "time": solver.Value(start_vars[op["id"]])
-            })
-        results["events"].sort(key=lambda x: x["time"])
-        results["objective_value"] = solver.Value(total_penalty)
+        results["events"] = get_events(solver.Value, operations, start_vars)
+        results["objective_value"] = solver.Value(total_penalty) if total_penalty is not None else 0
+    results["lower_bound"] = bound
+    results["gap"] = relative_gap(results["objective_value"], bound)
+    timings.update(solve=solver.WallTime(), total=time.time() - stage_start)
+    proto = model.Proto()
+    results["timings"] = timings
+    results["model_size"] = {"variables": len(proto.variables), "constraints": len(proto.constraints)}
+    results["solver_stats"] = {"branches": solver.NumBranches(), "conflicts": solver.NumConflicts(),
+                               "best_bound": solver.BestObjectiveBound()}
 
     return results
 
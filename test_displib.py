@@ -0,0 +1,154 @@
+"""
+Tests of the solver-independent tools (presolve, bounds, repair, rescheduling, ...).
+The verifier has its own tests (displib_verify.py --test); these reuse its test instance.
+Usage: python -m unittest test_displib
+"""
+
+import json
+import unittest
+
+import displib_verify
+from displib_verify import Event, Solution, INFINITY, parse_problem, verify_solution
+
+PROBLEM = json.loads(displib_verify.TestSolutions.problem_str)
+# Optimal schedule of PROBLEM (objective 10)
+SOLUTION = {
+    "objective_value": 10,
+    "events": [
+        {"time": 0, "train": 0, "operation": 0},
+        {"time": 0, "train": 1, "operation": 0},
+        {"time": 5, "train": 0, "operation": 2},
+        {"time": 5, "train": 1, "operation": 1},
+        {"time": 10, "train": 1, "operation": 2},
+        {"time": 10, "train": 0, "operation": 3},
+    ],
+}
+
+
+def verify(data, events):
+    return verify_solution(parse_problem(data), Solution(INFINITY, [Event(e["time"], e["train"], e["operation"])
+                                                                    for e in events]))
+
+
+class TestReschedule(unittest.TestCase):
+    def test_reduce_and_expand(self):
+        from displib_reschedule import expand_solution, reduce_problem
+        now = 5
+        executed = [e for e in SOLUTION["events"] if e["time"] <= now]
+        reduced, mapping = reduce_problem(PROBLEM, now, executed)
+        # The rest of the optimal schedule on the reduced operations, executed ones at their times
+        index = {(train, op_idx): new_idx for train, ops in mapping.items() if train != "fixed"
+                 for new_idx, op_idx in enumerate(ops)}
+        reduced_events = [{"time": e["time"], "train": e["train"], "operation": index[e["train"], e["operation"]]}
+                          for e in SOLUTION["events"] if (e["train"], e["operation"]) in index]
+        self.assertEqual(verify(reduced, reduced_events), 10)
+        self.assertEqual(verify(PROBLEM, expand_solution(mapping, executed, reduced_events)), 10)
+
+    def test_latency(self):
+        import time
+        from displib_reschedule import reschedule
+        executed = [e for e in SOLUTION["events"] if e["time"] <= 0]
+        for backend in ("cp", "mip"):
+            start = time.time()
+            result = reschedule(PROBLEM, 0, executed, delays={1: 2}, previous_plan=SOLUTION, latency=1.0,
+                                backend=backend)
+            self.assertLessEqual(result["seconds"], 1.0 + 0.5)
+            self.assertLessEqual(time.time() - start, 1.0 + 0.5)
+            self.assertTrue(result["verified"])
+            # The delayed previous plan costs 12
+            self.assertLessEqual(result["objective_value"], 12)
+
+
+class TestBounds(unittest.TestCase):
+    def test_bound_below_optimum(self):
+        from displib_bounds import lower_bound
+        for bottleneck in (False, True):
+            result = lower_bound(PROBLEM, bottleneck=bottleneck)
+            self.assertFalse(result["infeasible"])
+            self.assertLessEqual(result["lower_bound"], SOLUTION["objective_value"])
+        # Train 1 alone cannot reach its last operation before time 10
+        self.assertEqual(lower_bound(PROBLEM)["per_train"], [0, 10])
+
+
+class TestPresolve(unittest.TestCase):
+    def test_contract_and_expand(self):
+        from displib_presolve import contract_chains, expand_events
+        contracted, expansion = contract_chains(PROBLEM)
+        # Train 1's first two operations become one macro-operation holding r1, then l
+        self.assertEqual(expansion[1, 0], [(0, 0), (1, 5)])
+        self.assertEqual([r["resource"] for r in contracted["trains"][1][0]["resources"]], ["r1", "l"])
+        self.assertEqual(contracted["objective"][0]["operation"], 1)
+        heads = {(train, members[0][0]): (train, macro) for (train, macro), members in expansion.items()}
+        events = [{"time": e["time"], "train": e["train"], "operation": heads[e["train"], e["operation"]][1]}
+                  for e in SOLUTION["events"] if (e["train"], e["operation"]) in heads]
+        expanded = expand_events(expansion, events)
+        key = lambda e: (e["time"], e["train"], e["operation"])
+        self.assertEqual(sorted(expanded, key=key), sorted(SOLUTION["events"], key=key))
+        from displib_anytime import order_simultaneous_events
+        self.assertEqual(verify(PROBLEM, order_simultaneous_events(parse_problem(PROBLEM), expanded)), 10)
+
+    def test_merge_equivalent_resources(self):
+        import copy
+        from displib_presolve import merge_equivalent_resources
+        data = copy.deepcopy(PROBLEM)
+        # "m" is used exactly like "l"; "n" too, but with another release time
+        for train, op_idx in [(0, 0), (1, 1)]:
+            data["trains"][train][op_idx]["resources"] += [{"resource": "m"},
+                                                           {"resource": "n", "release_time": op_idx}]
+        merged, representative = merge_equivalent_resources(data)
+        self.assertEqual(representative["m"], "l")
+        self.assertEqual(representative["n"], "n")
+        self.assertEqual([r["resource"] for r in merged["trains"][1][1]["resources"]], ["l", "n"])
+        self.assertEqual(verify(merged, SOLUTION["events"]), verify(data, SOLUTION["events"]))
+
+
+class TestLocalSearch(unittest.TestCase):
+    def test_result_verifies(self):
+        from displib_localsearch import local_search
+        # From scratch and from a schedule with a resource conflict
+        for initial in (None, displib_verify.TestBatch.conflicting["events"]):
+            result = local_search(PROBLEM, initial, time_limit=0.5, verbose=False)
+            self.assertTrue(result["verified"])
+            self.assertEqual(verify(PROBLEM, result["events"]), result["objective_value"])
+            self.assertGreaterEqual(result["objective_value"], SOLUTION["objective_value"])
+
+
+def _op(resource=None, release=0, lb=0, ub=0, successors=(), duration=0):
+    op = {"min_duration": duration, "start_lb": lb, "start_ub": ub, "successors": list(successors)}
+    if resource is not None:
+        op["resources"] = [{"resource": resource, "release_time": release}]
+    return op
+
+
+class TestInfeasibility(unittest.TestCase):
+    def test_feasible(self):
+        from displib_infeasibility import precheck
+        self.assertIsNone(precheck(PROBLEM)["infeasible"])
+
+    def test_zero_length_cycle(self):
+        # The forced orders (0, 1) before (1, 0) and (1, 1) before (0, 0) close a cycle with the
+        # train precedences, but every gap on it is 0 (zero durations and release times)
+        from displib_infeasibility import precheck
+        data = {"trains": [[_op("Y", 5, successors=[1]), _op("X", successors=[2]), _op()],
+                           [_op("X", 5, successors=[1]), _op("Y", successors=[2]), _op()]], "objective": []}
+        self.assertIsNone(precheck(data)["infeasible"])
+
+    def test_resource_conflict(self):
+        from displib_infeasibility import precheck
+        data = {"trains": [[_op("r", duration=5, successors=[1]), _op(ub=100)],
+                           [_op("r", duration=5, successors=[1]), _op(ub=100)]], "objective": []}
+        report = precheck(data)
+        self.assertTrue(report["infeasible"])
+        self.assertEqual([r["kind"] for r in report["reasons"]], ["resource conflict"])
+        self.assertEqual(report["reasons"][0]["resources"], ["r"])
+
+    def test_empty_window(self):
+        from displib_infeasibility import precheck
+        data = {"trains": [[_op("r", duration=10, successors=[1]), _op(ub=5)]], "objective": []}
+        report = precheck(data)
+        self.assertTrue(report["infeasible"])
+        self.assertEqual(report["reasons"][0]["kind"], "empty time window")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)